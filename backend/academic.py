@@ -0,0 +1,161 @@
+"""
+学业成绩计算
+由成绩表计算综测的绩点（GPA）和学业成绩考核分（X），代替手工录入：
+    课程总评 = 平时 × 0.1 + 期中 × 0.3 + 期末 × 0.6        （与 Grades.TotalScore 相同，NULL 按 0 计）
+    课程绩点 = (总评 - 50) / 10，总评不足 60 分为 0，最高 5.0
+    GPA     = Σ(课程绩点 × 学分) / Σ学分，保留两位小数（四舍五入）
+    X       = 50 + 10 × GPA
+课程按开设记录（CourseOfferings）的学年、学期归入学期；平时、期中、期末都未录入的成绩不参与计算。
+
+一次读取整个学期（或其中一部分学生）的成绩，按学生分组后用 numpy 整列计算；
+成绩换算为整数（总评以 0.001 分为单位）后运算，结果与数据库 DECIMAL 运算一致。
+只有结果与库中不同的综测记录才写回，写回后用 scoring.recalculate_scores 更新这些学生的总积分。
+只更新已有的综测记录；该学期没有成绩的学生保留原来录入的 GPA 和 X。
+"""
+
+from decimal import Decimal
+
+import numpy as np
+
+from scoring import MAX_SQL_STUDENT_FILTER, recalculate_scores
+from storage import SQLSERVER
+
+PASS_SCORE = 60
+MAX_GRADE_POINT = 5
+
+GRADES_SQL = """
+    SELECT g.StudentID, g.RegularScore, g.MidtermScore, g.FinalScore, c.Credits
+    FROM CourseOfferings o
+    JOIN Grades g ON g.OfferingID = o.OfferingID
+    JOIN Courses c ON g.CourseID = c.CourseID
+    WHERE o.AcademicYear = ? AND o.Semester = ?
+      AND (g.RegularScore IS NOT NULL OR g.MidtermScore IS NOT NULL OR g.FinalScore IS NOT NULL)
+"""
+
+EVALUATIONS_SQL = """
+    SELECT EvaluationID, StudentID, GPA, AcademicScore
+    FROM ComprehensiveEvaluations
+    WHERE AcademicYear = ? AND Semester = ?
+"""
+
+STAGE_TABLE = "AcademicResults"
+STAGE_COLUMNS = """
+    EvaluationID INT PRIMARY KEY,
+    GPA DECIMAL(4,2),
+    AcademicScore DECIMAL(6,2)
+"""
+
+UPDATE_SQL = """
+    UPDATE ComprehensiveEvaluations
+    SET GPA = r.GPA,
+        AcademicScore = r.AcademicScore,
+        UpdatedAt = GETDATE()
+    FROM {stage} r
+    WHERE ComprehensiveEvaluations.EvaluationID = r.EvaluationID
+"""
+
+
+def _scaled(rows, column, scale):
+    """rows 的第 column 列乘以 scale 后取整；NULL 按 0 计"""
+    values = np.array([row[column] for row in rows], dtype=float)
+    return np.rint(np.nan_to_num(values) * scale).astype(np.int64)
+
+
+def compute_academic(student_ids, regular, midterm, final, credits):
+    """按学生汇总课程成绩
+
+    student_ids 为每门课程成绩所属的学生；regular / midterm / final 以"分"为单位（0.01 分），
+    credits 以 0.1 学分为单位，都是等长的整数数组。
+    返回 (学生, GPA, X)：学生按学号排序，GPA 和 X 以 0.01 为单位
+    """
+    students, index = np.unique(student_ids, return_inverse=True)
+    # 总评以 0.001 分为单位：r × 0.1 + m × 0.3 + f × 0.6
+    total = regular + 3 * midterm + 6 * final
+    # 课程绩点以 0.0001 为单位：(总评 - 50) / 10
+    points = np.where(total >= PASS_SCORE * 1000,
+                      np.minimum(total - 50 * 1000, MAX_GRADE_POINT * 10000), 0)
+    weighted = np.bincount(index, weights=points * credits, minlength=len(students))
+    credit_sum = np.bincount(index, weights=credits, minlength=len(students))
+    # 总学分为 0（全部是 0 学分课程）时没有绩点
+    valid = credit_sum > 0
+    numerator = np.rint(weighted).astype(np.int64)
+    denominator = np.rint(credit_sum).astype(np.int64) * 100
+    denominator[~valid] = 1
+    # 四舍五入到 0.01
+    gpa = (2 * numerator + denominator) // (2 * denominator)
+    return students[valid], gpa[valid], 5000 + 10 * gpa[valid]
+
+
+def recalculate_academic(conn, academic_year, semester, student_ids=None, dialect=SQLSERVER):
+    """由成绩表重新计算某学期（可限定学生）的 GPA 和 X，只写回有变化的记录并更新其总积分；
+    调用方负责提交事务"""
+    grades_sql, evaluations_sql = GRADES_SQL, EVALUATIONS_SQL
+    grade_params = [academic_year, semester]
+    evaluation_params = [academic_year, semester]
+    if student_ids is not None:
+        student_ids = sorted(set(student_ids))
+        if not student_ids:
+            return {"students": 0, "evaluated": 0, "updated": 0, "scores_updated": 0}
+        if len(student_ids) <= MAX_SQL_STUDENT_FILTER:
+            placeholders = ", ".join("?" * len(student_ids))
+            grades_sql += f" AND g.StudentID IN ({placeholders})"
+            evaluations_sql += f" AND StudentID IN ({placeholders})"
+            grade_params.extend(student_ids)
+            evaluation_params.extend(student_ids)
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(grades_sql, grade_params)
+        grades = cursor.fetchall()
+        cursor.execute(evaluations_sql, evaluation_params)
+        evaluations = cursor.fetchall()
+        if student_ids is not None and len(student_ids) > MAX_SQL_STUDENT_FILTER:
+            wanted = set(student_ids)
+            grades = [row for row in grades if row[0] in wanted]
+            evaluations = [row for row in evaluations if row[1] in wanted]
+        if not grades or not evaluations:
+            return {"students": 0, "evaluated": len(evaluations), "updated": 0, "scores_updated": 0}
+
+        students, gpa, academic = compute_academic(
+            np.array([row[0] for row in grades], dtype=np.int64),
+            _scaled(grades, 1, 100), _scaled(grades, 2, 100), _scaled(grades, 3, 100), _scaled(grades, 4, 10),
+        )
+
+        # 与该学期的综测记录按学号对齐；没有综测记录的学生跳过
+        keys = np.array([(row[0], row[1]) for row in evaluations], dtype=np.int64)
+        position = np.searchsorted(students, keys[:, 1])
+        position[position == len(students)] = 0
+        matched = students[position] == keys[:, 1]
+        current_gpa = np.array([row[2] for row in evaluations], dtype=float)
+        current_academic = np.array([row[3] for row in evaluations], dtype=float)
+        new_gpa = gpa[position]
+        new_academic = academic[position]
+        changed = np.flatnonzero(matched & (
+            np.isnan(current_gpa) | np.isnan(current_academic)
+            | (np.rint(np.nan_to_num(current_gpa) * 100) != new_gpa)
+            | (np.rint(np.nan_to_num(current_academic) * 100) != new_academic)
+        ))
+
+        report = {"students": len(students), "evaluated": int(matched.sum()), "updated": int(len(changed)),
+                  "scores_updated": 0}
+        if len(changed):
+            _write_results(cursor, dialect, keys[changed, 0], new_gpa[changed], new_academic[changed])
+            scores = recalculate_scores(conn, academic_year, semester, keys[changed, 1].tolist(), dialect)
+            report["scores_updated"] = scores["updated"]
+        return report
+    finally:
+        cursor.close()
+
+
+def _write_results(cursor, dialect, evaluation_ids, gpa, academic):
+    rows = [
+        (evaluation_id, Decimal(g).scaleb(-2), Decimal(x).scaleb(-2))
+        for evaluation_id, g, x in zip(evaluation_ids.tolist(), gpa.tolist(), academic.tolist())
+    ]
+    stage = dialect.temp(STAGE_TABLE)
+    # 连接来自连接池，临时表会保留在会话中，开始和结束时都要清理
+    cursor.execute(dialect.drop_temp(STAGE_TABLE))
+    cursor.execute(dialect.create_temp(STAGE_TABLE, STAGE_COLUMNS))
+    dialect.bulk_insert(cursor, f"INSERT INTO {stage} VALUES (?, ?, ?)", rows)
+    cursor.execute(UPDATE_SQL.format(stage=stage))
+    cursor.execute(dialect.drop_temp(STAGE_TABLE))
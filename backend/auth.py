@@ -0,0 +1,276 @@
+"""
+登录认证与会话
+- 密码使用 PBKDF2-HMAC-SHA256 加盐哈希保存，格式为 pbkdf2_sha256$迭代次数$盐$哈希。
+  哈希计算有意放慢（每次约几十到上百毫秒），在单独的线程池中执行，不阻塞事件循环；
+  库中原有的明文密码仍可登录，登录成功后改写为哈希。
+  新建账号的初始密码每个账号单独加盐，只做少量迭代（批量导入时不会太慢），首次登录后同样改写
+- 登录成功后签发带 HMAC 签名的会话令牌，载荷包含会话号、用户、角色和过期时间。
+  校验令牌只需验证签名，不查询 Users 表；验证过的令牌放在有上限的进程内缓存中，
+  之后的请求直接命中缓存
+- 注销单个令牌，或在禁用账号时作废该用户此前签发的全部令牌
+
+签名密钥取环境变量 GRADE_SESSION_SECRET；未设置时每次启动随机生成，服务重启后需要重新登录。
+作废记录保存在进程内，多进程部署时各进程分别生效。
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+PBKDF2_ALGORITHM = "pbkdf2_sha256"
+PBKDF2_ITERATIONS = 200_000
+DISABLED_PASSWORD = "DISABLED"
+# 初始密码是公开的默认值，加密强度意义不大；首次登录时 verify_password 判定需要按 PBKDF2_ITERATIONS 重新哈希
+INITIAL_PASSWORD_ITERATIONS = 1000
+# 新学生账号（单个新增与批量导入）的初始密码；写入的是 default_password_hash() 计算的哈希
+DEFAULT_PASSWORD = "123456"
+
+
+# --- 密码哈希 ---
+
+def hash_password(password, iterations=PBKDF2_ITERATIONS):
+    salt = secrets.token_hex(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("ascii"), iterations)
+    return f"{PBKDF2_ALGORITHM}${iterations}${salt}${digest.hex()}"
+
+
+def verify_password(password, stored):
+    """返回 (是否匹配, 是否需要重新哈希)；明文或迭代次数过低的旧记录匹配后需要重新哈希"""
+    if not stored or stored == DISABLED_PASSWORD:
+        return False, False
+    parts = stored.split("$")
+    if len(parts) == 4 and parts[0] == PBKDF2_ALGORITHM:
+        _, iterations, salt, expected = parts
+        try:
+            iterations = int(iterations)
+            digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("ascii"), iterations)
+            ok = hmac.compare_digest(digest.hex(), expected)
+        except (ValueError, TypeError):
+            # 迭代次数、盐或摘要格式错误（非正整数、含非 ASCII 字符）的记录按校验失败处理
+            return False, False
+        return ok, ok and iterations < PBKDF2_ITERATIONS
+    # 旧数据：明文密码
+    ok = hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+    return ok, ok
+
+
+def default_password_hash(password):
+    """新建账号的初始密码哈希；每次调用使用新的盐，同一初始密码的账号哈希也各不相同"""
+    return hash_password(password, INITIAL_PASSWORD_ITERATIONS)
+
+
+class PasswordHasher:
+    """在专用线程池中计算密码哈希（hashlib 计算期间释放 GIL），排队超过 max_pending 时返回 503"""
+
+    def __init__(self, max_workers=4, max_pending=64):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hash")
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def _run(self, func, *args):
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="登录请求过多，请稍后重试", headers={"Retry-After": "1"})
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+            self.completed += 1
+
+    async def verify(self, password, stored):
+        return await self._run(verify_password, password, stored)
+
+    async def hash(self, password):
+        return await self._run(hash_password, password)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            "algorithm": PBKDF2_ALGORITHM,
+            "iterations": PBKDF2_ITERATIONS,
+            "max_workers": self.max_workers,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+# --- 会话令牌 ---
+
+class InvalidToken(Exception):
+    pass
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class Session:
+    __slots__ = ("session_id", "user_id", "role", "related_id", "issued_at", "expires_at")
+
+    def __init__(self, session_id, user_id, role, related_id, issued_at, expires_at):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.role = role
+        self.related_id = related_id
+        self.issued_at = issued_at    # 毫秒时间戳
+        self.expires_at = expires_at  # 秒
+
+    def to_dict(self):
+        return {
+            "user_id": self.user_id,
+            "role": self.role,
+            "related_id": self.related_id,
+            "expires_at": self.expires_at,
+        }
+
+
+class SessionStore:
+    """签发和校验会话令牌
+
+    - ttl: 令牌有效期（秒）
+    - max_entries: 缓存的已验证令牌数上限，超出时淘汰最久未使用的；被淘汰的令牌下次请求重新验证签名
+    """
+
+    def __init__(self, secret=None, ttl=8 * 3600, max_entries=10000):
+        secret = secret or os.environ.get("GRADE_SESSION_SECRET") or secrets.token_hex(32)
+        self._secret = secret.encode("utf-8")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache = OrderedDict()   # 令牌 -> Session
+        self._revoked = {}            # 已注销的会话号 -> 令牌过期时间
+        self._revoked_users = {}      # 用户 -> 作废时间（毫秒），此前签发的令牌全部无效
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self.evictions = 0
+
+    def _sign(self, payload):
+        return _b64encode(hmac.new(self._secret, payload.encode("ascii"), hashlib.sha256).digest())
+
+    def issue(self, user_id, role, related_id):
+        """签发令牌，返回 (令牌, Session)"""
+        issued_at = time.time_ns() // 1_000_000
+        session = Session(secrets.token_hex(8), user_id, role, related_id,
+                          issued_at, issued_at // 1000 + self.ttl)
+        payload = _b64encode(json.dumps({
+            "sid": session.session_id, "uid": user_id, "role": role, "rid": related_id,
+            "iat": issued_at, "exp": session.expires_at,
+        }, separators=(",", ":")).encode("utf-8"))
+        token = f"{payload}.{self._sign(payload)}"
+        with self._lock:
+            self._remember(token, session)
+        return token, session
+
+    def authenticate(self, token):
+        """校验令牌并返回 Session，无效、过期或已作废时抛出 InvalidToken"""
+        now = time.time()
+        with self._lock:
+            session = self._cache.get(token)
+            if session is not None:
+                if session.expires_at > now:
+                    self._cache.move_to_end(token)
+                    self.hits += 1
+                    return session
+                del self._cache[token]
+            self.misses += 1
+
+        session = self._decode(token, now)
+        with self._lock:
+            if self._is_revoked(session):
+                self.rejected += 1
+                raise InvalidToken("登录已失效")
+            self._remember(token, session)
+        return session
+
+    def _decode(self, token, now):
+        payload, _, signature = token.partition(".")
+        if not signature or not hmac.compare_digest(signature, self._sign(payload)):
+            self.rejected += 1
+            raise InvalidToken("无效的令牌")
+        try:
+            data = json.loads(_b64decode(payload))
+            session = Session(data["sid"], data["uid"], data["role"], data["rid"], data["iat"], data["exp"])
+        except (ValueError, KeyError, TypeError):
+            self.rejected += 1
+            raise InvalidToken("无效的令牌")
+        if session.expires_at <= now:
+            self.rejected += 1
+            raise InvalidToken("登录已过期")
+        return session
+
+    def _is_revoked(self, session):
+        if session.session_id in self._revoked:
+            return True
+        revoked_at = self._revoked_users.get(session.user_id)
+        return revoked_at is not None and session.issued_at <= revoked_at
+
+    def _remember(self, token, session):
+        self._cache[token] = session
+        self._cache.move_to_end(token)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+            self.evictions += 1
+
+    def revoke(self, token):
+        """注销单个令牌；令牌无效时返回 False"""
+        try:
+            session = self.authenticate(token)
+        except InvalidToken:
+            return False
+        with self._lock:
+            self._cache.pop(token, None)
+            self._purge(time.time())
+            self._revoked[session.session_id] = session.expires_at
+        return True
+
+    def revoke_user(self, user_id):
+        """作废该用户此前签发的全部令牌，如账号被禁用时"""
+        with self._lock:
+            self._purge(time.time())
+            self._revoked_users[user_id] = time.time_ns() // 1_000_000
+            for token in [token for token, session in self._cache.items() if session.user_id == user_id]:
+                del self._cache[token]
+
+    def _purge(self, now):
+        """清理已过期令牌的作废记录"""
+        for session_id in [sid for sid, expires_at in self._revoked.items() if expires_at <= now]:
+            del self._revoked[session_id]
+        oldest = (now - self.ttl) * 1000
+        for user_id in [uid for uid, revoked_at in self._revoked_users.items() if revoked_at < oldest]:
+            del self._revoked_users[user_id]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ttl": self.ttl,
+                "max_entries": self.max_entries,
+                "cached": len(self._cache),
+                "revoked_sessions": len(self._revoked),
+                "revoked_users": len(self._revoked_users),
+                "hits": self.hits,
+                "misses": self.misses,
+                "rejected": self.rejected,
+                "evictions": self.evictions,
+            }
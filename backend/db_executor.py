@@ -0,0 +1,168 @@
+"""
+数据库执行器
+所有访问数据库的同步接口在一个固定大小的专用线程池中执行，
+并按接口限制并发数和排队长度。队列已满时立即返回 503 和 Retry-After，
+而不是让请求在 Starlette 默认线程池里无限堆积。
+每个请求的排队时间和执行时间分别记入 metrics 的 queue、db_thread。
+"""
+
+import asyncio
+import contextvars
+import functools
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from metrics import record
+
+
+class _Gate:
+    """单个接口的准入控制：最多 concurrency 个同时执行，最多 queue 个排队"""
+
+    def __init__(self, name, concurrency, queue, queue_timeout):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.queue_timeout = queue_timeout
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        # 执行耗时的指数滑动平均，用于估算 Retry-After
+        self.avg_seconds = 0.0
+
+    def record(self, seconds):
+        self.completed += 1
+        if self.avg_seconds == 0.0:
+            self.avg_seconds = seconds
+        else:
+            self.avg_seconds = 0.9 * self.avg_seconds + 0.1 * seconds
+
+    def retry_after(self):
+        """预计排队清空所需的秒数，至少 1 秒"""
+        backlog = (self.waiting + self.running) / self.concurrency
+        return max(1, math.ceil(self.avg_seconds * backlog))
+
+    def stats(self):
+        return {
+            "concurrency": self.concurrency,
+            "queue": self.queue,
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_ms": round(self.avg_seconds * 1000, 3),
+        }
+
+
+class DBExecutor:
+    """数据库专用执行器
+
+    - max_workers: 线程数，应与连接池 max_size 一致，保证执行中的请求都能拿到连接
+    - max_queue: 所有接口合计的最大排队数
+    - queue_timeout: 排队超过该秒数仍未开始执行则返回 503
+    """
+
+    def __init__(self, max_workers=20, max_queue=200, queue_timeout=10.0):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+        self._gates = {}
+        self._pending = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def bounded(self, name=None, concurrency=None, queue=None, queue_timeout=None):
+        """装饰同步接口函数，使其在数据库执行器中运行并受准入控制
+
+        需放在 @app.get/@app.post 之下，FastAPI 通过 functools.wraps 读取原函数签名。
+        """
+        def decorator(func):
+            gate = _Gate(
+                name or func.__name__,
+                concurrency or self.max_workers,
+                self.max_queue if queue is None else queue,
+                self.queue_timeout if queue_timeout is None else queue_timeout,
+            )
+            self._gates[gate.name] = gate
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                queued = time.perf_counter()
+                await self._admit(gate)
+                started = time.perf_counter()
+                record("queue", started - queued)
+                try:
+                    loop = asyncio.get_running_loop()
+                    # 复制上下文变量，保证线程中的代码能看到请求级别的上下文
+                    ctx = contextvars.copy_context()
+                    call = functools.partial(ctx.run, func, *args, **kwargs)
+                    return await loop.run_in_executor(self._executor, call)
+                finally:
+                    elapsed = time.perf_counter() - started
+                    gate.record(elapsed)
+                    record("db_thread", elapsed)
+                    gate.running -= 1
+                    gate.semaphore.release()
+                    with self._lock:
+                        self._pending -= 1
+
+            return wrapper
+        return decorator
+
+    async def _admit(self, gate):
+        with self._lock:
+            # 全局上限：执行中 + 排队中的请求不超过线程数 + 队列长度
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                gate.rejected += 1
+                self._overloaded(gate)
+            self._pending += 1
+
+        try:
+            if gate.semaphore.locked() and gate.waiting >= gate.queue:
+                gate.rejected += 1
+                self._overloaded(gate)
+            gate.waiting += 1
+            try:
+                await asyncio.wait_for(gate.semaphore.acquire(), gate.queue_timeout)
+            except asyncio.TimeoutError:
+                gate.timed_out += 1
+                self._overloaded(gate)
+            finally:
+                gate.waiting -= 1
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        gate.running += 1
+
+    def _overloaded(self, gate):
+        raise HTTPException(
+            status_code=503,
+            detail="服务器繁忙，请稍后重试",
+            headers={"Retry-After": str(gate.retry_after())},
+        )
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        """执行器及各接口的排队、执行、拒绝统计"""
+        with self._lock:
+            pending = self._pending
+            rejected = self._rejected
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": pending,
+            "rejected_global": rejected,
+            "endpoints": {name: gate.stats() for name, gate in self._gates.items()},
+        }
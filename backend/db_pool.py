@@ -0,0 +1,244 @@
+"""
+数据库连接池
+替代每个请求 pyodbc.connect() 一次的做法：连接在请求之间复用，
+close() 时归还连接池而不是真正断开。
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """在超时时间内没有可用连接"""
+
+
+class PooledConnection:
+    """连接代理：其余属性全部转发给底层连接，close() 改为归还连接池"""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.uses = 0
+        self._checked_out = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def close(self):
+        # 重复 close() 是安全的，只有第一次会归还连接
+        if self._checked_out:
+            self._checked_out = False
+            self._pool._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """线程安全的连接池
+
+    - min_size / max_size: 保持的最少空闲连接数 / 同时存在的最多连接数
+    - timeout: 借出连接时最多等待的秒数，超时抛出 PoolTimeout
+    - max_uses / max_lifetime: 连接被借出 N 次或存活 T 秒后回收重建
+    - ping_after: 空闲超过该秒数的连接在借出前先执行 ping_sql 检查存活
+    - reset_sql: 归还连接时在回滚之后执行，把请求中修改的会话选项（如 SET NOCOUNT）恢复为默认值
+    """
+
+    def __init__(self, connect, min_size=2, max_size=20, timeout=5.0,
+                 max_uses=1000, max_lifetime=1800.0, ping_after=5.0,
+                 ping_sql="SELECT 1", reset_sql=None):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("连接池大小配置错误")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_uses = max_uses
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+        self.ping_sql = ping_sql
+        self.reset_sql = reset_sql
+
+        self._idle = deque()
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+        self._stats = {
+            "created": 0,
+            "closed": 0,
+            "recycled": 0,
+            "checkouts": 0,
+            "timeouts": 0,
+            "ping_failures": 0,
+            "connect_errors": 0,
+            "waiting": 0,
+            "max_waiting": 0,
+            "wait_time_total": 0.0,
+        }
+
+    # --- 借出 / 归还 ---
+
+    def acquire(self, timeout=None):
+        """借出一个连接，必要时新建；达到上限则等待"""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        started = time.monotonic()
+
+        while True:
+            conn = None
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("连接池已关闭")
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(f"{timeout:.1f} 秒内没有可用的数据库连接")
+                    self._stats["waiting"] += 1
+                    self._stats["max_waiting"] = max(self._stats["max_waiting"], self._stats["waiting"])
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._stats["waiting"] -= 1
+                if self._idle:
+                    # 后进先出：优先复用刚归还的热连接，让多余连接自然空闲
+                    conn = self._idle.pop()
+                else:
+                    # 先占位再在锁外建立连接，避免握手期间阻塞其他线程
+                    self._size += 1
+
+            if conn is None:
+                conn = self._open()
+            elif not self._usable(conn):
+                self._discard(conn)
+                continue
+
+            with self._cond:
+                self._stats["checkouts"] += 1
+                self._stats["wait_time_total"] += time.monotonic() - started
+            conn.uses += 1
+            conn._checked_out = True
+            return conn
+
+    def _open(self):
+        try:
+            raw = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._stats["connect_errors"] += 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats["created"] += 1
+        return PooledConnection(self, raw)
+
+    def _usable(self, conn):
+        if self._expired(conn):
+            with self._cond:
+                self._stats["recycled"] += 1
+            return False
+        if time.monotonic() - conn.last_used < self.ping_after:
+            return True
+        try:
+            cursor = conn._raw.cursor()
+            cursor.execute(self.ping_sql)
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            with self._cond:
+                self._stats["ping_failures"] += 1
+            return False
+
+    def _expired(self, conn):
+        if self.max_uses and conn.uses >= self.max_uses:
+            return True
+        if self.max_lifetime and time.monotonic() - conn.created_at >= self.max_lifetime:
+            return True
+        return False
+
+    def _release(self, conn):
+        # 回滚未提交的事务（只读请求同样会开启隐式事务），保证下一个借用者拿到干净的连接；
+        # 会话选项不随事务回滚，另外执行 reset_sql 恢复
+        try:
+            conn._raw.rollback()
+            if self.reset_sql:
+                cursor = conn._raw.cursor()
+                cursor.execute(self.reset_sql)
+                cursor.close()
+        except Exception:
+            self._discard(conn)
+            return
+
+        conn.last_used = time.monotonic()
+        if self._expired(conn):
+            with self._cond:
+                self._stats["recycled"] += 1
+            self._discard(conn)
+            return
+
+        with self._cond:
+            if not self._closed:
+                self._idle.append(conn)
+                self._cond.notify()
+                return
+        self._discard(conn)
+
+    def _discard(self, conn):
+        try:
+            conn._raw.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats["closed"] += 1
+            self._cond.notify()
+
+    # --- 生命周期 ---
+
+    def warmup(self):
+        """预先建立 min_size 个连接"""
+        opened = []
+        try:
+            while True:
+                with self._cond:
+                    if self._size >= self.min_size:
+                        break
+                    self._size += 1
+                opened.append(self._open())
+        finally:
+            for conn in opened:
+                self._release(conn)
+
+    def close_all(self):
+        """关闭所有空闲连接，已借出的连接归还时直接关闭"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self):
+        """连接池统计信息，供监控接口使用"""
+        with self._cond:
+            result = dict(self._stats)
+            result.update({
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            })
+        wait_total = result.pop("wait_time_total")
+        checkouts = result["checkouts"]
+        result["avg_wait_ms"] = round(wait_total / checkouts * 1000, 3) if checkouts else 0.0
+        return result
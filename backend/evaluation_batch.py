@@ -0,0 +1,206 @@
+"""
+综测数据批量录入
+整班 / 整学期的综测数据先一次写入临时表，再用一条 MERGE（SQLite 为 INSERT ... ON CONFLICT）
+在同一个事务内完成新增或更新，代替逐个学生调用 /api/evaluation/add。
+写入后在同一事务内重新计算这些学生的创新实践、社会实践总分和总积分。
+
+单条录入（/api/evaluation/add）使用同样的 MERGE / UPSERT，一条语句完成新增或更新。
+"""
+
+from decimal import Decimal
+
+from scoring import recalculate_scores
+from storage import SQLSERVER
+
+# (字段, 数据库列, 列说明, 绝对值上限)：上限与表中 DECIMAL 精度一致，超出会导致整批写入失败
+SCORE_FIELDS = (
+    ("physical_score", "PhysicalScore", "体测成绩", 1000),
+    ("moral_score", "MoralScore", "品德表现评价分", 1000),
+    ("gpa", "GPA", "绩点", 100),
+    ("academic_score", "AcademicScore", "学业成绩考核分", 10000),
+    ("innovation_basic_score", "InnovationBasicScore", "创新实践基本分", 1000),
+    ("innovation_bonus_score", "InnovationBonusScore", "创新实践加分", 1000),
+    ("student_work_score", "StudentWorkScore", "学生工作加分", 1000),
+    ("social_service_score", "SocialServiceScore", "社会服务加分", 1000),
+    ("social_reward_score", "SocialRewardScore", "社会服务奖励加分", 1000),
+    ("cultural_sports_score", "CulturalSportsScore", "文体实践评分", 1000),
+)
+SCORE_COLUMNS = [column for _, column, _, _ in SCORE_FIELDS]
+
+STAGE_TABLE = "EvaluationStage"
+STAGE_COLUMNS = """
+    RowNo INT PRIMARY KEY,
+    StudentID BIGINT NOT NULL,
+    AcademicYear NVARCHAR(20) NOT NULL,
+    Semester INT NOT NULL,
+    PhysicalScore DECIMAL(5,2),
+    MoralScore DECIMAL(5,2),
+    GPA DECIMAL(4,2),
+    AcademicScore DECIMAL(6,2),
+    InnovationBasicScore DECIMAL(5,2),
+    InnovationBonusScore DECIMAL(5,2),
+    StudentWorkScore DECIMAL(5,2),
+    SocialServiceScore DECIMAL(5,2),
+    SocialRewardScore DECIMAL(5,2),
+    CulturalSportsScore DECIMAL(5,2)
+"""
+
+UNKNOWN_STUDENTS_SQL = """
+    SELECT st.RowNo FROM {stage} st
+    LEFT JOIN Students s ON s.StudentID = st.StudentID
+    WHERE s.StudentID IS NULL
+"""
+
+MERGE_SQL = f"""
+    SET NOCOUNT ON;
+    DECLARE @actions TABLE (Action NVARCHAR(10));
+
+    MERGE ComprehensiveEvaluations WITH (HOLDLOCK) AS t
+    USING #{STAGE_TABLE} AS s
+        ON t.StudentID = s.StudentID AND t.AcademicYear = s.AcademicYear AND t.Semester = s.Semester
+    WHEN MATCHED THEN UPDATE SET
+        {", ".join(f"{c} = s.{c}" for c in SCORE_COLUMNS)},
+        UpdatedAt = GETDATE()
+    WHEN NOT MATCHED THEN INSERT (StudentID, AcademicYear, Semester, {", ".join(SCORE_COLUMNS)})
+        VALUES (s.StudentID, s.AcademicYear, s.Semester, {", ".join(f"s.{c}" for c in SCORE_COLUMNS)})
+    OUTPUT $action INTO @actions;
+    -- 连接会归还连接池，NOCOUNT 要在批结束前恢复，否则后续请求的 rowcount 都是 -1
+    SET NOCOUNT OFF;
+
+    SELECT
+        SUM(CASE WHEN Action = 'INSERT' THEN 1 ELSE 0 END),
+        SUM(CASE WHEN Action = 'UPDATE' THEN 1 ELSE 0 END)
+    FROM @actions;
+"""
+
+# 单条录入：HOLDLOCK 在事务结束前锁住该键，并发录入同一学生同一学期时不会重复插入
+MERGE_ONE_SQL = f"""
+    MERGE ComprehensiveEvaluations WITH (HOLDLOCK) AS t
+    USING (VALUES (?, ?, ?, {", ".join("?" * len(SCORE_COLUMNS))}))
+        AS s (StudentID, AcademicYear, Semester, {", ".join(SCORE_COLUMNS)})
+        ON t.StudentID = s.StudentID AND t.AcademicYear = s.AcademicYear AND t.Semester = s.Semester
+    WHEN MATCHED THEN UPDATE SET
+        {", ".join(f"{c} = s.{c}" for c in SCORE_COLUMNS)},
+        UpdatedAt = GETDATE()
+    WHEN NOT MATCHED THEN INSERT (StudentID, AcademicYear, Semester, {", ".join(SCORE_COLUMNS)})
+        VALUES (s.StudentID, s.AcademicYear, s.Semester, {", ".join(f"s.{c}" for c in SCORE_COLUMNS)});
+"""
+
+SQLITE_UPSERT_ONE_SQL = f"""
+    INSERT INTO ComprehensiveEvaluations (StudentID, AcademicYear, Semester, {", ".join(SCORE_COLUMNS)})
+    VALUES (?, ?, ?, {", ".join("?" * len(SCORE_COLUMNS))})
+    ON CONFLICT (StudentID, AcademicYear, Semester) DO UPDATE SET
+        {", ".join(f"{c} = excluded.{c}" for c in SCORE_COLUMNS)},
+        UpdatedAt = GETDATE()
+"""
+
+# SQLite：先统计已存在的记录数（即更新数），再用 UPSERT 一次写入
+SQLITE_EXISTING_SQL = f"""
+    SELECT COUNT(*) FROM {STAGE_TABLE} s
+    JOIN ComprehensiveEvaluations t
+        ON t.StudentID = s.StudentID AND t.AcademicYear = s.AcademicYear AND t.Semester = s.Semester
+"""
+
+SQLITE_UPSERT_SQL = f"""
+    INSERT INTO ComprehensiveEvaluations (StudentID, AcademicYear, Semester, {", ".join(SCORE_COLUMNS)})
+    SELECT StudentID, AcademicYear, Semester, {", ".join(SCORE_COLUMNS)} FROM {STAGE_TABLE} WHERE true
+    ON CONFLICT (StudentID, AcademicYear, Semester) DO UPDATE SET
+        {", ".join(f"{c} = excluded.{c}" for c in SCORE_COLUMNS)},
+        UpdatedAt = GETDATE()
+"""
+
+
+def validate_evaluations(items):
+    """返回 (合格行参数元组列表, 错误列表)；index 为该条在请求数组中的下标"""
+    rows, errors = [], []
+    seen = {}
+    for index, item in enumerate(items):
+        error = None
+        key = (item.student_id, item.academic_year, item.semester)
+        if item.semester not in (1, 2):
+            error = "学期只能是 1 或 2"
+        elif not item.academic_year or len(item.academic_year) > 20:
+            error = "学年格式错误"
+        elif key in seen:
+            error = f"与第 {seen[key]} 条重复"
+        else:
+            for field, _, label, limit in SCORE_FIELDS:
+                value = getattr(item, field)
+                if value is not None and not -limit < round(value, 2) < limit:
+                    error = f"{label}超出范围"
+                    break
+        if error:
+            errors.append({"index": index, "student_id": item.student_id, "error": error})
+            continue
+        seen[key] = index
+        scores = [getattr(item, field) for field, _, _, _ in SCORE_FIELDS]
+        rows.append((index, item.student_id, item.academic_year, item.semester,
+                     *[None if v is None else Decimal(str(round(v, 2))) for v in scores]))
+    return rows, errors
+
+
+def _merge(cursor, dialect):
+    """新增或更新暂存表中的记录，返回 (新增数, 更新数)"""
+    if dialect.name == "sqlite":
+        cursor.execute(SQLITE_EXISTING_SQL)
+        updated = cursor.fetchone()[0]
+        cursor.execute(SQLITE_UPSERT_SQL)
+        return cursor.rowcount - updated, updated
+    cursor.execute(MERGE_SQL)
+    counts = cursor.fetchone()
+    return int(counts[0] or 0), int(counts[1] or 0)
+
+
+def upsert_evaluation(cursor, item, dialect=SQLSERVER):
+    """新增或更新一个学生一个学期的综测数据；调用方负责重新计算总分和提交事务"""
+    params = (item.student_id, item.academic_year, item.semester,
+              *(getattr(item, field) for field, _, _, _ in SCORE_FIELDS))
+    cursor.execute(SQLITE_UPSERT_ONE_SQL if dialect.name == "sqlite" else MERGE_ONE_SQL, params)
+
+
+def upsert_evaluations(conn, items, dialect=SQLSERVER):
+    """批量新增或更新综测数据，返回新增、更新、拒绝数量和每条的拒绝原因"""
+    rows, errors = validate_evaluations(items)
+    inserted = updated = 0
+
+    if rows:
+        cursor = conn.cursor()
+        try:
+            stage = dialect.temp(STAGE_TABLE)
+            # 连接来自连接池，临时表会保留在会话中，开始和结束时都要清理
+            cursor.execute(dialect.drop_temp(STAGE_TABLE))
+            cursor.execute(dialect.create_temp(STAGE_TABLE, STAGE_COLUMNS))
+            dialect.bulk_insert(cursor, f"INSERT INTO {stage} VALUES ({', '.join('?' * 14)})", rows)
+
+            cursor.execute(UNKNOWN_STUDENTS_SQL.format(stage=stage))
+            unknown = {row_no for (row_no,) in cursor.fetchall()}
+            if unknown:
+                cursor.executemany(f"DELETE FROM {stage} WHERE RowNo = ?",
+                                   [(row_no,) for row_no in unknown])
+                errors.extend({"index": row_no, "student_id": items[row_no].student_id, "error": "学生不存在"}
+                              for row_no in unknown)
+
+            inserted, updated = _merge(cursor, dialect)
+            cursor.execute(dialect.drop_temp(STAGE_TABLE))
+
+            semesters = {}
+            for row in rows:
+                if row[0] not in unknown:
+                    semesters.setdefault((row[2], row[3]), []).append(row[1])
+            for (academic_year, semester), student_ids in semesters.items():
+                recalculate_scores(conn, academic_year, semester, student_ids, dialect)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    errors.sort(key=lambda e: e["index"])
+    return {
+        "total": len(items),
+        "inserted": inserted,
+        "updated": updated,
+        "rejected": len(errors),
+        "errors": errors,
+    }
@@ -0,0 +1,61 @@
+"""
+学生综测详情
+一条 SQL 同时取出综测记录和加分明细：视图 LEFT JOIN BonusDetails，每条加分明细一行，
+再按学生归并为 {视图各列..., "bonus_details": [...]}。
+单个学生和整班批量查询使用同一条语句，批量时 StudentID IN (...) 一次取回。
+"""
+
+from metrics import timed
+from serializer import serializer_for
+
+# 单次批量查询的学生数上限（SQL Server 单条语句最多 2100 个参数）
+MAX_BATCH_STUDENTS = 500
+
+BONUS_COLUMNS = ("Category", "ItemName", "Score", "Description")
+
+DETAIL_SQL = """
+    SELECT v.*, bd.Category, bd.ItemName, bd.Score, bd.Description
+    FROM v_ComprehensiveEvaluationDetails v
+    LEFT JOIN BonusDetails bd ON bd.EvaluationID = v.EvaluationID
+    WHERE v.StudentID IN ({placeholders}) AND v.AcademicYear = ? AND v.Semester = ?
+    ORDER BY v.StudentID, bd.DetailID
+"""
+
+
+def fetch_details(conn, student_ids, academic_year, semester):
+    """返回 {学号: 综测详情}，没有该学期综测记录的学生不在结果中"""
+    if not student_ids:
+        return {}
+    sql = DETAIL_SQL.format(placeholders=", ".join("?" * len(student_ids)))
+    cursor = conn.cursor()
+    try:
+        with timed("db"):
+            cursor.execute(sql, (*student_ids, academic_year, semester))
+            rows = cursor.fetchall()
+        if not rows:
+            return {}
+        serializer = serializer_for(cursor.description, rows[0])
+    finally:
+        cursor.close()
+
+    with timed("serialize"):
+        return _group(serializer, rows)
+
+
+def _group(serializer, rows):
+    """按学号归并明细行，结果保持学号顺序"""
+    split = len(serializer.columns) - len(BONUS_COLUMNS)
+    view_columns = serializer.columns[:split]
+    student_column = view_columns.index("StudentID")
+    details = {}
+    for row in rows:
+        values = serializer.values(row)
+        student_id = int(values[student_column])
+        detail = details.get(student_id)
+        if detail is None:
+            detail = dict(zip(view_columns, values[:split]))
+            detail["bonus_details"] = []
+            details[student_id] = detail
+        if values[split] is not None:  # LEFT JOIN 没有加分明细时加分列为 NULL
+            detail["bonus_details"].append(dict(zip(BONUS_COLUMNS, values[split:])))
+    return details
@@ -0,0 +1,241 @@
+"""
+结构化事件日志
+请求中调用 log() 只是把事件放入有上限的内存队列，不打开文件、不做 JSON 编码；
+后台写线程批量取出事件，编码为 NDJSON 写入日志文件（文件只打开一次），超过大小上限时轮转。
+
+- 每条事件带请求号 request_id：RequestIdMiddleware 为每个请求分配（或沿用请求头 X-Request-ID），
+  并在响应头中返回；数据库执行器等线程池中的代码复制了请求的上下文，同样能取到
+- 按位置（location）或假设编号（hypothesis）配置采样率，高频的调试日志只记录一部分
+- 队列已满时丢弃新事件并计数，不阻塞请求
+
+环境变量：
+- GRADE_LOG_PATH: 日志文件，默认 backend/logs/events.log
+- GRADE_LOG_SAMPLING: 采样率，如 "main.py:90=0.1,H2=0.5"，未列出的为 1（全部记录）
+"""
+
+import contextvars
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+
+DEFAULT_LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "events.log")
+
+# 写到日志文件的同时输出到标准错误的级别
+CONSOLE_LEVELS = frozenset({"warning", "error"})
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+_STOP = object()
+
+
+def parse_sampling(text):
+    """"位置或假设编号=采样率" 逗号分隔，返回字典"""
+    rates = {}
+    for item in (text or "").split(","):
+        key, sep, rate = item.strip().rpartition("=")
+        if sep and key:
+            rates[key.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+class EventLogger:
+    """异步批量写入的 NDJSON 日志
+
+    - max_bytes / backup_count: 文件超过 max_bytes 时轮转，保留 backup_count 个旧文件（events.log.1 ...）
+    - queue_size: 内存队列上限，写线程跟不上时丢弃新事件
+    - batch_size / flush_interval: 每次最多写入的事件数；队列空闲时最多等待 flush_interval 秒
+    """
+
+    def __init__(self, path=DEFAULT_LOG_PATH, max_bytes=10 * 1024 * 1024, backup_count=5,
+                 queue_size=10000, batch_size=500, flush_interval=0.5, sampling=None, console=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sampling = dict(sampling or {})
+        self.console = console
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._size = 0
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self.rotations = 0
+        self.write_errors = 0
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        kwargs.setdefault("path", os.environ.get("GRADE_LOG_PATH") or DEFAULT_LOG_PATH)
+        kwargs.setdefault("sampling", parse_sampling(os.environ.get("GRADE_LOG_SAMPLING")))
+        return cls(**kwargs)
+
+    # --- 记录（请求中调用） ---
+
+    def log(self, location, message, data=None, hypothesis_id=None, level="info"):
+        """记录一条事件；data 放入队列后不应再修改"""
+        rate = self.sampling.get(location)
+        if rate is None and hypothesis_id is not None:
+            rate = self.sampling.get(hypothesis_id)
+        if rate is not None and rate < 1.0 and random.random() >= rate:
+            self.sampled_out += 1
+            return
+        if self._thread is None:
+            self._start()
+        event = {
+            "timestamp": int(time.time() * 1000),
+            "level": level,
+            "location": location,
+            "message": message,
+            "requestId": request_id.get(),
+        }
+        if hypothesis_id is not None:
+            event["hypothesisId"] = hypothesis_id
+        if data is not None:
+            event["data"] = data
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="event-log", daemon=True)
+                self._thread.start()
+
+    # --- 后台写线程 ---
+
+    def _run(self):
+        while True:
+            try:
+                event = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [event]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is _STOP for item in batch)
+            self._write([item for item in batch if item is not _STOP])
+            if stop:
+                self._close_file()
+                return
+
+    def _write(self, batch):
+        if not batch:
+            return
+        lines = []
+        for event in batch:
+            try:
+                lines.append(json.dumps(event, ensure_ascii=False, default=str))
+            except (TypeError, ValueError):
+                self.write_errors += 1
+                continue
+            if self.console and event["level"] in CONSOLE_LEVELS:
+                print(f"[{event['level']}] {event['location']} {event['message']} {event.get('data', '')}",
+                      file=sys.stderr)
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        try:
+            if self._file is None:
+                self._open()
+            elif self._size + len(data) > self.max_bytes:
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data)
+            self.written += len(lines)
+        except OSError as e:
+            # 日志写入失败不影响服务，下一批重新打开文件
+            self.write_errors += 1
+            print(f"日志写入失败: {e}", file=sys.stderr)
+            self._close_file()
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, "ab")
+        self._size = self._file.tell()
+
+    def _rotate(self):
+        self._close_file()
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.rotations += 1
+        self._open()
+
+    def _close_file(self):
+        f, self._file = self._file, None
+        if f is not None:
+            try:
+                f.close()
+            except OSError:
+                pass
+
+    def close(self, timeout=5.0):
+        """写完队列中剩余的事件后停止写线程"""
+        thread = self._thread
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        self._thread = None
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "rotations": self.rotations,
+            "write_errors": self.write_errors,
+            "sampling": self.sampling,
+        }
+
+
+class RequestIdMiddleware:
+    """ASGI 中间件：为每个请求设置请求号，沿用请求头 X-Request-ID，并在响应头中返回"""
+
+    def __init__(self, app, header="x-request-id"):
+        self.app = app
+        self.header = header.encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        value = None
+        for name, header_value in scope["headers"]:
+            if name == self.header:
+                value = header_value.decode("latin-1")[:64]
+                break
+        if not value:
+            value = uuid.uuid4().hex[:16]
+        encoded = value.encode("latin-1")
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(self.header, encoded)]
+            await send(message)
+
+        token = request_id.set(value)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id.reset(token)
@@ -0,0 +1,273 @@
+"""
+综测数据导出
+按块从游标读取数据并逐行写出，内存占用与导出的学生人数无关。
+支持 xlsx、csv、ndjson、parquet 四种格式，列名统一使用查询中的中文别名。
+从游标取数据的耗时记为 metrics 的 db，生成文件内容的耗时记为 export。
+"""
+
+import csv
+import io
+import json
+import tempfile
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+
+from openpyxl import Workbook
+
+from metrics import timed
+
+# 每次从游标读取的行数
+FETCH_SIZE = 1000
+# 读取导出文件并发送给客户端时的块大小
+STREAM_CHUNK_SIZE = 64 * 1024
+# 导出文件小于该大小时留在内存中，超过后转存到临时文件
+SPOOL_MAX_SIZE = 4 * 1024 * 1024
+
+# 同时进行的边读边发导出（CSV / NDJSON）上限，每个都会占用一个数据库连接直到发送完毕
+MAX_ACTIVE_STREAMS = 4
+
+XLSX_MEDIA_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# 导出格式 -> 响应类型
+EXPORT_FORMATS = {
+    "xlsx": XLSX_MEDIA_TYPE,
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Parquet 需要固定的列类型，未列出的列按浮点数处理
+_INTEGER_COLUMNS = {"年级排名", "班级排名", "学号"}
+_STRING_COLUMNS = {"姓名", "班级"}
+
+_stream_slots = threading.BoundedSemaphore(MAX_ACTIVE_STREAMS)
+
+
+def build_export_query(academic_year, semester, class_id=None):
+    """返回导出查询的 SQL 和参数，列名使用中文别名"""
+    if class_id:
+        query = """
+            SELECT
+                ClassRank as 班级排名,
+                StudentID as 学号,
+                StudentName as 姓名,
+                ClassName as 班级,
+                PhysicalScore as 体测成绩,
+                MoralScore as 品德表现,
+                GPA as 绩点,
+                AcademicScore as 学业成绩,
+                InnovationTotalScore as 创新实践,
+                SocialTotalScore as 社会实践,
+                CulturalSportsScore as 文体实践,
+                TotalScore as 总积分
+            FROM v_ComprehensiveEvaluationDetails
+            WHERE AcademicYear = ? AND Semester = ? AND StudentID IN (
+                SELECT StudentID FROM Students WHERE ClassID = ?
+            )
+            ORDER BY ClassRank
+        """
+        return query, (academic_year, semester, class_id)
+
+    query = """
+        SELECT
+            GradeRank as 年级排名,
+            ClassRank as 班级排名,
+            StudentID as 学号,
+            StudentName as 姓名,
+            ClassName as 班级,
+            PhysicalScore as 体测成绩,
+            MoralScore as 品德表现,
+            GPA as 绩点,
+            AcademicScore as 学业成绩,
+            InnovationTotalScore as 创新实践,
+            SocialTotalScore as 社会实践,
+            CulturalSportsScore as 文体实践,
+            TotalScore as 总积分
+        FROM v_ComprehensiveEvaluationDetails
+        WHERE AcademicYear = ? AND Semester = ?
+        ORDER BY GradeRank
+    """
+    return query, (academic_year, semester)
+
+
+def iter_chunks(cursor, fetch_size=FETCH_SIZE):
+    """按块读取已执行查询的结果，避免 fetchall() 一次性载入全部数据"""
+    while True:
+        with timed("db"):
+            rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            break
+        yield rows
+
+
+def column_names(cursor):
+    return [column[0] for column in cursor.description]
+
+
+def write_xlsx(cursor, sheet_name):
+    """把游标结果写入只写模式的工作簿，返回定位到开头的文件对象
+
+    只写模式下 openpyxl 把每行直接写到磁盘上的工作表 XML，不在内存中保留单元格；
+    xlsx 是 zip 格式，必须整本写完才能生成目录，所以先写入临时文件再分块发送。
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_name)
+    ws.append(column_names(cursor))
+    for rows in iter_chunks(cursor):
+        with timed("export"):
+            for row in rows:
+                ws.append(list(row))
+
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    try:
+        with timed("export"):
+            wb.save(output)
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    return output
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"无法序列化 {type(value).__name__}")
+
+
+def iter_csv(cursor):
+    """逐块生成 CSV 字节，带 BOM 以便 Excel 正确识别中文"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(column_names(cursor))
+    yield buffer.getvalue().encode("utf-8-sig")
+    for rows in iter_chunks(cursor):
+        with timed("export"):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            chunk = buffer.getvalue().encode("utf-8")
+        yield chunk
+
+
+def iter_ndjson(cursor):
+    """逐块生成 NDJSON 字节，每行一个以中文列名为键的对象"""
+    columns = column_names(cursor)
+    for rows in iter_chunks(cursor):
+        with timed("export"):
+            lines = [
+                json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=_json_default)
+                for row in rows
+            ]
+            lines.append("")
+            chunk = "\n".join(lines).encode("utf-8")
+        yield chunk
+
+
+ROW_STREAMERS = {
+    "csv": iter_csv,
+    "ndjson": iter_ndjson,
+}
+
+
+def _parquet_schema(pa, columns):
+    fields = []
+    for name in columns:
+        if name in _INTEGER_COLUMNS:
+            fields.append(pa.field(name, pa.int64()))
+        elif name in _STRING_COLUMNS:
+            fields.append(pa.field(name, pa.string()))
+        else:
+            fields.append(pa.field(name, pa.float64()))
+    return pa.schema(fields)
+
+
+def write_parquet(cursor):
+    """每 FETCH_SIZE 行写一个行组，返回定位到开头的文件对象
+
+    与 xlsx 一样，Parquet 的元数据在文件末尾，写完后再分块发送。
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = column_names(cursor)
+    schema = _parquet_schema(pa, columns)
+    converters = [
+        int if name in _INTEGER_COLUMNS else str if name in _STRING_COLUMNS else float
+        for name in columns
+    ]
+
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    try:
+        with pq.ParquetWriter(output, schema) as writer:
+            for rows in iter_chunks(cursor):
+                with timed("export"):
+                    arrays = [
+                        pa.array(
+                            [None if row[i] is None else convert(row[i]) for row in rows],
+                            type=schema.field(i).type,
+                        )
+                        for i, convert in enumerate(converters)
+                    ]
+                    writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    return output
+
+
+def open_stream_slot():
+    """占用一个边读边发的名额，已满时返回 False"""
+    return _stream_slots.acquire(blocking=False)
+
+
+def release_stream_slot():
+    _stream_slots.release()
+
+
+class ClosingStream:
+    """边读边发的响应体：发送完毕、客户端断开或对象被回收时归还数据库连接和发送名额
+
+    用类而不是生成器，是因为从未开始迭代的生成器被回收时不会执行 finally。
+    """
+
+    def __init__(self, chunks, conn):
+        self._chunks = iter(chunks)
+        self._conn = conn
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        # StreamingResponse 在线程池中逐个调用 next()，因此这里必须是迭代器而不只是可迭代对象
+        try:
+            return next(self._chunks)
+        except BaseException:
+            # 包括发送完毕时的 StopIteration
+            self.close()
+            raise
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            conn.close()
+            release_stream_slot()
+
+    def __del__(self):
+        self.close()
+
+
+def iter_file(f, chunk_size=STREAM_CHUNK_SIZE):
+    """分块读取文件对象用于 StreamingResponse，发送完毕后关闭（删除临时文件）"""
+    try:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        f.close()
@@ -5,8 +5,10 @@ from typing import List, Optional
 import pyodbc
 import pandas as pd
 import io
-from datetime import datetime
-import json
+
+from auth import hash_password, verify_password
+from db_pool import ConnectionPool, PoolTimeout
+from event_log import EventLogger, RequestIdMiddleware
 
 app = FastAPI()
 
@@ -20,24 +22,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --- 请求号与调试日志 ---
+# 每个请求带 X-Request-ID；调试日志写入 GRADE_LOG_PATH（默认 backend/logs/events.log），
+# 由后台线程批量写入，可用 GRADE_LOG_SAMPLING 按位置或假设编号采样
+app.add_middleware(RequestIdMiddleware)
+event_log = EventLogger.from_env()
+
 # #region agent log
 def log_debug(location: str, message: str, data: dict, hypothesis_id: str):
-    """Append debug info to NDJSON log file for runtime tracing."""
-    try:
-        payload = {
-            "location": location,
-            "message": message,
-            "data": data,
-            "timestamp": int(datetime.now().timestamp() * 1000),
-            "sessionId": "debug-session",
-            "runId": "run1",
-            "hypothesisId": hypothesis_id
-        }
-        with open(r"d:\数据库\数据库课设\StudentGradeSystem\.cursor\debug.log", "a", encoding="utf-8") as f:
-            f.write(json.dumps(payload, ensure_ascii=False) + "\n")
-    except Exception:
-        # 避免日志失败影响主逻辑
-        pass
+    """记录调试事件：只放入内存队列，不在请求中打开文件"""
+    event_log.log(location, message, data, hypothesis_id, level="debug")
 # #endregion
 
 # --- 数据库连接配置 ---
@@ -49,14 +43,40 @@ conn_str = (
     "Trusted_Connection=yes;"
 )
 
+# --- 数据库连接池 ---
+# 连接在请求之间复用，conn.close() 会把连接归还连接池
+db_pool = ConnectionPool(
+    lambda: pyodbc.connect(conn_str),
+    min_size=2,
+    max_size=20,
+    timeout=5.0,          # 借出连接最多等待的秒数
+    max_uses=1000,        # 连接借出 1000 次后重建
+    max_lifetime=1800.0,  # 连接存活 30 分钟后重建
+)
+
 def get_db_connection():
     try:
-        conn = pyodbc.connect(conn_str)
-        return conn
+        return db_pool.acquire()
+    except PoolTimeout as e:
+        print(f"数据库连接池繁忙: {e}")
+        raise HTTPException(status_code=503, detail="数据库繁忙，请稍后重试")
     except Exception as e:
         print(f"数据库连接失败: {e}")
         raise HTTPException(status_code=500, detail="数据库连接失败")
 
+@app.on_event("startup")
+def warmup_db_pool():
+    try:
+        db_pool.warmup()
+    except Exception as e:
+        # 数据库暂不可用时不阻止服务启动，首次请求时再建立连接
+        print(f"数据库连接池预热失败: {e}")
+
+@app.on_event("shutdown")
+def close_db_pool():
+    db_pool.close_all()
+    event_log.close()
+
 # --- Pydantic 数据模型 (用于验证前端请求) ---
 
 class LoginRequest(BaseModel):
@@ -96,7 +116,7 @@ class RankingParams(BaseModel):
 def read_root():
     return {"message": "学生成绩管理系统后端已启动"}
 
-# 2. 登录接口 (简单的模拟验证)
+# 2. 登录接口
 @app.post("/api/login")
 def login(request: LoginRequest):
     # #region agent log
@@ -122,10 +142,17 @@ def login(request: LoginRequest):
         if not user:
             raise HTTPException(status_code=401, detail="用户不存在")
         
-        # 检查密码（这里是明文比较，实际项目应该用哈希）
-        if user.PasswordHash != request.password:
+        # 检查密码：PBKDF2 哈希（main_extended.py 登录或新建账号时写入），库中原有的明文密码也可登录
+        ok, needs_rehash = verify_password(request.password, user.PasswordHash)
+        if not ok:
             raise HTTPException(status_code=401, detail="密码错误")
         
+        if needs_rehash:
+            # 明文或迭代次数过低的旧记录升级为新哈希；期间密码被修改则不覆盖
+            cursor.execute("UPDATE Users SET PasswordHash=? WHERE UserID=? AND PasswordHash=?",
+                           (hash_password(request.password), user.UserID, user.PasswordHash))
+            conn.commit()
+        
         # #region agent log
         log_debug("main.py:102", "Login success", {
             "username": request.username,
@@ -135,6 +162,8 @@ def login(request: LoginRequest):
         # #endregion
         return {"status": "success", "role": user.Role, "related_id": user.RelatedID}
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"登录错误: {e}")
         # #region agent log
@@ -304,51 +333,53 @@ def get_student_detail(student_id: int, academic_year: str, semester: int):
 def export_comprehensive(academic_year: str, semester: int, class_id: Optional[int] = None):
     conn = get_db_connection()
     
-    if class_id:
-        query = """
-            SELECT 
-                ClassRank as 班级排名,
-                StudentID as 学号,
-                StudentName as 姓名,
-                ClassName as 班级,
-                PhysicalScore as 体测成绩,
-                MoralScore as 品德表现,
-                GPA as 绩点,
-                AcademicScore as 学业成绩,
-                InnovationTotalScore as 创新实践,
-                SocialTotalScore as 社会实践,
-                CulturalSportsScore as 文体实践,
-                TotalScore as 总积分
-            FROM v_ComprehensiveEvaluationDetails
-            WHERE AcademicYear = ? AND Semester = ? AND StudentID IN (
-                SELECT StudentID FROM Students WHERE ClassID = ?
-            )
-            ORDER BY ClassRank
-        """
-        df = pd.read_sql(query, conn, params=(academic_year, semester, class_id))
-    else:
-        query = """
-            SELECT 
-                GradeRank as 年级排名,
-                ClassRank as 班级排名,
-                StudentID as 学号,
-                StudentName as 姓名,
-                ClassName as 班级,
-                PhysicalScore as 体测成绩,
-                MoralScore as 品德表现,
-                GPA as 绩点,
-                AcademicScore as 学业成绩,
-                InnovationTotalScore as 创新实践,
-                SocialTotalScore as 社会实践,
-                CulturalSportsScore as 文体实践,
-                TotalScore as 总积分
-            FROM v_ComprehensiveEvaluationDetails
-            WHERE AcademicYear = ? AND Semester = ?
-            ORDER BY GradeRank
-        """
-        df = pd.read_sql(query, conn, params=(academic_year, semester))
-    
-    conn.close()
+    try:
+        if class_id:
+            query = """
+                SELECT 
+                    ClassRank as 班级排名,
+                    StudentID as 学号,
+                    StudentName as 姓名,
+                    ClassName as 班级,
+                    PhysicalScore as 体测成绩,
+                    MoralScore as 品德表现,
+                    GPA as 绩点,
+                    AcademicScore as 学业成绩,
+                    InnovationTotalScore as 创新实践,
+                    SocialTotalScore as 社会实践,
+                    CulturalSportsScore as 文体实践,
+                    TotalScore as 总积分
+                FROM v_ComprehensiveEvaluationDetails
+                WHERE AcademicYear = ? AND Semester = ? AND StudentID IN (
+                    SELECT StudentID FROM Students WHERE ClassID = ?
+                )
+                ORDER BY ClassRank
+            """
+            df = pd.read_sql(query, conn, params=(academic_year, semester, class_id))
+        else:
+            query = """
+                SELECT 
+                    GradeRank as 年级排名,
+                    ClassRank as 班级排名,
+                    StudentID as 学号,
+                    StudentName as 姓名,
+                    ClassName as 班级,
+                    PhysicalScore as 体测成绩,
+                    MoralScore as 品德表现,
+                    GPA as 绩点,
+                    AcademicScore as 学业成绩,
+                    InnovationTotalScore as 创新实践,
+                    SocialTotalScore as 社会实践,
+                    CulturalSportsScore as 文体实践,
+                    TotalScore as 总积分
+                FROM v_ComprehensiveEvaluationDetails
+                WHERE AcademicYear = ? AND Semester = ?
+                ORDER BY GradeRank
+            """
+            df = pd.read_sql(query, conn, params=(academic_year, semester))
+    finally:
+        # 查询失败时同样要把连接还给连接池
+        conn.close()
     
     # 将 DataFrame 写入内存中的 Excel 文件
     output = io.BytesIO()
@@ -364,6 +395,13 @@ def export_comprehensive(academic_year: str, semester: int, class_id: Optional[i
     return Response(content=output.getvalue(), headers=headers, 
                    media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
 
+# === 运行监控 ===
+
+@app.get("/api/monitor/pool")
+def get_pool_stats():
+    """数据库连接池统计信息"""
+    return db_pool.stats()
+
 if __name__ == "__main__":
     import uvicorn
     # 启动服务器，端口 8000
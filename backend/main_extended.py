@@ -1,12 +1,34 @@
-from fastapi import FastAPI, HTTPException, Response
+from fastapi import Depends, FastAPI, File, Header, HTTPException, Query, UploadFile
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
-import pyodbc
-import pandas as pd
-import io
+import os
 from datetime import datetime
 
+from academic import recalculate_academic
+from auth import DEFAULT_PASSWORD, InvalidToken, PasswordHasher, SessionStore, default_password_hash
+from db_executor import DBExecutor
+from db_pool import ConnectionPool, PoolTimeout
+from evaluation_batch import upsert_evaluation, upsert_evaluations
+from evaluation_detail import MAX_BATCH_STUDENTS, fetch_details
+from event_log import EventLogger, RequestIdMiddleware
+from exporters import (
+    EXPORT_FORMATS, ROW_STREAMERS, ClosingStream, build_export_query, iter_file,
+    open_stream_slot, release_stream_slot, write_parquet, write_xlsx,
+)
+from metrics import PROMETHEUS_MEDIA_TYPE, Metrics, MetricsMiddleware, timed
+from pagination import MAX_PAGE_SIZE, CountCache, decode_cursor, encode_cursor, next_cursor
+from query_log import QueryLog
+from ranking import RANKING_MODES, full_rankings, incremental_rankings, verify_rankings
+from result_cache import VersionedCache
+from scoring import recalculate_scores
+from search_index import StudentSearchIndex
+from serializer import (
+    FastJSONResponse, encode_json, query_scalar, query_table, table_content,
+)
+from storage import create_storage
+
 app = FastAPI()
 
 # --- 配置 CORS ---
@@ -18,6 +40,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --- 运行指标 ---
+# 各接口请求数、延迟直方图和耗时构成，/metrics 以 Prometheus 文本格式输出
+metrics = Metrics()
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+# --- 请求号与事件日志 ---
+# 响应头 X-Request-ID 与日志中的 requestId 对应；日志由后台线程批量写入 GRADE_LOG_PATH
+app.add_middleware(RequestIdMiddleware)
+event_log = EventLogger.from_env()
+
 # --- 数据库连接配置 ---
 conn_str = (
     "DRIVER={ODBC Driver 17 for SQL Server};"
@@ -26,14 +58,76 @@ conn_str = (
     "Trusted_Connection=yes;"
 )
 
+# --- 存储后端 ---
+# 默认 SQL Server；设置环境变量 GRADE_DB_BACKEND=sqlite 使用嵌入式 SQLite（GRADE_DB_PATH 指定数据库文件）
+storage = create_storage(conn_str)
+dialect = storage.dialect
+
+# --- 慢查询日志 ---
+# 统计每条语句的耗时，超过 GRADE_SLOW_QUERY_MS（默认 100 毫秒）的记录参数并抓取执行计划
+query_log = QueryLog(
+    dialect,
+    threshold_ms=float(os.environ.get("GRADE_SLOW_QUERY_MS", "100")),
+    max_statements=500,
+    plan_ttl=600.0,
+    event_log=event_log,
+)
+
+# --- 数据库连接池 ---
+# 连接在请求之间复用，conn.close() 会把连接归还连接池
+db_pool = ConnectionPool(
+    query_log.wrap(storage.connect),
+    min_size=2,
+    max_size=20,
+    timeout=5.0,          # 借出连接最多等待的秒数
+    max_uses=1000,        # 连接借出 1000 次后重建
+    max_lifetime=1800.0,  # 连接存活 30 分钟后重建
+    reset_sql=dialect.reset_sql,  # 归还时恢复会话选项（SQL Server 的 SET NOCOUNT 等）
+)
+
 def get_db_connection():
     try:
-        conn = pyodbc.connect(conn_str)
-        return conn
+        return db_pool.acquire()
+    except PoolTimeout as e:
+        event_log.log("get_db_connection", "数据库连接池繁忙", {"error": str(e)}, level="warning")
+        raise HTTPException(status_code=503, detail="数据库繁忙，请稍后重试")
     except Exception as e:
-        print(f"数据库连接失败: {e}")
+        event_log.log("get_db_connection", "数据库连接失败", {"error": str(e)}, level="error")
         raise HTTPException(status_code=500, detail="数据库连接失败")
 
+# --- 数据库执行器 ---
+# 访问数据库的接口都在这个线程池中执行，线程数与连接池上限一致；
+# 排队已满的请求直接返回 503 + Retry-After
+db_executor = DBExecutor(max_workers=db_pool.max_size, max_queue=200, queue_timeout=10.0)
+
+# 学生、课程列表总数缓存，增改后失效
+count_cache = CountCache(ttl=60.0)
+
+# 排名列表、学生综测详情缓存；综测、加分、排名、学生信息写入后调用 result_cache.bump() 作废
+result_cache = VersionedCache(max_entries=2048, ttl=600.0)
+
+# --- 会话与密码哈希 ---
+# 令牌有效期 8 小时；校验令牌不访问数据库，禁用账号时作废该用户的令牌
+sessions = SessionStore(ttl=8 * 3600, max_entries=10000)
+password_hasher = PasswordHasher(max_workers=4, max_pending=64)
+
+@app.on_event("startup")
+def warmup_db_pool():
+    try:
+        storage.initialize()
+        db_pool.warmup()
+    except Exception as e:
+        # 数据库暂不可用时不阻止服务启动，首次请求时再建立连接
+        event_log.log("startup", "数据库连接池预热失败", {"error": str(e)}, level="warning")
+
+@app.on_event("shutdown")
+def close_db_pool():
+    db_executor.shutdown()
+    password_hasher.shutdown()
+    db_pool.close_all()
+    query_log.close()
+    event_log.close()
+
 # --- Pydantic 数据模型 ---
 
 class LoginRequest(BaseModel):
@@ -88,9 +182,120 @@ class BonusDetailInput(BaseModel):
     score: float
     description: Optional[str] = None
 
+class ScoreParams(BaseModel):
+    academic_year: str
+    semester: int
+
+class AcademicParams(BaseModel):
+    academic_year: str
+    semester: int
+    student_ids: Optional[List[int]] = None  # 不填则计算整个学期
+
+class GradeScoresInput(BaseModel):
+    regular_score: Optional[float] = None
+    midterm_score: Optional[float] = None
+    final_score: Optional[float] = None
+
+class StudentDetailBatchParams(BaseModel):
+    academic_year: str
+    semester: int
+    student_ids: List[int]
+
 class RankingParams(BaseModel):
     academic_year: str
     semester: int
+    mode: Optional[str] = "incremental"  # incremental: 只重算变化涉及的班级和分数段；full: 全量重算
+
+# --- 学生搜索索引 ---
+
+def load_student_index(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT ClassID, ClassName FROM Classes")
+    classes = cursor.fetchall()
+    cursor.execute("SELECT StudentID, Name, ClassID FROM Students")
+    students = cursor.fetchall()
+    return classes, students
+
+student_index = StudentSearchIndex(load_student_index)
+
+def refresh_student_index(cursor, student_id, name, class_id):
+    """学生增改提交后增量更新搜索索引；失败时不影响已提交的写入，索引改为下次搜索时整体重建"""
+    if not student_index.loaded:
+        return
+    try:
+        class_name = None
+        if not student_index.has_class(class_id):
+            cursor.execute("SELECT ClassName FROM Classes WHERE ClassID = ?", (class_id,))
+            row = cursor.fetchone()
+            class_name = row[0] if row else None
+        student_index.upsert(student_id, name, class_id, class_name)
+    except Exception as e:
+        student_index.invalidate()
+        event_log.log("refresh_student_index", "搜索索引增量更新失败，改为整体重建",
+                      {"student_id": student_id, "error": str(e)}, level="warning")
+
+def fetch_students_by_ids(conn, student_ids):
+    """按给定顺序返回学生列表，格式同 query_table：(列名, 行列表)，学号为第一列"""
+    if not student_ids:
+        return [], []
+    placeholders = ", ".join("?" * len(student_ids))
+    sql = f"""
+        SELECT 
+            s.StudentID, s.Name, s.Major, s.Gender, s.Hometown, s.Phone, 
+            s.Email, s.EnrollmentDate, s.Status, c.ClassName,
+            s.CreatedAt, s.UpdatedAt
+        FROM Students s
+        LEFT JOIN Classes c ON s.ClassID = c.ClassID
+        WHERE s.StudentID IN ({placeholders})
+    """
+    columns, rows = query_table(conn, sql, list(student_ids))
+    position = {student_id: i for i, student_id in enumerate(student_ids)}
+    rows.sort(key=lambda row: position[int(row[0])])
+    return columns, rows
+
+# --- 会话校验 ---
+# 请求头 Authorization: Bearer <令牌>；只校验签名和进程内的会话缓存，不查询数据库
+
+def bearer_token(authorization):
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token.strip()
+
+async def optional_session(authorization: Optional[str] = Header(None)):
+    """未携带令牌时返回 None；携带了无效令牌返回 401"""
+    if authorization is None:
+        return None
+    token = bearer_token(authorization)
+    if token is None:
+        raise HTTPException(status_code=401, detail="无效的认证信息", headers={"WWW-Authenticate": "Bearer"})
+    try:
+        return sessions.authenticate(token)
+    except InvalidToken as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+
+async def current_session(session=Depends(optional_session)):
+    if session is None:
+        raise HTTPException(status_code=401, detail="请先登录", headers={"WWW-Authenticate": "Bearer"})
+    return session
+
+def require_role(*roles):
+    """限定角色的依赖，如 Depends(require_role('Admin'))"""
+    async def check(session=Depends(current_session)):
+        if session.role not in roles:
+            raise HTTPException(status_code=403, detail="没有权限")
+        return session
+    return check
+
+# 只有管理员能调用的接口：学生和课程的增删改、整学期重算、用户列表和清空慢查询统计
+ADMIN_ONLY = [Depends(require_role("Admin"))]
+# 教师和管理员能调用的接口：录入综测、加分和成绩，计算排名，导出
+STAFF_ONLY = [Depends(require_role("Admin", "Teacher"))]
+
+def check_student_access(session, student_ids):
+    """学生只能查看本人（令牌中的 RelatedID）的数据"""
+    if session.role == 'Student' and any(student_id != session.related_id for student_id in student_ids):
+        raise HTTPException(status_code=403, detail="只能查看本人的数据")
 
 # --- API 接口 ---
 
@@ -100,31 +305,83 @@ def read_root():
 
 # === 用户认证相关 ===
 
-@app.post("/api/login")
-def login(request: LoginRequest):
+@db_executor.bounded(name="login", concurrency=8)
+def load_login_user(username):
     conn = get_db_connection()
     cursor = conn.cursor()
-    
     try:
         cursor.execute("SELECT UserID, Role, RelatedID, PasswordHash FROM Users WHERE Username=?", 
-                       (request.username,))
-        user = cursor.fetchone()
+                       (username,))
+        return cursor.fetchone()
+    finally:
+        conn.close()
+
+@db_executor.bounded(name="login_rehash", concurrency=2)
+def save_password_hash(user_id, old_hash, new_hash):
+    """旧密码记录升级为新哈希；期间密码被修改或账号被禁用则不覆盖"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("UPDATE Users SET PasswordHash=? WHERE UserID=? AND PasswordHash=?",
+                       (new_hash, user_id, old_hash))
+        conn.commit()
+    finally:
+        conn.close()
+
+@app.post("/api/login")
+async def login(request: LoginRequest):
+    """登录成功返回会话令牌，之后的请求在请求头中携带 Authorization: Bearer <token>"""
+    try:
+        user = await load_login_user(request.username)
         
         if not user:
             raise HTTPException(status_code=401, detail="用户不存在")
         
-        if user.PasswordHash != request.password:
+        # 密码哈希在单独的线程池中校验，不阻塞事件循环
+        ok, needs_rehash = await password_hasher.verify(request.password, user.PasswordHash)
+        if not ok:
             raise HTTPException(status_code=401, detail="密码错误")
         
-        return {"status": "success", "role": user.Role, "related_id": user.RelatedID}
+        if needs_rehash:
+            try:
+                new_hash = await password_hasher.hash(request.password)
+                await save_password_hash(user.UserID, user.PasswordHash, new_hash)
+            except Exception as e:
+                # 升级失败不影响本次登录，下次登录再试
+                event_log.log("login", "密码哈希升级失败", {"user_id": user.UserID, "error": str(e)},
+                              level="warning")
         
+        token, session = sessions.issue(user.UserID, user.Role, user.RelatedID)
+        return {
+            "status": "success",
+            "role": user.Role,
+            "related_id": user.RelatedID,
+            "token": token,
+            "token_type": "bearer",
+            "expires_in": sessions.ttl,
+        }
+        
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"登录错误: {e}")
+        event_log.log("login", "登录错误", {"username": request.username, "error": str(e)}, level="error")
         raise HTTPException(status_code=500, detail=f"登录失败: {str(e)}")
-    finally:
-        conn.close()
 
-@app.get("/api/test/users")
+@app.post("/api/logout")
+async def logout(authorization: Optional[str] = Header(None)):
+    """注销当前令牌"""
+    token = bearer_token(authorization)
+    if token is None or not sessions.revoke(token):
+        raise HTTPException(status_code=401, detail="未登录或登录已失效")
+    return {"message": "已退出登录"}
+
+@app.get("/api/session")
+async def get_session(session=Depends(current_session)):
+    """当前令牌对应的用户信息"""
+    return session.to_dict()
+
+@app.get("/api/test/users", dependencies=ADMIN_ONLY)
+@db_executor.bounded(concurrency=2, queue=4)
 def test_users():
     """测试接口：查看所有用户"""
     conn = get_db_connection()
@@ -147,7 +404,8 @@ def test_users():
 
 # === 学生信息管理 ===
 
-@app.post("/api/students/add")
+@app.post("/api/students/add", dependencies=ADMIN_ONLY)
+@db_executor.bounded(concurrency=8)
 def add_student(data: StudentInput):
     """新增学生"""
     conn = get_db_connection()
@@ -173,66 +431,147 @@ def add_student(data: StudentInput):
         # 创建用户账号
         cursor.execute("""
             INSERT INTO Users (Username, PasswordHash, Role, RelatedID)
-            VALUES (?, '123456', 'Student', ?)
-        """, (str(data.student_id), data.student_id))
+            VALUES (?, ?, 'Student', ?)
+        """, (str(data.student_id), default_password_hash(DEFAULT_PASSWORD), data.student_id))
         
         conn.commit()
-        return {"message": "学生添加成功"}
     except Exception as e:
         conn.rollback()
         raise HTTPException(status_code=400, detail=str(e))
+    else:
+        # 写入已提交，以下缓存与索引维护不再走回滚分支
+        count_cache.invalidate("Students")
+        refresh_student_index(cursor, data.student_id, data.name, data.class_id)
+        return {"message": "学生添加成功"}
+    finally:
+        conn.close()
+
+# 批量导入依赖 pandas，只在导入接口中加载，其余接口和服务启动不需要导入 pandas
+
+def run_student_import(df):
+    from student_import import import_students
+
+    conn = get_db_connection()
+    try:
+        report = import_students(conn, df, dialect)
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
     finally:
         conn.close()
+    if report["inserted"]:
+        count_cache.invalidate("Students")
+        student_index.invalidate()
+    return report
+
+@app.post("/api/students/import", dependencies=ADMIN_ONLY)
+@db_executor.bounded(concurrency=2, queue=4, queue_timeout=30.0)
+def import_students_file(file: UploadFile = File(...)):
+    """批量导入学生（CSV / Excel 文件），返回成功数和每行的错误原因"""
+    from student_import import ImportFormatError, read_upload
+
+    try:
+        df = read_upload(file.filename, file.file.read())
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return run_student_import(df)
+
+@app.post("/api/students/batch", dependencies=ADMIN_ONLY)
+@db_executor.bounded(concurrency=2, queue=4, queue_timeout=30.0)
+def import_students_json(data: List[StudentInput]):
+    """批量导入学生（JSON 数组），返回格式与文件导入相同"""
+    if not data:
+        raise HTTPException(status_code=400, detail="导入数据为空")
+    from student_import import read_records
+
+    df = read_records([item.dict() for item in data])
+    return run_student_import(df)
 
 @app.get("/api/students/list")
-def get_students(page: int = 1, size: int = 20, search: Optional[str] = None):
-    """获取学生列表"""
+@db_executor.bounded()
+def get_students(page: int = Query(1, ge=1), size: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+                 search: Optional[str] = None, cursor: Optional[str] = None,
+                 with_total: Optional[bool] = None, compact: bool = False):
+    """获取学生列表
+
+    - 传 page 为页码分页（兼容原有接口）
+    - 传 cursor 为游标分页：第一页传空字符串，之后传上一页返回的 next_cursor
+    - with_total 控制是否返回总数，页码分页默认返回，游标分页默认不返回；总数会短时间缓存
+    - 传 search 时走内存搜索索引（姓名子串、拼音首字母、学号前缀、班级名称），按相关度排序
+    - compact 为 true 时 students 为 {"columns": 列名, "rows": 行数组}
+    """
+    try:
+        after = decode_cursor(cursor) if cursor is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if with_total is None:
+        with_total = cursor is None
+    
     conn = get_db_connection()
     try:
-        offset = (page - 1) * size
-        
-        where_clause = ""
-        params = []
         if search:
-            where_clause = "WHERE s.Name LIKE ? OR CAST(s.StudentID AS NVARCHAR) LIKE ? OR c.ClassName LIKE ?"
-            search_param = f"%{search}%"
-            params = [search_param, search_param, search_param]
+            # 搜索结果是按相关度排好序的学号列表，游标记录在列表中的位置
+            student_index.ensure_loaded(conn)
+            ids = student_index.search(search)
+            start = int(after or 0) if cursor is not None else (page - 1) * size
+            result = {
+                "students": table_content(*fetch_students_by_ids(conn, ids[start:start + size]), compact),
+                "next_cursor": encode_cursor(start + size) if start + size < len(ids) else None,
+                "size": size,
+            }
+            if cursor is None:
+                result["page"] = page
+            if with_total:
+                result["total"] = len(ids)
+            return FastJSONResponse(result)
         
-        # 获取总数
-        count_sql = f"""
-            SELECT COUNT(*) FROM Students s
-            LEFT JOIN Classes c ON s.ClassID = c.ClassID
-            {where_clause}
-        """
-        total = pd.read_sql(count_sql, conn, params=params).iloc[0, 0]
-        
-        # 获取数据
-        data_sql = f"""
-            SELECT 
+        columns = """
                 s.StudentID, s.Name, s.Major, s.Gender, s.Hometown, s.Phone, 
                 s.Email, s.EnrollmentDate, s.Status, c.ClassName,
-                s.CreatedAt, s.UpdatedAt
+                s.CreatedAt, s.UpdatedAt"""
+        if cursor is not None:
+            # 游标分页：从上一页最后一个学号之后开始，走主键索引定位
+            where_clause = "WHERE s.StudentID > ?" if after is not None else ""
+            params = [after] if after is not None else []
+            offset = 0
+        else:
+            where_clause = ""
+            params = []
+            offset = (page - 1) * size
+        page_clause, page_params = dialect.page(offset, size + 1)
+        data_sql = f"""
+            SELECT {columns}
             FROM Students s
             LEFT JOIN Classes c ON s.ClassID = c.ClassID
             {where_clause}
             ORDER BY s.StudentID
-            OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
+            {page_clause}
         """
-        params.extend([offset, size])
-        df = pd.read_sql(data_sql, conn, params=params)
+        params += page_params
         
-        return {
-            "students": df.to_dict('records'),
-            "total": int(total),
-            "page": page,
-            "size": size
+        # 多取一行判断是否还有下一页
+        names, students = query_table(conn, data_sql, params)
+        token = next_cursor(students, size, lambda row: int(row[0]))
+        result = {
+            "students": table_content(names, students, compact),
+            "next_cursor": token,
+            "size": size,
         }
+        if cursor is None:
+            result["page"] = page
+        if with_total:
+            result["total"] = count_cache.get(
+                ("Students", None),
+                lambda: query_scalar(conn, "SELECT COUNT(*) FROM Students"),
+            )
+        return FastJSONResponse(result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         conn.close()
 
-@app.put("/api/students/{student_id}")
+@app.put("/api/students/{student_id}", dependencies=ADMIN_ONLY)
+@db_executor.bounded(concurrency=8)
 def update_student(student_id: int, data: StudentInput):
     """修改学生信息"""
     conn = get_db_connection()
@@ -255,14 +594,19 @@ def update_student(student_id: int, data: StudentInput):
             raise HTTPException(status_code=404, detail="学生不存在")
         
         conn.commit()
-        return {"message": "学生信息更新成功"}
     except Exception as e:
         conn.rollback()
         raise HTTPException(status_code=400, detail=str(e))
+    else:
+        count_cache.invalidate("Students")
+        result_cache.bump()
+        refresh_student_index(cursor, student_id, data.name, data.class_id)
+        return {"message": "学生信息更新成功"}
     finally:
         conn.close()
 
-@app.delete("/api/students/{student_id}")
+@app.delete("/api/students/{student_id}", dependencies=ADMIN_ONLY)
+@db_executor.bounded(concurrency=8)
 def delete_student(student_id: int):
     """删除学生（逻辑删除）"""
     conn = get_db_connection()
@@ -278,22 +622,30 @@ def delete_student(student_id: int):
             raise HTTPException(status_code=404, detail="学生不存在")
         
         # 禁用用户账号
+        cursor.execute("SELECT UserID FROM Users WHERE RelatedID=? AND Role='Student'", (student_id,))
+        user_ids = [row[0] for row in cursor.fetchall()]
         cursor.execute("""
             UPDATE Users SET PasswordHash='DISABLED' 
             WHERE RelatedID=? AND Role='Student'
         """, (student_id,))
         
         conn.commit()
-        return {"message": "学生删除成功"}
     except Exception as e:
         conn.rollback()
         raise HTTPException(status_code=400, detail=str(e))
+    else:
+        result_cache.bump()
+        # 已登录的会话立即失效
+        for user_id in user_ids:
+            sessions.revoke_user(user_id)
+        return {"message": "学生删除成功"}
     finally:
         conn.close()
 
 # === 课程信息管理 ===
 
-@app.post("/api/courses/add")
+@app.post("/api/courses/add", dependencies=ADMIN_ONLY)
+@db_executor.bounded(concurrency=8)
 def add_course(data: CourseInput):
     """新增课程"""
     conn = get_db_connection()
@@ -317,56 +669,89 @@ def add_course(data: CourseInput):
         ))
         
         conn.commit()
-        return {"message": "课程添加成功"}
     except Exception as e:
         conn.rollback()
         raise HTTPException(status_code=400, detail=str(e))
+    else:
+        count_cache.invalidate("Courses")
+        return {"message": "课程添加成功"}
     finally:
         conn.close()
 
 @app.get("/api/courses/list")
-def get_courses(page: int = 1, size: int = 20, search: Optional[str] = None):
-    """获取课程列表"""
+@db_executor.bounded()
+def get_courses(page: int = Query(1, ge=1), size: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+                search: Optional[str] = None, cursor: Optional[str] = None,
+                with_total: Optional[bool] = None, compact: bool = False):
+    """获取课程列表，分页参数（含 compact）与学生列表相同，游标按课程编号排序"""
+    try:
+        after = decode_cursor(cursor) if cursor is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if with_total is None:
+        with_total = cursor is None
+    
     conn = get_db_connection()
     try:
-        offset = (page - 1) * size
-        
-        where_clause = ""
+        conditions = []
         params = []
         if search:
-            where_clause = "WHERE CourseCode LIKE ? OR CourseName LIKE ? OR Department LIKE ?"
+            conditions.append("(CourseCode LIKE ? OR CourseName LIKE ? OR Department LIKE ?)")
             search_param = f"%{search}%"
             params = [search_param, search_param, search_param]
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
         
         # 获取总数
-        count_sql = f"SELECT COUNT(*) FROM Courses {where_clause}"
-        total = pd.read_sql(count_sql, conn, params=params).iloc[0, 0]
+        total = None
+        if with_total:
+            count_sql = f"SELECT COUNT(*) FROM Courses {where_clause}"
+            total = count_cache.get(
+                ("Courses", search),
+                lambda: query_scalar(conn, count_sql, params),
+            )
         
-        # 获取数据
-        data_sql = f"""
-            SELECT 
+        columns = """
                 CourseID, CourseCode, CourseName, Credits, Hours, CourseType,
-                Department, Prerequisites, Description, Status, CreatedAt, UpdatedAt
+                Department, Prerequisites, Description, Status, CreatedAt, UpdatedAt"""
+        if cursor is not None:
+            # 游标分页：从上一页最后一个课程编号之后开始，走唯一索引定位
+            if after is not None:
+                conditions.append("CourseCode > ?")
+                params.append(after)
+            where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            offset = 0
+        else:
+            offset = (page - 1) * size
+        page_clause, page_params = dialect.page(offset, size + 1)
+        data_sql = f"""
+            SELECT {columns}
             FROM Courses
             {where_clause}
             ORDER BY CourseCode
-            OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
+            {page_clause}
         """
-        params.extend([offset, size])
-        df = pd.read_sql(data_sql, conn, params=params)
+        params.extend(page_params)
         
-        return {
-            "courses": df.to_dict('records'),
-            "total": int(total),
-            "page": page,
-            "size": size
+        # 多取一行判断是否还有下一页
+        names, courses = query_table(conn, data_sql, params)
+        token = next_cursor(courses, size, lambda row: str(row[1]))
+        result = {
+            "courses": table_content(names, courses, compact),
+            "next_cursor": token,
+            "size": size,
         }
+        if cursor is None:
+            result["page"] = page
+        if total is not None:
+            result["total"] = total
+        return FastJSONResponse(result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         conn.close()
 
-@app.put("/api/courses/{course_id}")
+@app.put("/api/courses/{course_id}", dependencies=ADMIN_ONLY)
+@db_executor.bounded(concurrency=8)
 def update_course(course_id: int, data: CourseInput):
     """修改课程信息"""
     conn = get_db_connection()
@@ -388,14 +773,17 @@ def update_course(course_id: int, data: CourseInput):
             raise HTTPException(status_code=404, detail="课程不存在")
         
         conn.commit()
-        return {"message": "课程信息更新成功"}
     except Exception as e:
         conn.rollback()
         raise HTTPException(status_code=400, detail=str(e))
+    else:
+        count_cache.invalidate("Courses")
+        return {"message": "课程信息更新成功"}
     finally:
         conn.close()
 
-@app.delete("/api/courses/{course_id}")
+@app.delete("/api/courses/{course_id}", dependencies=ADMIN_ONLY)
+@db_executor.bounded(concurrency=8)
 def delete_course(course_id: int):
     """删除课程（逻辑删除）"""
     conn = get_db_connection()
@@ -419,39 +807,17 @@ def delete_course(course_id: int):
 
 # === 综合测评相关（保持原有功能） ===
 
-@app.post("/api/evaluation/add")
+@app.post("/api/evaluation/add", dependencies=STAFF_ONLY)
+@db_executor.bounded(concurrency=8)
 def add_evaluation(data: ComprehensiveEvaluationInput):
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        sql = """
-        IF EXISTS (SELECT 1 FROM ComprehensiveEvaluations WHERE StudentID=? AND AcademicYear=? AND Semester=?)
-            UPDATE ComprehensiveEvaluations SET 
-                PhysicalScore=?, MoralScore=?, GPA=?, AcademicScore=?,
-                InnovationBasicScore=?, InnovationBonusScore=?,
-                StudentWorkScore=?, SocialServiceScore=?, SocialRewardScore=?,
-                CulturalSportsScore=?, UpdatedAt=GETDATE()
-            WHERE StudentID=? AND AcademicYear=? AND Semester=?
-        ELSE
-            INSERT INTO ComprehensiveEvaluations (
-                StudentID, AcademicYear, Semester, PhysicalScore, MoralScore, GPA, AcademicScore,
-                InnovationBasicScore, InnovationBonusScore, StudentWorkScore, 
-                SocialServiceScore, SocialRewardScore, CulturalSportsScore
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
-        cursor.execute(sql, 
-                       (data.student_id, data.academic_year, data.semester,
-                        data.physical_score, data.moral_score, data.gpa, data.academic_score,
-                        data.innovation_basic_score, data.innovation_bonus_score,
-                        data.student_work_score, data.social_service_score, data.social_reward_score,
-                        data.cultural_sports_score,
-                        data.student_id, data.academic_year, data.semester,
-                        data.student_id, data.academic_year, data.semester,
-                        data.physical_score, data.moral_score, data.gpa, data.academic_score,
-                        data.innovation_basic_score, data.innovation_bonus_score,
-                        data.student_work_score, data.social_service_score, data.social_reward_score,
-                        data.cultural_sports_score))
+        # 一条 MERGE（SQLite 为 INSERT ... ON CONFLICT）完成新增或更新，并发录入同一学生也不会重复插入
+        upsert_evaluation(cursor, data, dialect)
+        recalculate_scores(conn, data.academic_year, data.semester, [data.student_id], dialect)
         conn.commit()
+        result_cache.bump()
         return {"message": "综合测评数据录入成功"}
     except Exception as e:
         conn.rollback()
@@ -459,7 +825,95 @@ def add_evaluation(data: ComprehensiveEvaluationInput):
     finally:
         conn.close()
 
-@app.post("/api/bonus/add")
+@app.post("/api/evaluation/batch", dependencies=STAFF_ONLY)
+@db_executor.bounded(concurrency=4, queue=8, queue_timeout=30.0)
+def add_evaluations_batch(data: List[ComprehensiveEvaluationInput]):
+    """批量录入综测数据（整班或整学期），一条 MERGE 在一个事务内完成新增或更新"""
+    if not data:
+        raise HTTPException(status_code=400, detail="录入数据为空")
+    conn = get_db_connection()
+    try:
+        report = upsert_evaluations(conn, data, dialect)
+        if report["inserted"] or report["updated"]:
+            result_cache.bump()
+        return report
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        conn.close()
+
+# 重新计算整个学期的创新实践、社会实践总分和总积分（用于修复直接改库导致的总分过期）
+@app.post("/api/evaluation/recalculate", dependencies=ADMIN_ONLY)
+@db_executor.bounded(concurrency=1, queue=2)
+def recalculate_evaluation_scores(params: ScoreParams):
+    conn = get_db_connection()
+    try:
+        report = recalculate_scores(conn, params.academic_year, params.semester, dialect=dialect)
+        conn.commit()
+        if report["updated"]:
+            result_cache.bump()
+        return {"message": f"{params.academic_year}学年第{params.semester}学期总分计算完成", **report}
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
+
+# 由成绩表计算 GPA 和学业成绩考核分，写回综测记录并更新总积分
+@app.post("/api/evaluation/academic/recalculate", dependencies=ADMIN_ONLY)
+@db_executor.bounded(concurrency=1, queue=2)
+def recalculate_evaluation_academic(params: AcademicParams):
+    conn = get_db_connection()
+    try:
+        report = recalculate_academic(conn, params.academic_year, params.semester, params.student_ids, dialect)
+        conn.commit()
+        if report["updated"]:
+            result_cache.bump()
+        return {"message": f"{params.academic_year}学年第{params.semester}学期学业成绩计算完成", **report}
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
+
+@app.put("/api/grades/{grade_id}", dependencies=STAFF_ONLY)
+@db_executor.bounded(concurrency=8)
+def update_grade(grade_id: int, data: GradeScoresInput):
+    """修改一门课程的成绩，并在同一事务中重新计算该学生当学期的 GPA、学业成绩和总积分"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            UPDATE Grades SET RegularScore=?, MidtermScore=?, FinalScore=?, UpdatedAt=GETDATE()
+            WHERE GradeID=?
+        """, (data.regular_score, data.midterm_score, data.final_score, grade_id))
+        if cursor.rowcount == 0:
+            raise HTTPException(status_code=404, detail="成绩不存在")
+        cursor.execute("""
+            SELECT g.StudentID, o.AcademicYear, o.Semester
+            FROM Grades g
+            LEFT JOIN CourseOfferings o ON g.OfferingID = o.OfferingID
+            WHERE g.GradeID = ?
+        """, (grade_id,))
+        student_id, academic_year, semester = cursor.fetchone()
+        report = None
+        if academic_year is not None:
+            report = recalculate_academic(conn, academic_year, semester, [student_id], dialect)
+        conn.commit()
+        if report and report["updated"]:
+            result_cache.bump()
+        return {"message": "成绩修改成功", "academic": report}
+    except HTTPException:
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        conn.close()
+
+@app.post("/api/bonus/add", dependencies=STAFF_ONLY)
+@db_executor.bounded(concurrency=8)
 def add_bonus_detail(data: BonusDetailInput):
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -471,6 +925,7 @@ def add_bonus_detail(data: BonusDetailInput):
         cursor.execute(sql, (data.evaluation_id, data.category, data.item_name, 
                            data.score, data.description))
         conn.commit()
+        result_cache.bump()
         return {"message": "加分项目添加成功"}
     except Exception as e:
         conn.rollback()
@@ -478,135 +933,281 @@ def add_bonus_detail(data: BonusDetailInput):
     finally:
         conn.close()
 
-@app.post("/api/ranking/calculate")
+# 排名计算会更新整个学期的数据，同一时间只执行一个
+@app.post("/api/ranking/calculate", dependencies=STAFF_ONLY)
+@db_executor.bounded(concurrency=1, queue=2)
 def calculate_rankings(params: RankingParams):
+    if params.mode not in RANKING_MODES:
+        raise HTTPException(status_code=400, detail=f"mode 只能是 {', '.join(RANKING_MODES)}")
     conn = get_db_connection()
-    cursor = conn.cursor()
     try:
-        sql = "{CALL sp_CalculateRankings (?, ?)}"
-        cursor.execute(sql, (params.academic_year, params.semester))
+        if params.mode == "full":
+            report = full_rankings(conn, params.academic_year, params.semester, dialect)
+        else:
+            report = incremental_rankings(conn, params.academic_year, params.semester, dialect)
         conn.commit()
-        return {"message": f"{params.academic_year}学年第{params.semester}学期排名计算完成"}
+        result_cache.bump()
+        return {"message": f"{params.academic_year}学年第{params.semester}学期排名计算完成", **report}
     except Exception as e:
         conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         conn.close()
 
-@app.get("/api/ranking/list")
-def get_rankings(academic_year: str, semester: int, limit: Optional[int] = 50, role: Optional[str] = None):
+# 按全量规则核对已保存的名次，用于确认增量计算与全量计算结果一致
+@app.get("/api/ranking/verify")
+@db_executor.bounded(concurrency=1, queue=2)
+def check_rankings(academic_year: str, semester: int):
     conn = get_db_connection()
     try:
-        # 学生角色只能看前10名
-        if role == 'Student' and (limit is None or limit > 10):
-            limit = 10
-            
-        query = """
-            SELECT TOP (?) 
-                ClassRank, StudentName, TotalScore, GPA, AcademicScore,
-                InnovationTotalScore, SocialTotalScore, CulturalSportsScore
-            FROM v_ComprehensiveEvaluationDetails
-            WHERE AcademicYear = ? AND Semester = ?
-            ORDER BY ClassRank
-        """
-        df = pd.read_sql(query, conn, params=(limit, academic_year, semester))
-        return {"rankings": df.to_dict('records')}
+        return verify_rankings(conn, academic_year, semester)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         conn.close()
 
-@app.get("/api/student/{student_id}")
-def get_student_detail(student_id: int, academic_year: str, semester: int):
-    conn = get_db_connection()
+# 成绩公布后的访问高峰集中在这个接口
+@app.get("/api/ranking/list")
+@db_executor.bounded(concurrency=12, queue=150)
+def get_rankings(academic_year: str, semester: int, limit: Optional[int] = 50, compact: bool = False,
+                 session=Depends(optional_session)):
+    """排名列表；compact 为 true 时 rankings 为 {"columns": 列名, "rows": 行数组}，缓存的是编码后的响应体
+
+    角色以会话为准；未携带令牌时按权限最小的学生角色处理
+    """
+    role = session.role if session is not None else 'Student'
+    # 学生角色只能看前10名
+    if role == 'Student' and (limit is None or limit > 10):
+        limit = 10
+
+    def load():
+        conn = get_db_connection()
+        try:
+            page_clause, page_params = dialect.page(0, limit)
+            query = f"""
+                SELECT 
+                    ClassRank, StudentName, TotalScore, GPA, AcademicScore,
+                    InnovationTotalScore, SocialTotalScore, CulturalSportsScore
+                FROM v_ComprehensiveEvaluationDetails
+                WHERE AcademicYear = ? AND Semester = ?
+                ORDER BY ClassRank
+                {page_clause}
+            """
+            columns, rows = query_table(conn, query, (academic_year, semester, *page_params))
+            return encode_json({"rankings": table_content(columns, rows, compact)})
+        finally:
+            conn.close()
+
     try:
-        query = """
-            SELECT * FROM v_ComprehensiveEvaluationDetails
-            WHERE StudentID = ? AND AcademicYear = ? AND Semester = ?
-        """
-        df = pd.read_sql(query, conn, params=(student_id, academic_year, semester))
-        
-        if df.empty:
+        return FastJSONResponse(result_cache.get(("rankings", academic_year, semester, limit, role, compact), load))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/student/{student_id}")
+@db_executor.bounded()
+def get_student_detail(student_id: int, academic_year: str, semester: int, session=Depends(current_session)):
+    """综测记录和加分明细一次查询取回；学生只能查看本人"""
+    check_student_access(session, [student_id])
+
+    def load():
+        conn = get_db_connection()
+        try:
+            details = fetch_details(conn, [student_id], academic_year, semester)
+        finally:
+            conn.close()
+        if student_id not in details:
             raise HTTPException(status_code=404, detail="学生数据不存在")
-        
-        student_info = df.iloc[0].to_dict()
-        
-        bonus_query = """
-            SELECT bd.Category, bd.ItemName, bd.Score, bd.Description
-            FROM BonusDetails bd
-            JOIN ComprehensiveEvaluations ce ON bd.EvaluationID = ce.EvaluationID
-            WHERE ce.StudentID = ? AND ce.AcademicYear = ? AND ce.Semester = ?
-        """
-        bonus_df = pd.read_sql(bonus_query, conn, params=(student_id, academic_year, semester))
-        student_info['bonus_details'] = bonus_df.to_dict('records')
-        
-        return student_info
+        return encode_json(details[student_id])
+
+    try:
+        return FastJSONResponse(result_cache.get(("student", academic_year, semester, student_id), load))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
 
-@app.get("/api/export/comprehensive")
-def export_comprehensive(academic_year: str, semester: int, class_id: Optional[int] = None):
-    conn = get_db_connection()
-    
-    if class_id:
-        query = """
-            SELECT 
-                ClassRank as 班级排名,
-                StudentID as 学号,
-                StudentName as 姓名,
-                ClassName as 班级,
-                PhysicalScore as 体测成绩,
-                MoralScore as 品德表现,
-                GPA as 绩点,
-                AcademicScore as 学业成绩,
-                InnovationTotalScore as 创新实践,
-                SocialTotalScore as 社会实践,
-                CulturalSportsScore as 文体实践,
-                TotalScore as 总积分
-            FROM v_ComprehensiveEvaluationDetails
-            WHERE AcademicYear = ? AND Semester = ? AND StudentID IN (
-                SELECT StudentID FROM Students WHERE ClassID = ?
-            )
-            ORDER BY ClassRank
-        """
-        df = pd.read_sql(query, conn, params=(academic_year, semester, class_id))
-    else:
-        query = """
-            SELECT 
-                GradeRank as 年级排名,
-                ClassRank as 班级排名,
-                StudentID as 学号,
-                StudentName as 姓名,
-                ClassName as 班级,
-                PhysicalScore as 体测成绩,
-                MoralScore as 品德表现,
-                GPA as 绩点,
-                AcademicScore as 学业成绩,
-                InnovationTotalScore as 创新实践,
-                SocialTotalScore as 社会实践,
-                CulturalSportsScore as 文体实践,
-                TotalScore as 总积分
-            FROM v_ComprehensiveEvaluationDetails
-            WHERE AcademicYear = ? AND Semester = ?
-            ORDER BY GradeRank
-        """
-        df = pd.read_sql(query, conn, params=(academic_year, semester))
-    
-    conn.close()
+@app.post("/api/student/details")
+@db_executor.bounded(concurrency=8)
+def get_student_details(params: StudentDetailBatchParams, session=Depends(current_session)):
+    """批量获取学生综测详情（如整班审核）：按请求顺序返回 details，没有综测记录的学号列在 missing 中
+
+    与单个查询共用缓存，未命中的学生一次查询取回；学生只能查询本人
+    """
+    student_ids = list(dict.fromkeys(params.student_ids))
+    check_student_access(session, student_ids)
+    if len(student_ids) > MAX_BATCH_STUDENTS:
+        raise HTTPException(status_code=400, detail=f"一次最多查询 {MAX_BATCH_STUDENTS} 名学生")
+
+    def load(keys):
+        conn = get_db_connection()
+        try:
+            details = fetch_details(conn, [key[3] for key in keys], params.academic_year, params.semester)
+        finally:
+            conn.close()
+        return {key: encode_json(details[key[3]]) for key in keys if key[3] in details}
+
+    try:
+        keys = [("student", params.academic_year, params.semester, student_id) for student_id in student_ids]
+        found = result_cache.get_many(keys, load)
+        # 缓存的是各学生编码后的 JSON，直接拼接为响应体
+        body = b"".join((
+            b'{"details":[', b",".join(found[key] for key in keys if key in found),
+            b'],"missing":', encode_json([key[3] for key in keys if key not in found]), b"}",
+        ))
+        return FastJSONResponse(body)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# 导出耗时长、占用内存多，限制并发并允许更长的排队时间
+@app.get("/api/export/comprehensive", dependencies=STAFF_ONLY)
+@db_executor.bounded(concurrency=2, queue=4, queue_timeout=30.0)
+def export_comprehensive(academic_year: str, semester: int, class_id: Optional[int] = None,
+                         format: str = "xlsx"):
+    """导出综测数据，format 可选 xlsx / csv / ndjson / parquet"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"不支持的导出格式: {format}")
     
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name=f'{academic_year}学年第{semester}学期综测')
+    streaming = format in ROW_STREAMERS
+    if streaming and not open_stream_slot():
+        raise HTTPException(status_code=503, detail="导出任务过多，请稍后重试",
+                            headers={"Retry-After": "5"})
+    try:
+        conn = get_db_connection()
+    except HTTPException:
+        if streaming:
+            release_stream_slot()
+        raise
     
-    output.seek(0)
+    try:
+        cursor = conn.cursor()
+        query, params = build_export_query(academic_year, semester, class_id)
+        with timed("db"):
+            cursor.execute(query, params)
+        if streaming:
+            # CSV / NDJSON 边读边发，发送完毕后才归还连接
+            body = ClosingStream(ROW_STREAMERS[format](cursor), conn)
+        elif format == "parquet":
+            body = iter_file(write_parquet(cursor))
+        else:
+            # 按块读取并写入只写工作簿，内存占用不随学生人数增长
+            body = iter_file(write_xlsx(cursor, sheet_name=f'{academic_year}学年第{semester}学期综测'))
+    except Exception as e:
+        conn.close()
+        if streaming:
+            release_stream_slot()
+        raise HTTPException(status_code=500, detail=str(e))
+    if not streaming:
+        conn.close()
     
     headers = {
-        'Content-Disposition': f'attachment; filename="comprehensive_evaluation_{academic_year}_S{semester}.xlsx"'
+        'Content-Disposition': f'attachment; filename="comprehensive_evaluation_{academic_year}_S{semester}.{format}"'
     }
-    return Response(content=output.getvalue(), headers=headers, 
-                   media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    return StreamingResponse(body, headers=headers, media_type=EXPORT_FORMATS[format])
+
+# === 运行监控 ===
+
+@app.get("/api/monitor/storage")
+def get_storage_info():
+    """当前使用的存储后端"""
+    return storage.describe()
+
+@app.get("/api/monitor/pool")
+def get_pool_stats():
+    """数据库连接池统计信息"""
+    return db_pool.stats()
+
+@app.get("/api/monitor/search-index")
+def get_search_index_stats():
+    """学生搜索索引统计信息"""
+    return student_index.stats()
+
+@app.get("/api/monitor/result-cache")
+def get_result_cache_stats():
+    """排名列表、学生详情缓存统计信息（命中率、条目数、数据版本）"""
+    return result_cache.stats()
+
+@app.get("/api/monitor/executor")
+def get_executor_stats():
+    """数据库执行器统计信息（各接口的并发、排队和拒绝次数）"""
+    return db_executor.stats()
+
+@app.get("/api/monitor/sessions")
+def get_session_stats():
+    """会话缓存与密码哈希线程池统计信息"""
+    return {"sessions": sessions.stats(), "password_hasher": password_hasher.stats()}
+
+@app.get("/api/monitor/slow-queries")
+def get_slow_queries(top: int = 20, order_by: str = "total"):
+    """慢查询报告：按规范化 SQL 汇总的前 top 条语句，order_by 可选 total / max / avg / slow / calls"""
+    try:
+        return query_log.report(top, order_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.delete("/api/monitor/slow-queries", dependencies=ADMIN_ONLY)
+def reset_slow_queries():
+    """清空慢查询统计"""
+    query_log.reset()
+    return {"message": "慢查询统计已清空"}
+
+@app.get("/api/monitor/logs")
+def get_log_stats():
+    """事件日志队列与写入统计"""
+    return event_log.stats()
+
+@metrics.register
+def collect_runtime_gauges():
+    """连接池、执行器、缓存和会话状态，抓取 /metrics 时读取"""
+    pool = db_pool.stats()
+    executor = db_executor.stats()
+    cache = result_cache.stats()
+    session = sessions.stats()
+    log = event_log.stats()
+    return [
+        ("db_pool_connections", "gauge", "连接池连接数", [
+            ({"state": "in_use"}, pool["in_use"]), ({"state": "idle"}, pool["idle"]),
+        ]),
+        ("db_pool_max_connections", "gauge", "连接池连接数上限", [(None, pool["max_size"])]),
+        ("db_pool_waiting", "gauge", "等待借出连接的线程数", [(None, pool["waiting"])]),
+        ("db_pool_checkouts_total", "counter", "借出连接次数", [(None, pool["checkouts"])]),
+        ("db_pool_timeouts_total", "counter", "借出连接超时次数", [(None, pool["timeouts"])]),
+        ("db_executor_pending", "gauge", "数据库执行器中执行和排队的请求数", [(None, executor["pending"])]),
+        ("db_executor_running", "gauge", "各接口执行中的请求数", [
+            ({"endpoint": name}, gate["running"]) for name, gate in executor["endpoints"].items()
+        ]),
+        ("db_executor_waiting", "gauge", "各接口排队中的请求数", [
+            ({"endpoint": name}, gate["waiting"]) for name, gate in executor["endpoints"].items()
+        ]),
+        ("db_executor_rejected_total", "counter", "各接口因排队已满或超时被拒绝的请求数", [
+            ({"endpoint": name}, gate["rejected"] + gate["timed_out"]) for name, gate in executor["endpoints"].items()
+        ]),
+        ("result_cache_entries", "gauge", "结果缓存条目数", [(None, cache["entries"])]),
+        ("result_cache_requests_total", "counter", "结果缓存查询次数", [
+            ({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"]),
+        ]),
+        ("result_cache_evictions_total", "counter", "结果缓存淘汰次数", [(None, cache["evictions"])]),
+        ("result_cache_version", "gauge", "结果缓存数据版本", [(None, cache["version"])]),
+        ("sessions_cached", "gauge", "缓存的会话数", [(None, session["cached"])]),
+        ("session_lookups_total", "counter", "会话校验次数", [
+            ({"result": "hit"}, session["hits"]), ({"result": "miss"}, session["misses"]),
+            ({"result": "rejected"}, session["rejected"]),
+        ]),
+        ("password_hash_pending", "gauge", "排队和计算中的密码哈希数", [(None, password_hasher.stats()["pending"])]),
+        ("event_log_queued", "gauge", "等待写入的日志事件数", [(None, log["queued"])]),
+        ("event_log_events_total", "counter", "日志事件数", [
+            ({"result": "written"}, log["written"]), ({"result": "dropped"}, log["dropped"]),
+            ({"result": "sampled_out"}, log["sampled_out"]),
+        ]),
+    ]
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus 抓取接口；在事件循环中执行，与中间件更新统计不会同时发生"""
+    return Response(metrics.render(), media_type=PROMETHEUS_MEDIA_TYPE)
 
 if __name__ == "__main__":
     import uvicorn
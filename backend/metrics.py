@@ -0,0 +1,207 @@
+"""
+接口运行指标
+按接口（路由模板 + 方法）统计请求数、延迟直方图、执行中的请求数，以及每个请求的耗时构成：
+- queue: 在数据库执行器中排队等待的时间
+- db_thread: 在数据库线程池中执行的总时间（包含下面的 db、serialize）
+- db: 执行查询和从游标取数据
+- serialize: 查询结果转换和 JSON 编码
+- export: 导出文件生成（xlsx / parquet 写入，csv / ndjson 逐块编码）
+
+耗时由各模块调用 record() 或 with timed(...) 记入当前请求，请求结束时累加到所属接口；
+不在请求中调用（如性能测试脚本）时不做任何事。连接池、缓存等状态通过 register() 注册的采集函数在抓取时读取。
+/metrics 以 Prometheus 文本格式输出，不依赖 prometheus_client。
+
+各接口的统计只在事件循环线程中更新（中间件请求结束时）；record() 则在数据库线程池、导出线程中调用，
+累加耗时时持有一把全局锁（临界区只有一次字典读写），中间件取本请求的耗时时先在锁内复制一份，
+请求结束后仍在运行的线程（如已超时的排队任务）继续写入也不影响已计入的统计。
+热路径上每个请求只多一次 contextvar 设置和几次加锁的字典操作。
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+
+# 延迟直方图的分桶上界（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_timings = contextvars.ContextVar("request_timings", default=None)
+_timings_lock = threading.Lock()
+
+
+def record(phase, seconds):
+    """把一段耗时记入当前请求；可在任意线程中调用"""
+    timings = _timings.get()
+    if timings is not None:
+        with _timings_lock:
+            timings[phase] = timings.get(phase, 0.0) + seconds
+
+
+class timed:
+    """with timed("db"): ... 记录代码块耗时"""
+
+    __slots__ = ("phase", "started")
+
+    def __init__(self, phase):
+        self.phase = phase
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.phase, time.perf_counter() - self.started)
+
+
+class _RouteStats:
+    __slots__ = ("statuses", "buckets", "total", "count", "phases")
+
+    def __init__(self, bucket_count):
+        self.statuses = {}
+        self.buckets = [0] * (bucket_count + 1)  # 最后一个为 +Inf
+        self.total = 0.0
+        self.count = 0
+        self.phases = {}
+
+
+class Metrics:
+    def __init__(self, prefix="gradesystem", buckets=LATENCY_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.in_flight = 0
+        self._routes = {}       # (方法, 路由模板) -> _RouteStats
+        self._paths = {}        # 接口函数 -> 路由模板
+        self._collectors = []
+
+    def register(self, collector):
+        """注册采集函数，返回 [(指标名, 类型, 说明, [(标签字典, 值)])]，抓取时调用"""
+        self._collectors.append(collector)
+        return collector
+
+    def _route_path(self, scope):
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"  # 404 等未匹配到路由的请求合并为一项，避免标签数量无限增长
+        path = self._paths.get(endpoint)
+        if path is None:
+            app = scope.get("app")
+            for route in getattr(app, "routes", ()):
+                if getattr(route, "endpoint", None) is endpoint:
+                    path = route.path
+                    break
+            else:
+                path = getattr(endpoint, "__name__", "unknown")
+            self._paths[endpoint] = path
+        return path
+
+    def observe(self, scope, status, seconds, timings):
+        key = (scope["method"], self._route_path(scope))
+        stats = self._routes.get(key)
+        if stats is None:
+            stats = self._routes[key] = _RouteStats(len(self.buckets))
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        stats.buckets[bisect.bisect_left(self.buckets, seconds)] += 1
+        stats.total += seconds
+        stats.count += 1
+        for phase, value in timings.items():
+            stats.phases[phase] = stats.phases.get(phase, 0.0) + value
+
+    # --- Prometheus 文本格式 ---
+
+    def render(self):
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {self.prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+
+        def sample(name, labels, value):
+            if labels:
+                text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                lines.append(f"{self.prefix}_{name}{{{text}}} {_number(value)}")
+            else:
+                lines.append(f"{self.prefix}_{name} {_number(value)}")
+
+        routes = sorted(self._routes.items())
+
+        family("http_requests_total", "counter", "请求数")
+        for (method, path), stats in routes:
+            for status, count in sorted(stats.statuses.items()):
+                sample("http_requests_total", {"method": method, "route": path, "status": status}, count)
+
+        family("http_request_duration_seconds", "histogram", "请求耗时")
+        for (method, path), stats in routes:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), stats.buckets):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                sample("http_request_duration_seconds_bucket", {"method": method, "route": path, "le": le}, cumulative)
+            sample("http_request_duration_seconds_sum", {"method": method, "route": path}, stats.total)
+            sample("http_request_duration_seconds_count", {"method": method, "route": path}, stats.count)
+
+        family("http_request_phase_seconds_total", "counter", "请求耗时构成（queue / db_thread / db / serialize / export）")
+        for (method, path), stats in routes:
+            for phase, value in sorted(stats.phases.items()):
+                sample("http_request_phase_seconds_total", {"method": method, "route": path, "phase": phase}, value)
+
+        family("http_requests_in_flight", "gauge", "执行中的请求数")
+        sample("http_requests_in_flight", None, self.in_flight)
+
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                family(name, kind, help_text)
+                for labels, value in samples:
+                    if value is not None:
+                        sample(name, labels, value)
+
+        lines.append("")
+        return "\n".join(lines)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class MetricsMiddleware:
+    """ASGI 中间件：统计每个 HTTP 请求；流式响应在发送完毕后才计入，耗时包含发送时间"""
+
+    def __init__(self, app, metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        timings = {}
+        token = _timings.set(timings)
+        self.metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.metrics.in_flight -= 1
+            _timings.reset(token)
+            with _timings_lock:
+                timings = dict(timings)
+            self.metrics.observe(scope, status, elapsed, timings)
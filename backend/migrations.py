@@ -0,0 +1,275 @@
+"""
+数据库迁移（SQL Server）
+按版本顺序执行 database/ 下的脚本，执行记录保存在 SchemaMigrations 表：
+- 已执行且内容未变（SHA-256 校验和相同）的脚本直接跳过，没有变化时只需一次查询
+- 每个脚本在一个事务中执行，执行记录随同一事务提交；出错时整个脚本回滚并停止，不再执行后面的脚本
+- 脚本按批分隔符 GO 切分：GO 必须单独成行（可带重复次数 GO n 和行尾注释），
+  字符串、注释、[标识符] 中的 GO 不会被当作分隔符
+- 已执行的脚本内容改变时默认报错，确认脚本可重复执行后用 reapply_changed 重新执行
+
+SQLite 存储后端启动时执行可重复执行的 sqlite_schema.sql，不使用本模块。
+"""
+
+import hashlib
+import os
+import re
+import time
+
+DATABASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "database")
+
+# (版本, 脚本, 说明)，按版本顺序执行；已发布的版本不要改号
+MIGRATIONS = (
+    ("001", "base_schema.sql", "基础表结构、综测视图和总分存储过程"),
+    ("002", "extend_database_schema.sql", "学生信息、课程信息扩展和示例课程"),
+    ("003", "incremental_ranking_schema.sql", "增量排名字段和排名存储过程"),
+    ("004", "evaluation_indexes_schema.sql", "综测查询索引"),
+    ("005", "grades_indexes_schema.sql", "成绩表查询索引"),
+)
+
+# 示例数据会清空学生和综测数据，只在明确要求时执行
+SAMPLE_DATA = ("900", "import_sample_data.sql", "示例综测数据")
+
+HISTORY_TABLE = "SchemaMigrations"
+
+CREATE_HISTORY_SQL = f"""
+IF OBJECT_ID('{HISTORY_TABLE}', 'U') IS NULL
+    CREATE TABLE {HISTORY_TABLE} (
+        Version NVARCHAR(20) PRIMARY KEY,
+        Script NVARCHAR(200) NOT NULL,
+        Checksum CHAR(64) NOT NULL,
+        DurationMs INT NOT NULL,
+        Baseline BIT NOT NULL DEFAULT 0,        -- 1 表示只登记、没有执行（已有的库）
+        AppliedAt DATETIME NOT NULL DEFAULT GETDATE()
+    )
+"""
+
+_GO_LINE = re.compile(r"^\s*GO(?:\s+(\d+))?\s*(?:--.*)?$", re.IGNORECASE)
+
+
+class MigrationError(Exception):
+    """脚本执行失败或校验不通过"""
+
+
+class Migration:
+    __slots__ = ("version", "script", "description", "path", "_checksum")
+
+    def __init__(self, version, script, description, directory=DATABASE_DIR):
+        self.version = version
+        self.script = script
+        self.description = description
+        self.path = os.path.join(directory, script)
+        self._checksum = None
+
+    def read(self):
+        with open(self.path, encoding="utf-8-sig") as f:
+            # 统一换行符，Windows 检出（CRLF）和 Linux 检出的校验和相同
+            return f.read().replace("\r\n", "\n")
+
+    @property
+    def checksum(self):
+        if self._checksum is None:
+            self._checksum = hashlib.sha256(self.read().encode("utf-8")).hexdigest()
+        return self._checksum
+
+    def __repr__(self):
+        return f"{self.version} {self.script}"
+
+
+def split_batches(text):
+    """按 GO 切分脚本，返回 [(起始行号, 批内容, 重复次数)]，跳过空批"""
+    batches = []
+    lines = []
+    start = 1
+    block_comments = 0    # /* */ 可以嵌套
+    quote = None          # 未结束的 ' " ] 引用
+    for number, line in enumerate(text.split("\n"), 1):
+        if block_comments == 0 and quote is None:
+            match = _GO_LINE.match(line)
+            if match:
+                _append_batch(batches, start, lines, int(match.group(1) or 1))
+                lines = []
+                start = number + 1
+                continue
+        lines.append(line)
+        block_comments, quote = _scan_line(line, block_comments, quote)
+    _append_batch(batches, start, lines, 1)
+    return batches
+
+
+def _append_batch(batches, start, lines, repeat):
+    body = "\n".join(lines)
+    if body.strip():
+        # 起始行号指向第一行非空内容，出错时便于定位
+        leading = len(body) - len(body.lstrip("\n"))
+        batches.append((start + body.count("\n", 0, leading), body.strip("\n"), repeat))
+
+
+def _scan_line(line, block_comments, quote):
+    """返回扫描完一行后的注释嵌套层数和未结束的引用"""
+    i, n = 0, len(line)
+    while i < n:
+        ch = line[i]
+        pair = line[i:i + 2]
+        if quote is not None:
+            if ch == quote:
+                if line[i + 1:i + 2] == quote:   # '' ]] "" 转义
+                    i += 2
+                    continue
+                quote = None
+        elif block_comments:
+            if pair == "/*":
+                block_comments += 1
+                i += 2
+                continue
+            if pair == "*/":
+                block_comments -= 1
+                i += 2
+                continue
+        elif pair == "--":
+            break
+        elif pair == "/*":
+            block_comments += 1
+            i += 2
+            continue
+        elif ch == "'" or ch == '"':
+            quote = ch
+        elif ch == "[":
+            quote = "]"
+        i += 1
+    return block_comments, quote
+
+
+class MigrationRunner:
+    """执行迁移；conn 为关闭了自动提交的 pyodbc 连接（pyodbc 默认如此）"""
+
+    def __init__(self, conn, migrations=None, log=print):
+        self.conn = conn
+        self.migrations = [Migration(*m) for m in (migrations or MIGRATIONS)]
+        self.log = log
+
+    # --- 执行记录 ---
+
+    def _ensure_history(self, cursor):
+        cursor.execute(CREATE_HISTORY_SQL)
+        self.conn.commit()
+
+    def applied(self):
+        """{版本: (脚本, 校验和, 是否只登记)}；还没有执行记录表时返回空字典"""
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(f"SELECT OBJECT_ID('{HISTORY_TABLE}', 'U')")
+            if cursor.fetchone()[0] is None:
+                return {}
+            cursor.execute(f"SELECT Version, Script, Checksum, Baseline FROM {HISTORY_TABLE}")
+            return {row[0]: (row[1], row[2].strip(), bool(row[3])) for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+
+    def status(self):
+        """[(迁移, 状态)]，状态为 pending / applied / baseline / changed"""
+        applied = self.applied()
+        result = []
+        for migration in self.migrations:
+            record = applied.get(migration.version)
+            if record is None:
+                state = "pending"
+            elif record[1] != migration.checksum:
+                state = "changed"
+            else:
+                state = "baseline" if record[2] else "applied"
+            result.append((migration, state))
+        return result
+
+    # --- 执行 ---
+
+    def baseline(self, version):
+        """把 version 及之前的迁移登记为已执行但不执行，用于迁移工具引入前建好的库"""
+        cursor = self.conn.cursor()
+        try:
+            self._ensure_history(cursor)
+            applied = self.applied()
+            for migration in self.migrations:
+                if migration.version > version:
+                    break
+                if migration.version not in applied:
+                    cursor.execute(
+                        f"INSERT INTO {HISTORY_TABLE} (Version, Script, Checksum, DurationMs, Baseline) "
+                        "VALUES (?, ?, ?, 0, 1)",
+                        (migration.version, migration.script, migration.checksum),
+                    )
+                    self.log(f"📌 {migration} 已登记（未执行）")
+            self.conn.commit()
+        finally:
+            cursor.close()
+
+    def run(self, reapply_changed=False):
+        """执行未执行的迁移，返回 {"applied": [...], "skipped": n, "seconds": 总耗时}"""
+        started = time.perf_counter()
+        states = self.status()
+        changed = [m for m, state in states if state == "changed"]
+        if changed and not reapply_changed:
+            names = "、".join(str(m) for m in changed)
+            raise MigrationError(f"已执行的脚本内容有变化: {names}；确认脚本可重复执行后使用 --reapply-changed")
+
+        pending = [(m, state) for m, state in states if state in ("pending", "changed")]
+        if pending:
+            cursor = self.conn.cursor()
+            try:
+                self._ensure_history(cursor)
+            finally:
+                cursor.close()
+        for migration, state in pending:
+            self.apply(migration, update=(state == "changed"))
+        return {
+            "applied": [str(m) for m, _ in pending],
+            "skipped": len(states) - len(pending),
+            "seconds": time.perf_counter() - started,
+        }
+
+    def apply(self, migration, update=False):
+        """在一个事务中执行一个脚本并写入执行记录"""
+        batches = split_batches(migration.read())
+        started = time.perf_counter()
+        cursor = self.conn.cursor()
+        try:
+            for line, body, repeat in batches:
+                try:
+                    for _ in range(repeat):
+                        cursor.execute(body)
+                        self._drain(cursor)
+                except Exception as e:
+                    raise MigrationError(f"{migration} 第 {line} 行开始的批执行失败: {e}") from e
+            duration_ms = int((time.perf_counter() - started) * 1000)
+            if update:
+                cursor.execute(
+                    f"UPDATE {HISTORY_TABLE} SET Script = ?, Checksum = ?, DurationMs = ?, Baseline = 0, "
+                    "AppliedAt = GETDATE() WHERE Version = ?",
+                    (migration.script, migration.checksum, duration_ms, migration.version),
+                )
+            else:
+                cursor.execute(
+                    f"INSERT INTO {HISTORY_TABLE} (Version, Script, Checksum, DurationMs) VALUES (?, ?, ?, ?)",
+                    (migration.version, migration.script, migration.checksum, duration_ms),
+                )
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        self.log(f"✅ {migration} {migration.description}（{len(batches)} 批，{duration_ms / 1000:.2f} 秒）")
+
+    def _drain(self, cursor):
+        """读完批中所有语句的结果：后面语句的错误要在取到对应结果集时才会抛出"""
+        while True:
+            self._print_messages(cursor)
+            if not cursor.nextset():
+                break
+        self._print_messages(cursor)
+
+    def _print_messages(self, cursor):
+        # pyodbc 4.0.31 起 cursor.messages 中是 PRINT 输出
+        for _, message in getattr(cursor, "messages", None) or ():
+            text = re.sub(r"^(\[[^\]]*\])+", "", str(message)).strip()
+            if text:
+                self.log(f"   {text}")
@@ -0,0 +1,69 @@
+"""
+分页工具
+- 游标（keyset）分页：按排序键记录上一页最后一行，下一页用 "键 > 上次的值" 定位，
+  深翻页和第一页一样快，不需要 OFFSET 跳过前面的行
+- 总数缓存：COUNT(*) 结果短时间缓存，写操作后失效
+"""
+
+import base64
+import json
+import threading
+import time
+
+# 列表接口每页最多的行数
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(key):
+    """把排序键编码成不透明的续页令牌"""
+    raw = json.dumps({"k": key}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """解析续页令牌，空字符串表示从第一页开始，返回 None；令牌无效抛出 ValueError"""
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))["k"]
+    except Exception:
+        raise ValueError("无效的分页游标")
+
+
+def next_cursor(rows, size, key):
+    """rows 多取了一行用于判断是否还有下一页；有则截断并返回下一页令牌"""
+    if len(rows) > size:
+        del rows[size:]
+        return encode_cursor(key(rows[-1]))
+    return None
+
+
+class CountCache:
+    """COUNT(*) 结果缓存，键为 (表名, 查询条件)"""
+
+    def __init__(self, ttl=60.0):
+        self.ttl = ttl
+        self._items = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item and item[1] > now:
+                return item[0]
+            generation = self._generations.get(key[0], 0)
+        value = loader()
+        with self._lock:
+            # 计数期间表被修改过，结果可能已过期，不写入缓存
+            if self._generations.get(key[0], 0) == generation:
+                self._items[key] = (value, now + self.ttl)
+        return value
+
+    def invalidate(self, table):
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            for key in [k for k in self._items if k[0] == table]:
+                del self._items[key]
@@ -0,0 +1,418 @@
+"""
+慢查询日志
+包装数据库连接和游标，统计每条语句的耗时（execute 加上之后取数据的时间）：
+- 按规范化的 SQL 文本汇总：字面量替换为 ?，IN (?, ?, ...) 合并为 IN (...)，空白压缩
+- 超过阈值的执行记录参数、请求号和时间，每条语句保留最近几次
+- 语句第一次变慢时抓取执行计划（之后每 plan_ttl 秒最多重新抓取一次）：
+  查询语句取实际执行计划（SQL Server 用 STATISTICS PROFILE 重新执行一次，带实际行数；
+  SQLite 为 EXPLAIN QUERY PLAN），写语句只取预估计划，不会重复执行
+
+待抓取的执行计划在连接归还连接池（事务回滚）时放入有上限的队列，由后台线程用自己的连接抓取，
+不占用请求的连接，也不延长归还连接的时间；队列已满时放弃本次抓取，该语句下次变慢时再抓取。
+临时表等会话内对象在后台线程的连接上不存在，这类语句的计划可能抓取失败，失败原因记录在 plan 中。
+参数中可能有密码哈希的语句（涉及 PasswordHash 列）不记录参数。
+"""
+
+import queue
+import re
+import threading
+import time
+
+from event_log import request_id
+
+_STRING_LITERAL = re.compile(r"N?'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w@#.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+_STOP = object()
+
+_normalized = {}
+_NORMALIZED_CACHE_SIZE = 2048
+
+
+def normalize_sql(sql):
+    """规范化 SQL 文本，同一条语句的不同参数、不同 IN 列表长度归为一类"""
+    text = _normalized.get(sql)
+    if text is None:
+        text = _STRING_LITERAL.sub("?", sql)
+        text = _NUMBER_LITERAL.sub("?", text)
+        text = _IN_LIST.sub("IN (...)", text)
+        text = _WHITESPACE.sub(" ", text).strip()
+        if len(_normalized) >= _NORMALIZED_CACHE_SIZE:
+            _normalized.clear()
+        _normalized[sql] = text
+    return text
+
+
+def _is_query(sql):
+    head = sql.lstrip().split(None, 1)
+    return bool(head) and head[0].upper() in ("SELECT", "WITH")
+
+
+def _describe_params(sql, params, limit=200):
+    if "passwordhash" in sql.lower():
+        return "<已隐藏>"
+    text = repr(params)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+class _Statement:
+    __slots__ = ("sql", "calls", "total", "max", "rows", "slow_calls", "samples", "plan", "plan_at")
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.slow_calls = 0
+        self.samples = []
+        self.plan = None
+        self.plan_at = None
+
+    def to_dict(self):
+        return {
+            "sql": self.sql,
+            "calls": self.calls,
+            "total_ms": round(self.total * 1000, 3),
+            "avg_ms": round(self.total / self.calls * 1000, 3) if self.calls else None,
+            "max_ms": round(self.max * 1000, 3),
+            "rows": self.rows,
+            "slow_calls": self.slow_calls,
+            "slow_samples": list(self.samples),
+            "plan": self.plan,
+        }
+
+
+class QueryLog:
+    """慢查询统计
+
+    - threshold_ms: 超过该耗时的执行视为慢查询
+    - max_statements: 最多统计的不同语句数，超出后新语句不再单独统计（计入 overflow）
+    - samples: 每条语句保留的最近慢执行记录数
+    - plan_ttl: 同一条语句重新抓取执行计划的最短间隔（秒）
+    - plan_queue_size: 等待后台线程抓取的执行计划数上限
+    """
+
+    def __init__(self, dialect, threshold_ms=100.0, max_statements=500, samples=5, plan_ttl=600.0,
+                 capture_plans=True, event_log=None, plan_queue_size=100):
+        self.dialect = dialect
+        self.threshold = threshold_ms / 1000
+        self.max_statements = max_statements
+        self.samples = samples
+        self.plan_ttl = plan_ttl
+        self.capture_plans = capture_plans
+        self.event_log = event_log
+        self._statements = {}
+        self._lock = threading.Lock()
+        self.overflow = 0
+        self.plan_errors = 0
+        self.plans_dropped = 0
+        self._connect = None          # 后台线程抓取执行计划时建立连接，不经过统计
+        self._plan_queue = queue.Queue(maxsize=plan_queue_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def wrap(self, connect):
+        """包装连接函数，返回的连接由本对象统计，如 ConnectionPool(query_log.wrap(storage.connect))"""
+        self._connect = connect
+
+        def connect_instrumented():
+            return InstrumentedConnection(self, connect())
+        return connect_instrumented
+
+    def observe(self, sql, params, seconds, rows):
+        """记录一次执行；需要抓取执行计划时返回规范化后的语句"""
+        key = normalize_sql(sql)
+        slow = seconds >= self.threshold
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                if len(self._statements) >= self.max_statements:
+                    self.overflow += 1
+                    return None
+                stats = self._statements[key] = _Statement(key)
+            stats.calls += 1
+            stats.total += seconds
+            stats.rows += rows
+            if seconds > stats.max:
+                stats.max = seconds
+            if not slow:
+                return None
+            stats.slow_calls += 1
+            stats.samples.append({
+                "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "ms": round(seconds * 1000, 3),
+                "rows": rows,
+                "params": _describe_params(sql, params),
+                "request_id": request_id.get(),
+            })
+            del stats.samples[:-self.samples]
+            now = time.monotonic()
+            need_plan = self.capture_plans and (stats.plan_at is None or now - stats.plan_at >= self.plan_ttl)
+            if need_plan:
+                stats.plan_at = now  # 先占位，避免并发请求重复抓取
+        if self.event_log is not None:
+            self.event_log.log("query_log", "慢查询", {
+                "sql": key, "ms": round(seconds * 1000, 3), "rows": rows,
+            }, level="info")
+        return key if need_plan else None
+
+    # --- 执行计划（后台线程） ---
+
+    def enqueue_plans(self, pending):
+        """把 [(规范化语句, SQL, 参数)] 交给后台线程抓取执行计划，不等待"""
+        if self._connect is None:
+            return
+        self._start()
+        for item in pending:
+            try:
+                self._plan_queue.put_nowait(item)
+            except queue.Full:
+                with self._lock:
+                    self.plans_dropped += 1
+                    stats = self._statements.get(item[0])
+                    if stats is not None and stats.plan is None:
+                        stats.plan_at = None  # 还没有计划，下次变慢时重新抓取
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="query-plan", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        conn = None
+        while True:
+            item = self._plan_queue.get()
+            if item is _STOP:
+                break
+            try:
+                if conn is None:
+                    conn = self._connect()
+                self.capture_plan(conn, *item)
+                conn.rollback()
+            except Exception as e:
+                # 连接不可用：记录原因，下一条重新建立连接
+                self._set_plan(item[0], {"kind": "error", "error": str(e)})
+                self.plan_errors += 1
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                    conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def close(self, timeout=5.0):
+        """抓取完队列中剩余的执行计划后停止后台线程"""
+        thread = self._thread
+        if thread is None:
+            return
+        self._plan_queue.put(_STOP)
+        thread.join(timeout)
+        self._thread = None
+
+    def capture_plan(self, raw_conn, key, sql, params):
+        """在 raw_conn 上抓取执行计划（后台线程调用，raw_conn 为不经过统计的连接）"""
+        cursor = raw_conn.cursor()
+        try:
+            if _is_query(sql):
+                kind, lines = "actual", self.dialect.actual_plan(cursor, sql, params)
+            else:
+                kind, lines = "estimated", self.dialect.explain(cursor, sql, params)
+            plan = {"kind": kind, "lines": lines}
+        except Exception as e:
+            self.plan_errors += 1
+            plan = {"kind": "error", "error": str(e)}
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        self._set_plan(key, plan)
+
+    def _set_plan(self, key, plan):
+        plan["captured_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is not None:
+                stats.plan = plan
+
+    def report(self, top=20, order_by="total"):
+        """按 total（总耗时）/ max（最长耗时）/ avg / slow（慢执行次数）/ calls 排序的前 top 条语句"""
+        keys = {
+            "total": lambda s: s.total,
+            "max": lambda s: s.max,
+            "avg": lambda s: s.total / s.calls if s.calls else 0.0,
+            "slow": lambda s: s.slow_calls,
+            "calls": lambda s: s.calls,
+        }
+        if order_by not in keys:
+            raise ValueError(f"不支持的排序方式: {order_by}")
+        with self._lock:
+            statements = sorted(self._statements.values(), key=keys[order_by], reverse=True)[:top]
+            return {
+                "threshold_ms": self.threshold * 1000,
+                "statements": len(self._statements),
+                "overflow": self.overflow,
+                "plan_errors": self.plan_errors,
+                "plans_pending": self._plan_queue.qsize(),
+                "plans_dropped": self.plans_dropped,
+                "top": [s.to_dict() for s in statements],
+            }
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self.overflow = 0
+            self.plan_errors = 0
+            self.plans_dropped = 0
+
+
+class InstrumentedConnection:
+    """连接包装：cursor() 返回计时的游标；rollback()（连接归还连接池时调用）时把待抓取的执行计划交给后台线程"""
+
+    def __init__(self, query_log, raw):
+        self._query_log = query_log
+        self._raw = raw
+        self._cursors = []        # 本次借出期间打开的游标
+        self._pending_plans = []
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self):
+        cursor = InstrumentedCursor(self, self._raw.cursor())
+        self._cursors.append(cursor)
+        return cursor
+
+    def execute(self, sql, *params):
+        return self.cursor().execute(sql, *params)
+
+    def _observe(self, sql, params, seconds, rows):
+        key = self._query_log.observe(sql, params, seconds, rows)
+        if key is not None:
+            self._pending_plans.append((key, sql, params))
+
+    def _finish_cursors(self):
+        for cursor in self._cursors:
+            cursor._finish()
+
+    def commit(self):
+        self._finish_cursors()
+        return self._raw.commit()
+
+    def rollback(self):
+        # 提交后游标可能继续使用，只在回滚（请求结束归还连接）时清空
+        self._finish_cursors()
+        self._cursors = []
+        result = self._raw.rollback()
+        if self._pending_plans:
+            pending, self._pending_plans = self._pending_plans, []
+            self._query_log.enqueue_plans(pending)
+        return result
+
+    def close(self):
+        self._finish_cursors()
+        self._cursors = []
+        self._pending_plans = []
+        return self._raw.close()
+
+
+class InstrumentedCursor:
+    """游标包装：从 execute 开始累计执行和取数据的时间，取完结果、执行下一条语句或关闭时记录"""
+
+    __slots__ = ("_conn", "_raw", "_sql", "_params", "_elapsed", "_rows")
+
+    def __init__(self, conn, raw):
+        self._conn = conn
+        self._raw = raw
+        self._sql = None
+        self._params = None
+        self._elapsed = 0.0
+        self._rows = 0
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    @property
+    def fast_executemany(self):
+        return self._raw.fast_executemany
+
+    @fast_executemany.setter
+    def fast_executemany(self, value):
+        # SQL Server 批量写入时设置
+        self._raw.fast_executemany = value
+
+    def _start(self, sql, params):
+        self._finish()
+        self._sql = sql
+        self._params = params
+        self._elapsed = 0.0
+        self._rows = 0
+
+    def _add(self, seconds, rows=0):
+        self._elapsed += seconds
+        self._rows += rows
+
+    def _finish(self):
+        sql = self._sql
+        if sql is not None:
+            self._sql = None
+            self._conn._observe(sql, self._params, self._elapsed, self._rows)
+
+    def execute(self, sql, *params):
+        self._start(sql, params[0] if len(params) == 1 else params)
+        started = time.perf_counter()
+        try:
+            self._raw.execute(sql, *params)
+        finally:
+            self._add(time.perf_counter() - started)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        rows = seq_of_params if isinstance(seq_of_params, list) else list(seq_of_params)
+        self._start(sql, f"<{len(rows)} 组参数>")
+        started = time.perf_counter()
+        try:
+            self._raw.executemany(sql, rows)
+        finally:
+            self._add(time.perf_counter() - started, len(rows))
+        self._finish()
+        return self
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._raw.fetchone()
+        self._add(time.perf_counter() - started, row is not None)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = self._raw.fetchmany() if size is None else self._raw.fetchmany(size)
+        self._add(time.perf_counter() - started, len(rows))
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._raw.fetchall()
+        self._add(time.perf_counter() - started, len(rows))
+        self._finish()
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self._finish()
+        self._raw.close()
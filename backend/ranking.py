@@ -0,0 +1,283 @@
+"""
+综测排名计算
+- 全量：调用 sp_CalculateRankings 重新计算整个学期的班级排名和年级排名（SQLite 没有存储过程，执行相同逻辑的 SQL）
+- 增量：只处理上次排名之后新增、改分或换班的综测记录
+  · 班级排名只重算这些记录新旧所在的班级
+  · 年级排名只重算这些记录新旧总积分覆盖的分数段，段内名次加上段外更高分的人数
+
+两种方式同分都按 EvaluationID 排序，结果完全一致。
+增量计算需要 database/incremental_ranking_schema.sql（迁移 003）增加的排名快照字段；
+还没有执行迁移的库（SQL Server）没有这些字段，增量计算自动退回全量计算。
+UPDATE 语句统一写成 UPDATE 表 SET ... FROM 派生表 WHERE 表.主键 = 派生表.主键，SQL Server 和 SQLite 都支持。
+"""
+
+from storage import SQLSERVER
+
+RANKING_MODES = ("incremental", "full")
+
+# 受影响的班级超过这个数量时直接全量计算，避免 IN 列表过长
+MAX_INCREMENTAL_CLASSES = 500
+
+# 检查排名快照字段是否存在；字段不存在时编译就会报错，不读取任何行
+SNAPSHOT_COLUMNS_SQL = "SELECT RankedScore, RankedClassID, RankedAt FROM ComprehensiveEvaluations WHERE 1 = 0"
+
+# 快照字段一旦存在就不会消失，检查通过后不再查询；不存在时每次都检查，执行迁移后无需重启
+_snapshot_columns = False
+
+# 上次排名之后新增、改分或换班的记录（均为 NULL 视为相同）
+CHANGED_CONDITION = """
+    (ce.RankedAt IS NULL
+     OR ce.TotalScore <> ce.RankedScore
+     OR (ce.TotalScore IS NULL AND ce.RankedScore IS NOT NULL)
+     OR (ce.TotalScore IS NOT NULL AND ce.RankedScore IS NULL)
+     OR s.ClassID <> ce.RankedClassID
+     OR (s.ClassID IS NULL AND ce.RankedClassID IS NOT NULL)
+     OR (s.ClassID IS NOT NULL AND ce.RankedClassID IS NULL))
+"""
+
+# {lock} 为方言的加锁提示（SQL Server：UPDLOCK + HOLDLOCK），事务结束前阻止本学期综测被修改，但不阻塞查询
+CHANGED_SQL = f"""
+    SELECT ce.EvaluationID, s.ClassID, ce.RankedClassID, ce.TotalScore, ce.RankedScore, ce.RankedAt
+    FROM ComprehensiveEvaluations ce {{lock}}
+    LEFT JOIN Students s ON ce.StudentID = s.StudentID
+    WHERE ce.AcademicYear = ? AND ce.Semester = ? AND {CHANGED_CONDITION}
+"""
+
+CLASS_RANK_SQL = """
+    UPDATE ComprehensiveEvaluations
+    SET ClassRank = cr.ClassRank
+    FROM (
+        SELECT
+            ce.EvaluationID,
+            ROW_NUMBER() OVER (PARTITION BY s.ClassID ORDER BY ce.TotalScore DESC, ce.EvaluationID) AS ClassRank
+        FROM ComprehensiveEvaluations ce
+        JOIN Students s ON ce.StudentID = s.StudentID
+        WHERE ce.AcademicYear = ? AND ce.Semester = ? AND ({classes})
+    ) cr
+    WHERE ComprehensiveEvaluations.EvaluationID = cr.EvaluationID
+      AND (ComprehensiveEvaluations.ClassRank IS NULL OR ComprehensiveEvaluations.ClassRank <> cr.ClassRank)
+"""
+
+GRADE_RANK_SQL = """
+    UPDATE ComprehensiveEvaluations
+    SET GradeRank = gr.GradeRank
+    FROM (
+        SELECT
+            EvaluationID,
+            ? + ROW_NUMBER() OVER (ORDER BY TotalScore DESC, EvaluationID) AS GradeRank
+        FROM ComprehensiveEvaluations
+        WHERE AcademicYear = ? AND Semester = ? AND ({band})
+    ) gr
+    WHERE ComprehensiveEvaluations.EvaluationID = gr.EvaluationID
+      AND (ComprehensiveEvaluations.GradeRank IS NULL OR ComprehensiveEvaluations.GradeRank <> gr.GradeRank)
+"""
+
+SNAPSHOT_SQL = f"""
+    UPDATE ComprehensiveEvaluations
+    SET RankedScore = TotalScore,
+        RankedClassID = c.ClassID,
+        RankedAt = GETDATE()
+    FROM (
+        SELECT ce.EvaluationID, s.ClassID
+        FROM ComprehensiveEvaluations ce
+        LEFT JOIN Students s ON ce.StudentID = s.StudentID
+        WHERE ce.AcademicYear = ? AND ce.Semester = ? AND {CHANGED_CONDITION}
+    ) c
+    WHERE ComprehensiveEvaluations.EvaluationID = c.EvaluationID
+"""
+
+# 没有存储过程时的全量计算，与 sp_CalculateRankings 相同
+FULL_RANKING_SQL = (
+    """
+    UPDATE ComprehensiveEvaluations
+    SET ClassRank = cr.ClassRank,
+        RankedClassID = cr.ClassID
+    FROM (
+        SELECT
+            ce.EvaluationID,
+            s.ClassID,
+            ROW_NUMBER() OVER (PARTITION BY s.ClassID ORDER BY ce.TotalScore DESC, ce.EvaluationID) AS ClassRank
+        FROM ComprehensiveEvaluations ce
+        JOIN Students s ON ce.StudentID = s.StudentID
+        WHERE ce.AcademicYear = ? AND ce.Semester = ?
+    ) cr
+    WHERE ComprehensiveEvaluations.EvaluationID = cr.EvaluationID
+    """,
+    """
+    UPDATE ComprehensiveEvaluations
+    SET GradeRank = gr.GradeRank,
+        RankedScore = TotalScore,
+        RankedAt = GETDATE()
+    FROM (
+        SELECT
+            EvaluationID,
+            ROW_NUMBER() OVER (ORDER BY TotalScore DESC, EvaluationID) AS GradeRank
+        FROM ComprehensiveEvaluations
+        WHERE AcademicYear = ? AND Semester = ?
+    ) gr
+    WHERE ComprehensiveEvaluations.EvaluationID = gr.EvaluationID
+    """,
+)
+
+# 与存储过程相同的排序规则，统计与已保存名次不一致的记录数
+VERIFY_SQL = """
+    WITH ClassRankings AS (
+        SELECT
+            ce.EvaluationID,
+            ROW_NUMBER() OVER (PARTITION BY s.ClassID ORDER BY ce.TotalScore DESC, ce.EvaluationID) AS ClassRank
+        FROM ComprehensiveEvaluations ce
+        JOIN Students s ON ce.StudentID = s.StudentID
+        WHERE ce.AcademicYear = ? AND ce.Semester = ?
+    ),
+    GradeRankings AS (
+        SELECT
+            EvaluationID,
+            ROW_NUMBER() OVER (ORDER BY TotalScore DESC, EvaluationID) AS GradeRank
+        FROM ComprehensiveEvaluations
+        WHERE AcademicYear = ? AND Semester = ?
+    )
+    SELECT
+        COUNT(*),
+        SUM(CASE WHEN cr.EvaluationID IS NOT NULL
+                  AND (ce.ClassRank IS NULL OR ce.ClassRank <> cr.ClassRank) THEN 1 ELSE 0 END),
+        SUM(CASE WHEN ce.GradeRank IS NULL OR ce.GradeRank <> gr.GradeRank THEN 1 ELSE 0 END)
+    FROM ComprehensiveEvaluations ce
+    JOIN GradeRankings gr ON ce.EvaluationID = gr.EvaluationID
+    LEFT JOIN ClassRankings cr ON ce.EvaluationID = cr.EvaluationID
+"""
+
+
+def full_rankings(conn, academic_year, semester, dialect=SQLSERVER):
+    """全量计算，调用方负责提交事务"""
+    cursor = conn.cursor()
+    try:
+        if dialect.procedures:
+            cursor.execute("{CALL sp_CalculateRankings (?, ?)}", (academic_year, semester))
+        else:
+            for sql in FULL_RANKING_SQL:
+                cursor.execute(sql, (academic_year, semester))
+    finally:
+        cursor.close()
+    return {"mode": "full"}
+
+
+def has_snapshot_columns(cursor):
+    """库中是否有增量排名的快照字段（RankedScore、RankedClassID、RankedAt）"""
+    global _snapshot_columns
+    if not _snapshot_columns:
+        try:
+            cursor.execute(SNAPSHOT_COLUMNS_SQL)
+            cursor.fetchall()
+            _snapshot_columns = True
+        except Exception:
+            return False
+    return True
+
+
+def incremental_rankings(conn, academic_year, semester, dialect=SQLSERVER):
+    """增量计算，调用方负责提交事务；变化太分散或库中没有快照字段时退回全量计算"""
+    cursor = conn.cursor()
+    try:
+        if not has_snapshot_columns(cursor):
+            return dict(full_rankings(conn, academic_year, semester, dialect),
+                        reason="缺少增量排名字段，已全量计算；执行 python init_database.py 迁移后可增量计算")
+        dialect.begin_locked(cursor)
+        cursor.execute(CHANGED_SQL.format(lock=dialect.lock_hint), (academic_year, semester))
+        changed = cursor.fetchall()
+        if not changed:
+            return {"mode": "incremental", "changed": 0, "classes": 0,
+                    "class_rank_updated": 0, "grade_rank_updated": 0}
+
+        classes = set()
+        for _, class_id, ranked_class_id, _, _, ranked_at in changed:
+            classes.add(class_id)
+            if ranked_at is not None:
+                classes.add(ranked_class_id)
+        if len(classes) > MAX_INCREMENTAL_CLASSES:
+            return dict(full_rankings(conn, academic_year, semester, dialect), changed=len(changed))
+
+        class_rank_updated = _rank_classes(cursor, academic_year, semester, classes)
+        grade_rank_updated = _rank_grade_band(cursor, academic_year, semester, changed)
+
+        cursor.execute(SNAPSHOT_SQL, (academic_year, semester))
+        return {
+            "mode": "incremental",
+            "changed": len(changed),
+            "classes": len(classes),
+            "class_rank_updated": class_rank_updated,
+            "grade_rank_updated": grade_rank_updated,
+        }
+    finally:
+        cursor.close()
+
+
+def _rank_classes(cursor, academic_year, semester, classes):
+    ids = sorted(c for c in classes if c is not None)
+    conditions = []
+    if ids:
+        conditions.append(f"s.ClassID IN ({', '.join('?' * len(ids))})")
+    if None in classes:
+        conditions.append("s.ClassID IS NULL")
+    cursor.execute(CLASS_RANK_SQL.format(classes=" OR ".join(conditions)),
+                   (academic_year, semester, *ids))
+    return cursor.rowcount
+
+
+def _rank_grade_band(cursor, academic_year, semester, changed):
+    """重算覆盖所有变化记录新旧总积分的分数段
+
+    段外的记录相对顺序不变；段上方的人数也不变，作为段内名次的偏移量。
+    新记录或总积分为 NULL 的记录没有旧位置 / 排在最后，此时分数段延伸到最低分（含 NULL）。
+    """
+    scores = []
+    open_bottom = False
+    for _, _, _, total, ranked, ranked_at in changed:
+        if ranked_at is None:
+            open_bottom = True
+            candidates = (total,)
+        else:
+            candidates = (total, ranked)
+        for score in candidates:
+            if score is None:
+                open_bottom = True
+            else:
+                scores.append(score)
+
+    if not scores:
+        # 只涉及总积分为 NULL 的记录：它们排在所有有分数的记录之后
+        band, params = "TotalScore IS NULL", ()
+        cursor.execute(
+            "SELECT COUNT(*) FROM ComprehensiveEvaluations "
+            "WHERE AcademicYear = ? AND Semester = ? AND TotalScore IS NOT NULL",
+            (academic_year, semester),
+        )
+    else:
+        high = max(scores)
+        if open_bottom:
+            band, params = "TotalScore <= ? OR TotalScore IS NULL", (high,)
+        else:
+            band, params = "TotalScore BETWEEN ? AND ?", (min(scores), high)
+        cursor.execute(
+            "SELECT COUNT(*) FROM ComprehensiveEvaluations "
+            "WHERE AcademicYear = ? AND Semester = ? AND TotalScore > ?",
+            (academic_year, semester, high),
+        )
+    offset = cursor.fetchone()[0]
+
+    cursor.execute(GRADE_RANK_SQL.format(band=band), (offset, academic_year, semester, *params))
+    return cursor.rowcount
+
+
+def verify_rankings(conn, academic_year, semester):
+    """按全量规则核对已保存的名次，返回不一致的记录数"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(VERIFY_SQL, (academic_year, semester, academic_year, semester))
+        total, class_mismatches, grade_mismatches = cursor.fetchone()
+    finally:
+        cursor.close()
+    return {
+        "total": total,
+        "class_rank_mismatches": int(class_mismatches or 0),
+        "grade_rank_mismatches": int(grade_mismatches or 0),
+    }
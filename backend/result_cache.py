@@ -0,0 +1,99 @@
+"""
+查询结果缓存
+排名列表和学生综测详情只在综测数据、加分项目写入或重新计算排名后才会变化，
+成绩公布后的大量重复查询直接从进程内缓存返回，不再访问数据库。
+
+- 数据版本：写接口调用 bump() 使版本号加一，之前缓存的结果全部作废
+- 条目数有上限，超出时淘汰最久未使用的条目（LRU）
+- 可选 ttl 兜住直接改库的情况
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class VersionedCache:
+    def __init__(self, max_entries=2048, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._items = OrderedDict()   # key -> (value, 过期时间)
+        self._lock = threading.Lock()
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_loads = 0
+
+    def get(self, key, loader):
+        """命中则返回缓存结果，否则调用 loader() 查询并缓存；loader 抛出的异常不缓存"""
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and (item[1] is None or item[1] > now):
+                self._items.move_to_end(key)
+                self.hits += 1
+                return item[0]
+            self.misses += 1
+            version = self.version
+
+        value = loader()
+        self._store({key: value}, version, now)
+        return value
+
+    def get_many(self, keys, loader):
+        """批量查询：命中的直接取缓存，未命中的一次调用 loader(未命中的 key 列表)，
+        loader 返回 {key: 结果}，没有结果的 key 不放入返回值也不缓存"""
+        now = time.monotonic()
+        found, missing = {}, []
+        with self._lock:
+            for key in keys:
+                item = self._items.get(key)
+                if item is not None and (item[1] is None or item[1] > now):
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    found[key] = item[0]
+                else:
+                    self.misses += 1
+                    missing.append(key)
+            version = self.version
+
+        if missing:
+            loaded = loader(missing)
+            self._store(loaded, version, now)
+            found.update(loaded)
+        return found
+
+    def _store(self, values, version, now):
+        with self._lock:
+            # 查询期间数据被修改过，结果可能已过期，不写入缓存
+            if self.version != version:
+                self.stale_loads += 1
+                return
+            expires = None if self.ttl is None else now + self.ttl
+            for key, value in values.items():
+                self._items[key] = (value, expires)
+                self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def bump(self):
+        """数据已修改：版本号加一并清空缓存"""
+        with self._lock:
+            self.version += 1
+            self._items.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self.version,
+                "entries": len(self._items),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "stale_loads": self.stale_loads,
+            }
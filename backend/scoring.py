@@ -0,0 +1,124 @@
+"""
+综测总分计算
+与 sp_CalculateComprehensiveScore 的公式相同，但一次处理整个学期（或其中一部分学生）：
+    C = C1 + C2
+    S = S1 + S2 + S3
+    P = X + C + S + W        （NULL 按 0 计）
+
+分项成绩按列读成 numpy 数组，换算成以"分"为单位的整数后整列相加，结果与数据库 DECIMAL 运算完全一致；
+只有结果与库中不同的记录才写回，写回时先批量写入临时表，再用一条 UPDATE ... JOIN 完成。
+"""
+
+from decimal import Decimal
+
+import numpy as np
+
+from storage import SQLSERVER
+
+# 读取的列：前两列之后依次为分项成绩和当前总分
+COMPONENT_COLUMNS = (
+    "AcademicScore",            # X
+    "InnovationBasicScore",     # C1
+    "InnovationBonusScore",     # C2
+    "StudentWorkScore",         # S1
+    "SocialServiceScore",       # S2
+    "SocialRewardScore",        # S3
+    "CulturalSportsScore",      # W
+)
+TOTAL_COLUMNS = ("InnovationTotalScore", "SocialTotalScore", "TotalScore")
+
+# 学生数不超过这个值时在 SQL 中用 IN 过滤，否则读取整个学期后在内存中过滤
+MAX_SQL_STUDENT_FILTER = 500
+
+STAGE_TABLE = "ScoreResults"
+STAGE_COLUMNS = """
+    EvaluationID INT PRIMARY KEY,
+    InnovationTotalScore DECIMAL(5,2),
+    SocialTotalScore DECIMAL(5,2),
+    TotalScore DECIMAL(7,2)
+"""
+
+UPDATE_SQL = """
+    UPDATE ComprehensiveEvaluations
+    SET InnovationTotalScore = r.InnovationTotalScore,
+        SocialTotalScore = r.SocialTotalScore,
+        TotalScore = r.TotalScore,
+        UpdatedAt = GETDATE()
+    FROM {stage} r
+    WHERE ComprehensiveEvaluations.EvaluationID = r.EvaluationID
+"""
+
+
+def to_cents(rows, start, stop):
+    """把 rows 中 [start, stop) 列转为以分为单位的 int64 矩阵；NULL 按 0 计，并返回标记 NULL 的布尔矩阵"""
+    values = np.array([row[start:stop] for row in rows], dtype=float).reshape(len(rows), stop - start)
+    missing = np.isnan(values)
+    return np.rint(np.where(missing, 0.0, values) * 100).astype(np.int64), missing
+
+
+def compute_scores(components):
+    """components 为 (n, 7) 的分项成绩矩阵（单位：分），按 COMPONENT_COLUMNS 顺序；
+    返回 (C, S, P) 三个长度为 n 的数组"""
+    academic, basic, bonus, work, service, reward, cultural = components.T
+    innovation = basic + bonus
+    social = work + service + reward
+    total = academic + innovation + social + cultural
+    return innovation, social, total
+
+
+def recalculate_scores(conn, academic_year, semester, student_ids=None, dialect=SQLSERVER):
+    """重新计算某学期（可限定学生）的 C、S、P，只写回有变化的记录，调用方负责提交事务"""
+    sql = f"""
+        SELECT EvaluationID, StudentID, {", ".join(COMPONENT_COLUMNS + TOTAL_COLUMNS)}
+        FROM ComprehensiveEvaluations
+        WHERE AcademicYear = ? AND Semester = ?
+    """
+    params = [academic_year, semester]
+    if student_ids is not None:
+        student_ids = sorted(set(student_ids))
+        if not student_ids:
+            return {"evaluated": 0, "updated": 0}
+        if len(student_ids) <= MAX_SQL_STUDENT_FILTER:
+            sql += f" AND StudentID IN ({', '.join('?' * len(student_ids))})"
+            params.extend(student_ids)
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        if not rows:
+            return {"evaluated": 0, "updated": 0}
+
+        keys = np.array([(row[0], row[1]) for row in rows], dtype=np.int64)
+        if student_ids is not None and len(student_ids) > MAX_SQL_STUDENT_FILTER:
+            mask = np.isin(keys[:, 1], student_ids)
+            keys = keys[mask]
+            rows = [row for row, keep in zip(rows, mask) if keep]
+            if not rows:
+                return {"evaluated": 0, "updated": 0}
+
+        n_components = len(COMPONENT_COLUMNS)
+        components, _ = to_cents(rows, 2, 2 + n_components)
+        current, current_missing = to_cents(rows, 2 + n_components, 2 + n_components + len(TOTAL_COLUMNS))
+        results = np.column_stack(compute_scores(components))
+
+        changed = np.flatnonzero((current_missing | (current != results)).any(axis=1))
+        if len(changed):
+            _write_results(cursor, dialect, keys[changed, 0], results[changed])
+        return {"evaluated": len(rows), "updated": int(len(changed))}
+    finally:
+        cursor.close()
+
+
+def _write_results(cursor, dialect, evaluation_ids, results):
+    rows = [
+        (int(evaluation_id), *(Decimal(int(v)).scaleb(-2) for v in values))
+        for evaluation_id, values in zip(evaluation_ids.tolist(), results.tolist())
+    ]
+    stage = dialect.temp(STAGE_TABLE)
+    # 连接来自连接池，临时表会保留在会话中，开始和结束时都要清理
+    cursor.execute(dialect.drop_temp(STAGE_TABLE))
+    cursor.execute(dialect.create_temp(STAGE_TABLE, STAGE_COLUMNS))
+    dialect.bulk_insert(cursor, f"INSERT INTO {stage} VALUES (?, ?, ?, ?)", rows)
+    cursor.execute(UPDATE_SQL.format(stage=stage))
+    cursor.execute(dialect.drop_temp(STAGE_TABLE))
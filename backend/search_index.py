@@ -0,0 +1,250 @@
+"""
+学生搜索索引
+常驻内存的倒排索引，替代 Name LIKE '%x%' 这类前导通配符查询导致的全表扫描：
+- 姓名：按单字和相邻两字建立 n-gram 倒排表，支持中文任意子串
+- 拼音首字母：安装了 pypinyin 时额外索引姓名拼音首字母（如 "zs" 匹配 "张三"）
+- 学号：有序列表 + 二分查找做前缀匹配
+- 班级名称：班级单独建 n-gram，命中班级后展开为班级成员
+
+学生增改时增量更新；每隔 max_age 秒整体重建一次，兜住直接改库的情况。
+"""
+
+import bisect
+import threading
+import time
+
+try:
+    from pypinyin import Style, lazy_pinyin
+except ImportError:  # 拼音首字母为可选功能
+    lazy_pinyin = None
+
+# 匹配得分，越高越靠前；同分按学号排序
+SCORE_ID_EXACT = 100
+SCORE_NAME_EXACT = 90
+SCORE_ID_PREFIX = 80
+SCORE_NAME_PREFIX = 70
+SCORE_INITIALS_EXACT = 60
+SCORE_NAME_SUBSTRING = 50
+SCORE_INITIALS_PREFIX = 45
+SCORE_CLASS_EXACT = 40
+SCORE_CLASS_PREFIX = 30
+SCORE_CLASS_SUBSTRING = 20
+
+
+def _normalize(text):
+    return (text or "").strip().lower()
+
+
+def _grams(text):
+    """单字和相邻两字"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def _query_grams(term):
+    """查询词用于取倒排表的 gram：两字及以上用所有相邻两字，单字用其本身"""
+    if len(term) == 1:
+        return {term}
+    return {term[i:i + 2] for i in range(len(term) - 1)}
+
+
+def _initials(name):
+    if lazy_pinyin is None or not name:
+        return ""
+    return "".join(lazy_pinyin(name, style=Style.FIRST_LETTER, errors="ignore")).lower()
+
+
+def _match_score(field, term, exact, prefix, substring):
+    if not field:
+        return 0
+    if field == term:
+        return exact
+    if field.startswith(term):
+        return prefix
+    if substring and term in field:
+        return substring
+    return 0
+
+
+class _GramIndex:
+    """gram -> 键集合 的倒排表"""
+
+    def __init__(self):
+        self.postings = {}
+
+    def add(self, key, text):
+        for gram in _grams(text):
+            self.postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key, text):
+        for gram in _grams(text):
+            keys = self.postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.postings[gram]
+
+    def candidates(self, term):
+        """包含 term 所有 gram 的键，结果还需用子串比较确认"""
+        result = None
+        for gram in sorted(_query_grams(term), key=lambda g: len(self.postings.get(g, ()))):
+            keys = self.postings.get(gram)
+            if not keys:
+                return set()
+            result = set(keys) if result is None else result & keys
+            if not result:
+                break
+        return result or set()
+
+
+class StudentSearchIndex:
+    """学生搜索索引
+
+    load(conn) 返回 (classes, students)：classes 为 (ClassID, ClassName) 行，
+    students 为 (StudentID, Name, ClassID) 行。
+    """
+
+    def __init__(self, load, max_age=3600.0):
+        self._load = load
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._built_at = None
+        self._reset()
+
+    def _reset(self):
+        self._students = {}       # StudentID -> (姓名, 拼音首字母, ClassID)
+        self._ids = []            # 有序的学号字符串，用于前缀匹配
+        self._names = _GramIndex()
+        self._initials = _GramIndex()
+        self._classes = {}        # ClassID -> 班级名称
+        self._class_names = _GramIndex()
+        self._members = {}        # ClassID -> 学号集合
+
+    # --- 构建与增量更新 ---
+
+    def ensure_loaded(self, conn):
+        """首次使用或超过 max_age 时用给定连接重建索引"""
+        with self._lock:
+            if self._built_at is not None and time.monotonic() - self._built_at < self.max_age:
+                return
+            classes, students = self._load(conn)
+            self._reset()
+            for class_id, class_name in classes:
+                self._set_class(class_id, class_name)
+            for student_id, name, class_id in students:
+                self._add(int(student_id), name, class_id, keep_sorted=False)
+            self._ids.sort()
+            self._built_at = time.monotonic()
+
+    def invalidate(self):
+        """下次搜索时整体重建"""
+        with self._lock:
+            self._built_at = None
+
+    def _set_class(self, class_id, class_name):
+        old = self._classes.get(class_id)
+        if old is not None:
+            self._class_names.remove(class_id, _normalize(old))
+        self._classes[class_id] = class_name
+        self._class_names.add(class_id, _normalize(class_name))
+
+    def _add(self, student_id, name, class_id, keep_sorted=True):
+        name = _normalize(name)
+        initials = _initials(name)
+        self._students[student_id] = (name, initials, class_id)
+        self._names.add(student_id, name)
+        if initials:
+            self._initials.add(student_id, initials)
+        self._members.setdefault(class_id, set()).add(student_id)
+        if keep_sorted:
+            bisect.insort(self._ids, str(student_id))
+        else:
+            self._ids.append(str(student_id))
+
+    def _remove(self, student_id):
+        entry = self._students.pop(student_id, None)
+        if entry is None:
+            return
+        name, initials, class_id = entry
+        self._names.remove(student_id, name)
+        if initials:
+            self._initials.remove(student_id, initials)
+        members = self._members.get(class_id)
+        if members is not None:
+            members.discard(student_id)
+        key = str(student_id)
+        i = bisect.bisect_left(self._ids, key)
+        if i < len(self._ids) and self._ids[i] == key:
+            del self._ids[i]
+
+    def upsert(self, student_id, name, class_id, class_name=None):
+        """新增或修改学生后调用；索引尚未建立时忽略，首次搜索会全量加载"""
+        with self._lock:
+            if self._built_at is None:
+                return
+            if class_name is not None and self._classes.get(class_id) != class_name:
+                self._set_class(class_id, class_name)
+            self._remove(student_id)
+            self._add(student_id, name, class_id)
+
+    @property
+    def loaded(self):
+        return self._built_at is not None
+
+    def has_class(self, class_id):
+        with self._lock:
+            return class_id in self._classes
+
+    # --- 查询 ---
+
+    def search(self, term):
+        """返回按相关度排序的学号列表"""
+        term = _normalize(term)
+        if not term:
+            return []
+        with self._lock:
+            scores = {}
+
+            def hit(student_id, score):
+                if score > scores.get(student_id, 0):
+                    scores[student_id] = score
+
+            if term.isdigit():
+                ids = self._ids
+                i = bisect.bisect_left(ids, term)
+                while i < len(ids) and ids[i].startswith(term):
+                    hit(int(ids[i]), SCORE_ID_EXACT if ids[i] == term else SCORE_ID_PREFIX)
+                    i += 1
+
+            for student_id in self._names.candidates(term):
+                name = self._students[student_id][0]
+                hit(student_id, _match_score(name, term, SCORE_NAME_EXACT,
+                                             SCORE_NAME_PREFIX, SCORE_NAME_SUBSTRING))
+
+            if term.isascii() and term.isalpha():
+                for student_id in self._initials.candidates(term):
+                    initials = self._students[student_id][1]
+                    hit(student_id, _match_score(initials, term, SCORE_INITIALS_EXACT,
+                                                 SCORE_INITIALS_PREFIX, 0))
+
+            for class_id in self._class_names.candidates(term):
+                score = _match_score(_normalize(self._classes[class_id]), term, SCORE_CLASS_EXACT,
+                                     SCORE_CLASS_PREFIX, SCORE_CLASS_SUBSTRING)
+                if score:
+                    for student_id in self._members.get(class_id, ()):
+                        hit(student_id, score)
+
+        ranked = [(score, student_id) for student_id, score in scores.items() if score]
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        return [student_id for _, student_id in ranked]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "students": len(self._students),
+                "classes": len(self._classes),
+                "name_grams": len(self._names.postings),
+                "pinyin_initials": lazy_pinyin is not None,
+                "age_seconds": None if self._built_at is None else round(time.monotonic() - self._built_at, 1),
+            }
@@ -0,0 +1,185 @@
+"""
+查询结果序列化
+把游标结果直接转换为可以 JSON 序列化的字典，不经过 DataFrame：
+- DECIMAL 转为 float（与原来 pd.read_sql 的结果相同）
+- DATE / DATETIME / TIME 转为 ISO 格式字符串
+- NULL 为 None，整数列保持整数
+
+每个查询只确定一次各列的转换函数：pyodbc 的 cursor.description 给出列的 Python 类型，
+只有 Decimal 和日期时间列需要逐值转换，其余列原样取值；
+SQLite 不提供列类型，按第一行的取值类型确定（SQLite 的日期本身就是字符串，通常不需要转换）。
+同一个查询的转换函数按列描述缓存，之后的请求直接复用。
+
+FastJSONResponse 直接把上述结果编码为 JSON，跳过 FastAPI 默认对返回值逐个值检查类型的 jsonable_encoder；
+大表格可用紧凑格式（列名 + 行数组）输出，不重复每行的键名。
+
+执行查询、取数据的耗时记为 metrics 的 db，转换和编码的耗时记为 serialize。
+"""
+
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from fastapi.responses import Response
+
+from metrics import timed
+
+try:
+    import orjson
+except ImportError:  # 已列入 requirements.txt；未安装时使用标准库 json
+    orjson = None
+
+CONVERTERS = {
+    Decimal: float,
+    datetime: datetime.isoformat,
+    date: date.isoformat,
+    time: time.isoformat,
+    bytes: bytes.hex,
+}
+
+
+class RowSerializer:
+    """一个查询结果的列名和各列转换函数"""
+
+    def __init__(self, description, first_row=None):
+        self.columns = [column[0] for column in description]
+        self.converters = []
+        for i, column in enumerate(description):
+            type_code = column[1]
+            if type_code is None and first_row is not None:
+                type_code = type(first_row[i])
+            converter = CONVERTERS.get(type_code)
+            if converter is not None:
+                self.converters.append((i, converter))
+
+    def values(self, row):
+        """一行转为列表，按列顺序"""
+        values = list(row)
+        for i, converter in self.converters:
+            value = values[i]
+            if value is not None:
+                values[i] = converter(value)
+        return values
+
+    def record(self, row):
+        return dict(zip(self.columns, self.values(row)))
+
+
+_serializers = {}
+
+
+def serializer_for(description, first_row=None):
+    """按列描述取缓存的 RowSerializer；SQLite 的列描述不含类型，再加上第一行各列的取值类型"""
+    if first_row is not None and any(column[1] is None for column in description):
+        key = (description, tuple(type(value) for value in first_row))
+    else:
+        key = description
+    serializer = _serializers.get(key)
+    if serializer is None:
+        serializer = RowSerializer(description, first_row)
+        _serializers[key] = serializer
+    return serializer
+
+
+def fetch_records(cursor):
+    """读取已执行查询的全部结果，返回字典列表"""
+    with timed("db"):
+        rows = cursor.fetchall()
+    if not rows:
+        return []
+    with timed("serialize"):
+        serializer = serializer_for(cursor.description, rows[0])
+        return [serializer.record(row) for row in rows]
+
+
+def fetch_record(cursor):
+    """读取一行，没有结果时返回 None"""
+    with timed("db"):
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    with timed("serialize"):
+        return serializer_for(cursor.description, row).record(row)
+
+
+def fetch_table(cursor):
+    """读取全部结果，返回 (列名, 行列表)，每行为按列顺序排列的值"""
+    with timed("db"):
+        rows = cursor.fetchall()
+    with timed("serialize"):
+        serializer = serializer_for(cursor.description, rows[0] if rows else None)
+        return serializer.columns, [serializer.values(row) for row in rows]
+
+
+def to_records(columns, rows):
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def query_records(conn, sql, params=()):
+    cursor = conn.cursor()
+    try:
+        with timed("db"):
+            cursor.execute(sql, params)
+        return fetch_records(cursor)
+    finally:
+        cursor.close()
+
+
+def query_table(conn, sql, params=()):
+    cursor = conn.cursor()
+    try:
+        with timed("db"):
+            cursor.execute(sql, params)
+        return fetch_table(cursor)
+    finally:
+        cursor.close()
+
+
+def query_record(conn, sql, params=()):
+    cursor = conn.cursor()
+    try:
+        with timed("db"):
+            cursor.execute(sql, params)
+        return fetch_record(cursor)
+    finally:
+        cursor.close()
+
+
+def query_scalar(conn, sql, params=()):
+    """返回第一行第一列，如 COUNT(*)"""
+    cursor = conn.cursor()
+    try:
+        with timed("db"):
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+        return None if row is None else row[0]
+    finally:
+        cursor.close()
+
+
+# --- JSON 响应 ---
+
+def encode_json(content):
+    """把只含 JSON 原生类型的结果编码为 UTF-8 字节串"""
+    with timed("serialize"):
+        if orjson is not None:
+            return orjson.dumps(content)
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+
+def table_content(columns, rows, compact):
+    """表格结果：默认为字典列表；compact 为 True 时为 {"columns": 列名, "rows": 行数组}"""
+    if compact:
+        return {"columns": columns, "rows": rows}
+    return to_records(columns, rows)
+
+
+class FastJSONResponse(Response):
+    """内容须为本模块读出的结果（只含 JSON 原生类型），或已编码的 JSON 字节串（如缓存的响应体）"""
+
+    media_type = "application/json"
+
+    def render(self, content):
+        if isinstance(content, bytes):
+            return content
+        return encode_json(content)
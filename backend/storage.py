@@ -0,0 +1,302 @@
+"""
+存储后端
+main_extended.py 及其查询模块通过这里访问数据库，支持两种实现：
+- SqlServerStorage：原有的 SQL Server（pyodbc），生产环境使用
+- SqliteStorage：嵌入式 SQLite，表结构、视图和排名逻辑与 SQL Server 相同，
+  不需要 Windows / SQL Server，可在 Linux 上直接运行后端和性能测试
+
+两者的 SQL 大部分相同（参数都用 ?），方言差异集中在 Dialect 中：
+分页子句、临时表、批量插入、写入自增主键、读取时加锁、是否有存储过程、查看执行计划、更新统计信息、
+读取表结构和表行数等元数据。
+SQLite 连接注册了 GETDATE() 函数，写法与 SQL Server 一致。
+
+通过环境变量选择：
+    GRADE_DB_BACKEND=sqlserver（默认）| sqlite
+    GRADE_DB_PATH=SQLite 数据库文件路径（默认 database/gradesystem.db）
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+from decimal import Decimal
+
+SQLITE_SCHEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "database", "sqlite_schema.sql")
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "database", "gradesystem.db")
+
+# SQLite 没有 DECIMAL 类型，按浮点数写入 NUMERIC 列
+sqlite3.register_adapter(Decimal, float)
+
+
+class Dialect:
+    name = None
+    procedures = False      # 是否有 sp_CalculateRankings 等存储过程
+    lock_hint = ""          # 读取后要更新的行时使用的表提示
+    reset_sql = None        # 连接归还连接池时恢复会话选项的语句
+
+    def page(self, offset, count):
+        """分页子句和参数，放在 ORDER BY 之后；参数依次追加到查询参数末尾"""
+        raise NotImplementedError
+
+    def temp(self, name):
+        """临时表在查询中的名称"""
+        raise NotImplementedError
+
+    def create_temp(self, name, columns):
+        raise NotImplementedError
+
+    def drop_temp(self, name):
+        raise NotImplementedError
+
+    def bulk_insert(self, cursor, sql, rows):
+        cursor.executemany(sql, rows)
+
+    def begin_locked(self, cursor):
+        """开始一个读取后要写回的事务，事务结束前其他连接不能修改读取的数据"""
+
+    def identity_insert(self, table, enabled):
+        """向自增主键列写入指定值前后要执行的语句，不需要时返回 None"""
+        return None
+
+    def explain(self, cursor, sql, params=()):
+        """返回查询的执行计划（文本行列表），不执行查询"""
+        raise NotImplementedError
+
+    def actual_plan(self, cursor, sql, params=()):
+        """执行查询并返回实际使用的执行计划；只能用于查询语句，默认与 explain 相同"""
+        return self.explain(cursor, sql, params)
+
+    def update_statistics(self, cursor):
+        """大批量写入后更新查询优化器的统计信息；SQL Server 自动更新，不需要处理"""
+
+    def schema_objects(self, cursor):
+        """库中的对象名：{"tables": set, "views": set, "procedures": set}"""
+        raise NotImplementedError
+
+    def table_row_counts(self, cursor):
+        """从元数据读取各表行数 {表名: 行数}，不扫描表；无法得知的表为 None"""
+        raise NotImplementedError
+
+
+class SqlServerDialect(Dialect):
+    name = "sqlserver"
+    procedures = True
+    # UPDLOCK + HOLDLOCK：事务结束前阻止读取的行被修改，但不阻塞查询
+    lock_hint = "WITH (UPDLOCK, HOLDLOCK)"
+    # 连接池复用连接不会执行 sp_reset_connection，请求中 SET 过的选项要自己恢复
+    reset_sql = "SET NOCOUNT OFF; SET XACT_ABORT OFF; SET TRANSACTION ISOLATION LEVEL READ COMMITTED"
+
+    def page(self, offset, count):
+        return "OFFSET ? ROWS FETCH NEXT ? ROWS ONLY", [offset, count]
+
+    def temp(self, name):
+        return f"#{name}"
+
+    def create_temp(self, name, columns):
+        return f"CREATE TABLE #{name} ({columns})"
+
+    def drop_temp(self, name):
+        return f"IF OBJECT_ID('tempdb..#{name}') IS NOT NULL DROP TABLE #{name}"
+
+    def bulk_insert(self, cursor, sql, rows):
+        cursor.fast_executemany = True
+        try:
+            cursor.executemany(sql, rows)
+        finally:
+            cursor.fast_executemany = False
+
+    def identity_insert(self, table, enabled):
+        return f"SET IDENTITY_INSERT {table} {'ON' if enabled else 'OFF'}"
+
+    def explain(self, cursor, sql, params=()):
+        cursor.execute("SET SHOWPLAN_TEXT ON")
+        try:
+            cursor.execute(sql, params)
+            lines = []
+            while True:
+                lines.extend(str(row[0]).rstrip() for row in cursor.fetchall())
+                if not cursor.nextset():
+                    break
+            return lines
+        finally:
+            cursor.execute("SET SHOWPLAN_TEXT OFF")
+
+    def schema_objects(self, cursor):
+        cursor.execute("SELECT type, name FROM sys.objects WHERE type IN ('U', 'V', 'P') AND is_ms_shipped = 0")
+        kinds = {"U": "tables", "V": "views", "P": "procedures"}
+        objects = {kind: set() for kind in kinds.values()}
+        for object_type, name in cursor.fetchall():
+            objects[kinds[object_type.strip()]].add(name)
+        return objects
+
+    def table_row_counts(self, cursor):
+        # 堆（index_id 0）或聚集索引（index_id 1）的分区行数，随写入维护，读取不需要 VIEW DATABASE STATE 权限
+        cursor.execute("""
+            SELECT t.name, SUM(p.rows)
+            FROM sys.tables t
+            JOIN sys.partitions p ON p.object_id = t.object_id AND p.index_id IN (0, 1)
+            GROUP BY t.name
+        """)
+        return {name: int(rows) for name, rows in cursor.fetchall()}
+
+    def actual_plan(self, cursor, sql, params=()):
+        # STATISTICS PROFILE 在每条语句的结果之后追加一个结果集，每行一个计划节点，带实际行数和执行次数
+        cursor.execute("SET STATISTICS PROFILE ON")
+        try:
+            cursor.execute(sql, params)
+            lines = []
+            while True:
+                if cursor.description and cursor.description[0][0] == "Rows":
+                    for row in cursor.fetchall():
+                        lines.append(f"rows={row.Rows} executes={row.Executes} {str(row.StmtText).rstrip()}")
+                if not cursor.nextset():
+                    break
+            return lines
+        finally:
+            cursor.execute("SET STATISTICS PROFILE OFF")
+
+
+class SqliteDialect(Dialect):
+    name = "sqlite"
+
+    def page(self, offset, count):
+        return "LIMIT ? OFFSET ?", [count, offset]
+
+    def temp(self, name):
+        return name
+
+    def create_temp(self, name, columns):
+        return f"CREATE TEMP TABLE {name} ({columns})"
+
+    def drop_temp(self, name):
+        return f"DROP TABLE IF EXISTS temp.{name}"
+
+    def explain(self, cursor, sql, params=()):
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        return [row[3] for row in cursor.fetchall()]
+
+    def update_statistics(self, cursor):
+        # SQLite 不会自动收集统计信息，没有统计信息时可能选错索引（如排名校验退化为嵌套循环扫描）；
+        # analysis_limit 限制每个索引抽样的行数，几十万行的库也只需几毫秒
+        cursor.execute("PRAGMA analysis_limit = 1000")
+        cursor.execute("ANALYZE")
+
+    def schema_objects(self, cursor):
+        cursor.execute("SELECT type, name FROM sqlite_master WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%'")
+        objects = {"tables": set(), "views": set(), "procedures": set()}
+        for object_type, name in cursor.fetchall():
+            objects["tables" if object_type == "table" else "views"].add(name)
+        return objects
+
+    def table_row_counts(self, cursor):
+        # SQLite 不维护行数，使用上次 ANALYZE（每次启动执行）记录的估计值：sqlite_stat1.stat 的第一个数；
+        # 没有统计信息的表只判断是否为空
+        tables = self.schema_objects(cursor)["tables"]
+        counts = {}
+        cursor.execute("SELECT name FROM sqlite_master WHERE name = 'sqlite_stat1'")
+        if cursor.fetchone():
+            cursor.execute("SELECT tbl, MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 GROUP BY tbl")
+            counts = {name: rows for name, rows in cursor.fetchall() if name in tables}
+        for name in tables - counts.keys():
+            cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {name})")
+            counts[name] = None if cursor.fetchone()[0] else 0
+        return counts
+
+    def begin_locked(self, cursor):
+        # SQLite 只有库级写锁：立即取得写锁，其他连接的写入等待到本事务结束
+        if not cursor.connection.in_transaction:
+            cursor.execute("BEGIN IMMEDIATE")
+
+
+SQLSERVER = SqlServerDialect()
+SQLITE = SqliteDialect()
+
+
+class SqlServerStorage:
+    dialect = SQLSERVER
+
+    def __init__(self, conn_str):
+        self.conn_str = conn_str
+
+    def connect(self):
+        import pyodbc  # 只在使用 SQL Server 时需要安装 ODBC 驱动
+        return pyodbc.connect(self.conn_str)
+
+    def initialize(self):
+        """SQL Server 的表结构由 database/*.sql 脚本创建"""
+
+    def describe(self):
+        return {"backend": self.dialect.name}
+
+
+class _Row(tuple):
+    """支持 row.Column 访问的查询结果行，与 pyodbc.Row 用法一致"""
+
+    __slots__ = ()
+    _index = {}
+
+    def __getattr__(self, name):
+        try:
+            return self[self._index[name]]
+        except KeyError:
+            raise AttributeError(name)
+
+
+_row_classes = {}
+
+
+def _row_factory(cursor, row):
+    description = cursor.description
+    row_class = _row_classes.get(description)
+    if row_class is None:
+        index = {column[0]: i for i, column in enumerate(description)}
+        row_class = type("Row", (_Row,), {"__slots__": (), "_index": index})
+        _row_classes[description] = row_class
+    return row_class(row)
+
+
+def _getdate():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class SqliteStorage:
+    dialect = SQLITE
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+
+    def connect(self):
+        # 连接来自连接池，会在不同的工作线程中使用（同一时间只被一个线程使用）
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = _row_factory
+        conn.create_function("GETDATE", 0, _getdate)
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def initialize(self):
+        """建库：执行 sqlite_schema.sql，开启 WAL 让读写可以并发，并更新统计信息"""
+        with open(SQLITE_SCHEMA, encoding="utf-8") as f:
+            script = f.read()
+        conn = self.connect()
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(script)
+            self.dialect.update_statistics(conn.cursor())
+            conn.commit()
+        finally:
+            conn.close()
+
+    def describe(self):
+        return {"backend": self.dialect.name, "path": os.path.abspath(self.path),
+                "sqlite_version": sqlite3.sqlite_version}
+
+
+def create_storage(sqlserver_conn_str):
+    """按环境变量 GRADE_DB_BACKEND 创建存储后端"""
+    backend = os.environ.get("GRADE_DB_BACKEND", "sqlserver").lower()
+    if backend == "sqlite":
+        return SqliteStorage(os.environ.get("GRADE_DB_PATH", DEFAULT_SQLITE_PATH))
+    if backend == "sqlserver":
+        return SqlServerStorage(sqlserver_conn_str)
+    raise ValueError(f"未知的存储后端: {backend}（可选 sqlserver、sqlite）")
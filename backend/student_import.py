@@ -0,0 +1,295 @@
+"""
+学生批量导入
+- 读取 CSV / Excel 上传文件或 JSON 数组，统一为 DataFrame
+- 对整列做向量化校验，不合格的行记录错误原因后剔除，不影响其余行
+- 合格的行通过 fast_executemany 一次写入临时表，再用集合操作检查学号、班级、用户名冲突，
+  最后 INSERT ... SELECT 一次性写入 Students 和 Users
+"""
+
+import io
+
+import pandas as pd
+
+from auth import DEFAULT_PASSWORD, default_password_hash
+from storage import SQLSERVER
+
+# 字段 -> 可接受的表头（英文字段名或中文列名）
+IMPORT_COLUMNS = {
+    "student_id": ("student_id", "学号"),
+    "name": ("name", "姓名"),
+    "class_id": ("class_id", "班级ID"),
+    "major": ("major", "专业"),
+    "gender": ("gender", "性别"),
+    "birthdate": ("birthdate", "出生日期"),
+    "hometown": ("hometown", "籍贯"),
+    "id_card": ("id_card", "身份证号"),
+    "phone": ("phone", "联系电话", "电话"),
+    "email": ("email", "邮箱"),
+    "address": ("address", "家庭住址", "地址"),
+    "enrollment_date": ("enrollment_date", "入学日期"),
+    "status": ("status", "状态"),
+}
+REQUIRED_COLUMNS = ("student_id", "name", "class_id", "major")
+
+# 与 Students 表字段长度一致
+MAX_LENGTHS = {
+    "name": ("姓名", 50),
+    "major": ("专业", 100),
+    "hometown": ("籍贯", 100),
+    "phone": ("联系电话", 20),
+    "email": ("邮箱", 100),
+    "address": ("家庭住址", 200),
+    "status": ("状态", 20),
+}
+DATE_COLUMNS = {"birthdate": "出生日期", "enrollment_date": "入学日期"}
+
+class ImportFormatError(ValueError):
+    """上传文件无法解析或缺少必需列"""
+
+
+def read_upload(filename, content):
+    """把上传的 CSV / Excel 文件读成全部为字符串的 DataFrame"""
+    name = (filename or "").lower()
+    try:
+        if name.endswith((".xlsx", ".xls")):
+            df = pd.read_excel(io.BytesIO(content), dtype=str)
+        elif name.endswith(".csv"):
+            df = pd.read_csv(io.BytesIO(content), dtype=str, encoding="utf-8-sig")
+        else:
+            raise ImportFormatError("只支持 .csv、.xlsx、.xls 文件")
+    except ImportFormatError:
+        raise
+    except Exception as e:
+        raise ImportFormatError(f"文件解析失败: {e}")
+    return normalize_columns(df)
+
+
+def read_records(records):
+    """把 JSON 数组（字典列表）读成与 read_upload 格式相同的 DataFrame"""
+    return normalize_columns(pd.DataFrame(records))
+
+
+def normalize_columns(df):
+    """表头统一为字段名，缺少的可选列补空值，所有值转为去除首尾空格的字符串"""
+    rename = {}
+    for field, aliases in IMPORT_COLUMNS.items():
+        for column in df.columns:
+            if str(column).strip() in aliases:
+                rename[column] = field
+                break
+    df = df.rename(columns=rename)
+    missing = [field for field in REQUIRED_COLUMNS if field not in df.columns]
+    if missing:
+        raise ImportFormatError(f"缺少必需列: {', '.join(missing)}")
+
+    result = pd.DataFrame(index=df.index)
+    for field in IMPORT_COLUMNS:
+        if field in df.columns:
+            values = df[field].astype("string").str.strip()
+            result[field] = values.mask(values == "")
+        else:
+            result[field] = pd.Series(pd.NA, index=df.index, dtype="string")
+    return result.reset_index(drop=True)
+
+
+def validate_students(df):
+    """向量化校验，返回 (合格行的参数元组列表, 错误列表)
+
+    行号 row 从 1 开始，对应数据行（不含表头）。每行只报告第一个错误。
+    """
+    errors = pd.Series("", index=df.index, dtype=object)
+
+    def reject(mask, message):
+        errors[mask.fillna(False).astype(bool) & (errors == "")] = message
+
+    student_id = pd.to_numeric(df["student_id"], errors="coerce")
+    class_id = pd.to_numeric(df["class_id"], errors="coerce")
+
+    reject(df["student_id"].isna(), "学号不能为空")
+    reject(student_id.isna() | (student_id <= 0) | (student_id % 1 != 0), "学号格式错误")
+    reject(df["name"].isna(), "姓名不能为空")
+    reject(df["class_id"].isna(), "班级ID不能为空")
+    reject(class_id.isna() | (class_id <= 0) | (class_id % 1 != 0), "班级ID格式错误")
+    reject(df["major"].isna(), "专业不能为空")
+    for field, (label, limit) in MAX_LENGTHS.items():
+        reject(df[field].str.len() > limit, f"{label}超过 {limit} 个字符")
+    reject(df["gender"].notna() & ~df["gender"].isin(["男", "女"]), "性别只能是男或女")
+    reject(df["id_card"].notna() & ~df["id_card"].str.fullmatch(r"\d{17}[\dXx]"), "身份证号格式错误")
+
+    dates = {}
+    for field, label in DATE_COLUMNS.items():
+        parsed = pd.to_datetime(df[field], errors="coerce", format="mixed")
+        reject(df[field].notna() & parsed.isna(), f"{label}格式错误")
+        dates[field] = parsed.dt.strftime("%Y-%m-%d")
+
+    reject(student_id.duplicated(keep="first") & student_id.notna(), "学号在导入数据中重复")
+
+    ok = errors == ""
+    raw_ids = _objects(df["student_id"])
+    error_list = [
+        {"row": int(i) + 1, "student_id": raw_ids[i], "error": errors[i]}
+        for i in df.index[~ok]
+    ]
+
+    valid = df[ok]
+    status = valid["status"].fillna("在读")
+    rows = list(zip(
+        (int(i) + 1 for i in valid.index),
+        student_id[ok].astype("int64").tolist(),
+        _objects(valid["name"]),
+        class_id[ok].astype("int64").tolist(),
+        _objects(valid["major"]),
+        _objects(valid["gender"]),
+        _objects(dates["birthdate"][ok]),
+        _objects(valid["hometown"]),
+        _objects(valid["id_card"].str.upper()),
+        _objects(valid["phone"]),
+        _objects(valid["email"]),
+        _objects(valid["address"]),
+        _objects(dates["enrollment_date"][ok]),
+        _objects(status),
+    ))
+    return rows, error_list
+
+
+def _objects(series):
+    """转为 Python 对象列表，缺失值为 None"""
+    return [None if pd.isna(v) else v for v in series.tolist()]
+
+
+STAGE_TABLE = "ImportStudents"
+STAGE_COLUMNS = """
+    RowNo INT PRIMARY KEY,
+    StudentID BIGINT NOT NULL,
+    Name NVARCHAR(50) NOT NULL,
+    ClassID INT NOT NULL,
+    Major NVARCHAR(100) NOT NULL,
+    Gender NVARCHAR(10),
+    Birthdate DATE,
+    Hometown NVARCHAR(100),
+    IDCard NVARCHAR(18),
+    Phone NVARCHAR(20),
+    Email NVARCHAR(100),
+    Address NVARCHAR(200),
+    EnrollmentDate DATE,
+    Status NVARCHAR(20)
+"""
+
+# 与已有数据冲突的检查：(错误信息, 返回冲突行号的查询)
+CONFLICT_CHECKS = (
+    ("学号已存在", """
+        SELECT i.RowNo FROM {stage} i
+        JOIN Students s ON s.StudentID = i.StudentID
+    """),
+    ("班级不存在", """
+        SELECT i.RowNo FROM {stage} i
+        LEFT JOIN Classes c ON c.ClassID = i.ClassID
+        WHERE c.ClassID IS NULL
+    """),
+    ("用户名已存在", """
+        SELECT i.RowNo FROM {stage} i
+        JOIN Users u ON u.Username = CAST(i.StudentID AS NVARCHAR(50))
+    """),
+)
+
+INSERT_STUDENTS_SQL = """
+    INSERT INTO Students (
+        StudentID, Name, ClassID, Major, Gender, Birthdate, Hometown,
+        IDCard, Phone, Email, Address, EnrollmentDate, Status
+    )
+    SELECT StudentID, Name, ClassID, Major, Gender, Birthdate, Hometown,
+           IDCard, Phone, Email, Address, EnrollmentDate, Status
+    FROM {stage}
+"""
+
+INSERT_USERS_SQL = """
+    INSERT INTO Users (Username, PasswordHash, Role, RelatedID)
+    VALUES (?, ?, 'Student', ?)
+"""
+
+
+def import_students(conn, df, dialect=SQLSERVER):
+    """校验并写入学生，返回导入报告；单行错误不会中断整批导入"""
+    rows, errors = validate_students(df)
+    inserted = []
+
+    if rows:
+        try:
+            inserted, conflicts = _insert_set_based(conn, rows, dialect)
+        except Exception:
+            # 集合写入失败（例如与并发写入冲突）时回滚，逐行写入以定位出错的行
+            conn.rollback()
+            inserted, conflicts = _insert_row_by_row(conn, rows)
+        errors.extend(conflicts)
+
+    errors.sort(key=lambda e: e["row"])
+    return {
+        "total": len(df),
+        "inserted": len(inserted),
+        "rejected": len(errors),
+        "errors": errors,
+    }
+
+
+def _insert_set_based(conn, rows, dialect):
+    cursor = conn.cursor()
+    try:
+        stage = dialect.temp(STAGE_TABLE)
+        # 连接来自连接池，临时表会保留在会话中，开始和结束时都要清理
+        cursor.execute(dialect.drop_temp(STAGE_TABLE))
+        cursor.execute(dialect.create_temp(STAGE_TABLE, STAGE_COLUMNS))
+        dialect.bulk_insert(
+            cursor,
+            f"INSERT INTO {stage} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+        rejected = {}
+        for message, sql in CONFLICT_CHECKS:
+            cursor.execute(sql.format(stage=stage))
+            for (row_no,) in cursor.fetchall():
+                rejected.setdefault(row_no, message)
+        if rejected:
+            cursor.executemany(f"DELETE FROM {stage} WHERE RowNo = ?",
+                               [(row_no,) for row_no in rejected])
+
+        cursor.execute(INSERT_STUDENTS_SQL.format(stage=stage))
+        # 每个账号的初始密码单独加盐，哈希逐个计算后批量写入
+        users = [(str(row[1]), default_password_hash(DEFAULT_PASSWORD), row[1])
+                 for row in rows if row[0] not in rejected]
+        if users:
+            dialect.bulk_insert(cursor, INSERT_USERS_SQL, users)
+        cursor.execute(dialect.drop_temp(STAGE_TABLE))
+        conn.commit()
+    finally:
+        cursor.close()
+
+    student_ids = {row[0]: row[1] for row in rows}
+    conflicts = [
+        {"row": row_no, "student_id": str(student_ids[row_no]), "error": message}
+        for row_no, message in rejected.items()
+    ]
+    return [row for row in rows if row[0] not in rejected], conflicts
+
+
+def _insert_row_by_row(conn, rows):
+    cursor = conn.cursor()
+    inserted, errors = [], []
+    try:
+        for row in rows:
+            try:
+                cursor.execute("""
+                    INSERT INTO Students (
+                        StudentID, Name, ClassID, Major, Gender, Birthdate, Hometown,
+                        IDCard, Phone, Email, Address, EnrollmentDate, Status
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, row[1:])
+                cursor.execute(INSERT_USERS_SQL, (str(row[1]), default_password_hash(DEFAULT_PASSWORD), row[1]))
+                conn.commit()
+                inserted.append(row)
+            except Exception as e:
+                conn.rollback()
+                errors.append({"row": row[0], "student_id": str(row[1]), "error": str(e)})
+    finally:
+        cursor.close()
+    return inserted, errors
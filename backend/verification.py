@@ -0,0 +1,371 @@
+"""
+数据库验证
+verify_database.py 使用的检查项和执行器：
+- 表结构检查先执行；其余检查互不依赖，在连接池中并发执行，缺少所需表的检查直接跳过
+- 表行数从元数据读取（见 Dialect.table_row_counts），不执行 COUNT(*)
+- 引用完整性、总分公式、排名顺序按主键随机抽样检查：
+  抽样 n 条都没有问题时，可以在置信度 c 下认为问题记录的比例低于 tolerance，
+  n = ceil(ln(1 - c) / ln(1 - tolerance))，如 c = 0.95、tolerance = 1% 时 n = 299，与表的大小无关
+- 每项检查的结果和耗时汇总为可直接写入 JSON 的报告
+
+检查结果状态：ok / warn（需要处理但不影响使用，如排名未重新计算）/ fail / error（检查本身出错）/ skipped
+"""
+
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from db_pool import ConnectionPool
+from scoring import COMPONENT_COLUMNS, TOTAL_COLUMNS, compute_scores, to_cents
+
+REQUIRED_TABLES = ("Students", "ComprehensiveEvaluations", "BonusDetails", "Classes", "Users")
+REQUIRED_VIEWS = ("v_ComprehensiveEvaluationDetails",)
+REQUIRED_PROCEDURES = ("sp_CalculateComprehensiveScore", "sp_CalculateRankings")
+
+# 这些表为空时系统不能正常使用
+NONEMPTY_TABLES = ("Students", "ComprehensiveEvaluations", "Users", "Classes")
+
+# 每条 IN (...) 查询的最多参数数（SQL Server 单条语句最多 2100 个参数）
+MAX_IN_PARAMS = 500
+
+# 主键抽样最多的轮数：主键有空洞时，每轮按上一轮的命中率多取一些候选值
+MAX_SAMPLE_ROUNDS = 6
+
+STATUS_ORDER = ("ok", "skipped", "warn", "fail", "error")
+
+
+def required_sample_size(confidence, tolerance):
+    """抽样全部合格时，能以 confidence 的置信度认为不合格比例低于 tolerance 所需的样本数"""
+    if not 0 < confidence < 1 or not 0 < tolerance < 1:
+        raise ValueError("confidence 和 tolerance 须在 0 到 1 之间")
+    return math.ceil(math.log(1 - confidence) / math.log(1 - tolerance))
+
+
+def _upper_bound(sampled, confidence):
+    """抽样 sampled 条全部合格时不合格比例的置信上限"""
+    return 1 - (1 - confidence) ** (1 / sampled) if sampled else 1.0
+
+
+class Sampler:
+    """按整数主键均匀抽样：在 [MIN, MAX] 中随机取候选值，取库中存在的；MIN / MAX 只读主键索引两端。
+    各检查在不同线程中抽样，指定 seed 时每张表使用各自的随机数序列，结果可以重现"""
+
+    def __init__(self, size, confidence, seed=None):
+        self.size = size
+        self.confidence = confidence
+        self.seed = seed
+
+    def sample(self, cursor, table, key):
+        rng = random.Random(f"{self.seed}:{table}") if self.seed is not None else random.Random()
+        cursor.execute(f"SELECT MIN({key}), MAX({key}) FROM {table}")
+        low, high = cursor.fetchone()
+        if low is None:
+            return []
+        span = high - low + 1
+        if span <= self.size:
+            candidates = range(low, high + 1)
+            return self._existing(cursor, table, key, candidates)
+
+        found, tried = set(), set()
+        hit_rate = 1.0
+        for _ in range(MAX_SAMPLE_ROUNDS):
+            missing = self.size - len(found)
+            if missing <= 0 or len(tried) >= span:
+                break
+            # 按命中率多取候选值，最多一次取 20 倍
+            count = min(span - len(tried), math.ceil(missing / max(hit_rate, 0.05) * 1.1))
+            candidates = set()
+            while len(candidates) < count:
+                value = rng.randint(low, high)
+                if value not in tried:
+                    candidates.add(value)
+            tried |= candidates
+            hits = self._existing(cursor, table, key, sorted(candidates))
+            hit_rate = max(len(hits) / len(candidates), 0.01)
+            found.update(hits)
+        found = sorted(found)
+        if len(found) > self.size:
+            found = sorted(rng.sample(found, self.size))
+        return found
+
+    def _existing(self, cursor, table, key, candidates):
+        candidates = list(candidates)
+        result = []
+        for start in range(0, len(candidates), MAX_IN_PARAMS):
+            chunk = candidates[start:start + MAX_IN_PARAMS]
+            cursor.execute(f"SELECT {key} FROM {table} WHERE {key} IN ({', '.join('?' * len(chunk))})", chunk)
+            result.extend(row[0] for row in cursor.fetchall())
+        return result
+
+    def summary(self, sampled, defects, table_rows=None):
+        """抽样检查结果的统计描述"""
+        result = {"sampled": sampled, "defects": defects}
+        if defects:
+            rate = defects / sampled
+            result["defect_rate"] = round(rate, 6)
+            if table_rows:
+                result["estimated_defect_rows"] = round(rate * table_rows)
+        else:
+            result["defect_rate_upper_bound"] = round(_upper_bound(sampled, self.confidence), 6)
+        return result
+
+
+def fetch_in(cursor, sql, keys):
+    """sql 中的 {keys} 替换为 IN 列表的占位符，按块执行并合并结果"""
+    rows = []
+    for start in range(0, len(keys), MAX_IN_PARAMS):
+        chunk = keys[start:start + MAX_IN_PARAMS]
+        cursor.execute(sql.format(keys=", ".join("?" * len(chunk))), chunk)
+        rows.extend(cursor.fetchall())
+    return rows
+
+
+# --- 检查项 ---
+# 每个检查为 (名称, 说明, 需要的表, 函数)；函数参数为 (cursor, context)，返回 (状态, 说明, 详细数据)
+
+def check_schema(cursor, context):
+    objects = context.dialect.schema_objects(cursor)
+    context.objects = objects
+    missing = [t for t in REQUIRED_TABLES if t not in objects["tables"]]
+    missing += [v for v in REQUIRED_VIEWS if v not in objects["views"]]
+    if context.dialect.procedures:
+        missing += [p for p in REQUIRED_PROCEDURES if p not in objects["procedures"]]
+    details = {name: sorted(values) for name, values in objects.items()}
+    if missing:
+        details["missing"] = missing
+        return "fail", f"缺少: {', '.join(missing)}，请执行 python init_database.py", details
+    return "ok", "所有必需的表、视图和存储过程都存在", details
+
+
+def check_row_counts(cursor, context):
+    counts = context.dialect.table_row_counts(cursor)
+    context.row_counts = counts
+    empty = [t for t in NONEMPTY_TABLES if counts.get(t) == 0]
+    estimated = " （估计值）" if context.dialect.name == "sqlite" else ""
+    message = "、".join(f"{t} {counts[t] if counts[t] is not None else '未知'}" for t in sorted(counts))
+    if empty:
+        return "fail", f"以下表没有数据: {', '.join(empty)}", counts
+    return "ok", message + estimated, counts
+
+
+def check_view_query(cursor, context):
+    top, params = context.dialect.page(0, 1)
+    cursor.execute(f"""
+        SELECT AcademicYear, Semester FROM ComprehensiveEvaluations
+        ORDER BY AcademicYear DESC, Semester DESC
+        {top}
+    """, params)
+    term = cursor.fetchone()
+    if term is None:
+        return "warn", "没有综测数据", {}
+    top, top_params = context.dialect.page(0, 3)
+    cursor.execute(f"""
+        SELECT StudentName, TotalScore, ClassRank
+        FROM v_ComprehensiveEvaluationDetails
+        WHERE AcademicYear = ? AND Semester = ?
+        ORDER BY ClassRank
+        {top}
+    """, [term[0], term[1], *top_params])
+    students = [{"name": row[0], "total_score": float(row[1]) if row[1] is not None else None, "class_rank": row[2]}
+                for row in cursor.fetchall()]
+    details = {"academic_year": term[0], "semester": term[1], "top": students}
+    return "ok", f"{term[0]} 第{term[1]}学期视图查询成功，返回 {len(students)} 条", details
+
+
+def _reference_check(cursor, context, table, key, sql, what):
+    keys = context.sampler.sample(cursor, table, key)
+    defects = [row[0] for row in fetch_in(cursor, sql, keys)]
+    details = context.sampler.summary(len(keys), len(defects), context.row_counts.get(table))
+    if defects:
+        details["examples"] = defects[:10]
+        return "fail", f"抽样 {len(keys)} 条中 {len(defects)} 条{what}", details
+    return "ok", f"抽样 {len(keys)} 条均正常", details
+
+
+def check_student_class(cursor, context):
+    return _reference_check(cursor, context, "Students", "StudentID", """
+        SELECT s.StudentID FROM Students s
+        LEFT JOIN Classes c ON s.ClassID = c.ClassID
+        WHERE s.StudentID IN ({keys}) AND c.ClassID IS NULL
+    """, "没有班级或班级不存在")
+
+
+def check_evaluation_student(cursor, context):
+    return _reference_check(cursor, context, "ComprehensiveEvaluations", "EvaluationID", """
+        SELECT ce.EvaluationID FROM ComprehensiveEvaluations ce
+        LEFT JOIN Students s ON ce.StudentID = s.StudentID
+        WHERE ce.EvaluationID IN ({keys}) AND s.StudentID IS NULL
+    """, "的学生不存在")
+
+
+def check_bonus_evaluation(cursor, context):
+    return _reference_check(cursor, context, "BonusDetails", "DetailID", """
+        SELECT b.DetailID FROM BonusDetails b
+        LEFT JOIN ComprehensiveEvaluations ce ON b.EvaluationID = ce.EvaluationID
+        WHERE b.DetailID IN ({keys}) AND ce.EvaluationID IS NULL
+    """, "的综测记录不存在")
+
+
+def check_scores(cursor, context):
+    keys = context.sampler.sample(cursor, "ComprehensiveEvaluations", "EvaluationID")
+    rows = fetch_in(cursor, f"""
+        SELECT EvaluationID, {", ".join(COMPONENT_COLUMNS + TOTAL_COLUMNS)}
+        FROM ComprehensiveEvaluations
+        WHERE EvaluationID IN ({{keys}})
+    """, keys)
+    defects = []
+    if rows:
+        components, _ = to_cents(rows, 1, 1 + len(COMPONENT_COLUMNS))
+        stored, _ = to_cents(rows, 1 + len(COMPONENT_COLUMNS), 1 + len(COMPONENT_COLUMNS) + len(TOTAL_COLUMNS))
+        expected = np.column_stack(compute_scores(components))
+        # 与 recalculate_scores 相同：NULL 按 0 比较
+        defects = [rows[i][0] for i in np.flatnonzero((expected != stored).any(axis=1))]
+    details = context.sampler.summary(len(rows), len(defects), context.row_counts.get("ComprehensiveEvaluations"))
+    if defects:
+        details["examples"] = defects[:10]
+        return "fail", f"抽样 {len(rows)} 条中 {len(defects)} 条总分与分项成绩不一致，请重新计算总分", details
+    return "ok", f"抽样 {len(rows)} 条总分均与分项成绩一致", details
+
+
+def _ranks_before(a, b):
+    """按 ROW_NUMBER() OVER (ORDER BY TotalScore DESC, EvaluationID) 的顺序，a 是否排在 b 之前；
+    元素为 (TotalScore, EvaluationID)，TotalScore 为 NULL 的排在最后"""
+    if a[0] is None or b[0] is None:
+        return (a[0] is not None) or (b[0] is None and a[1] < b[1])
+    return a[0] > b[0] or (a[0] == b[0] and a[1] < b[1])
+
+
+def check_rankings(cursor, context):
+    """抽样检查名次：每条抽样记录与前一名次的记录比较先后顺序。
+    名次从 1 连续编号且相邻名次的先后顺序都正确时，排名与全量计算的结果相同"""
+    keys = context.sampler.sample(cursor, "ComprehensiveEvaluations", "EvaluationID")
+    rows = fetch_in(cursor, """
+        SELECT ce.EvaluationID, ce.AcademicYear, ce.Semester, ce.TotalScore, ce.ClassRank, ce.GradeRank, s.ClassID
+        FROM ComprehensiveEvaluations ce
+        JOIN Students s ON ce.StudentID = s.StudentID
+        WHERE ce.EvaluationID IN ({keys})
+    """, keys)
+    unranked, defects = [], []
+    for evaluation_id, year, semester, score, class_rank, grade_rank, class_id in rows:
+        if class_rank is None or grade_rank is None:
+            unranked.append(evaluation_id)
+            continue
+        current = (score, evaluation_id)
+        # 年级名次：同学期 GradeRank - 1 的记录（IX_ComprehensiveEvaluations_Term_GradeRank 定位）
+        if grade_rank > 1:
+            cursor.execute("""
+                SELECT TotalScore, EvaluationID FROM ComprehensiveEvaluations
+                WHERE AcademicYear = ? AND Semester = ? AND GradeRank = ?
+            """, (year, semester, grade_rank - 1))
+            previous = cursor.fetchall()
+            if len(previous) != 1 or not _ranks_before(tuple(previous[0]), current):
+                defects.append(evaluation_id)
+                continue
+        # 班级名次：同学期、同班级 ClassRank - 1 的记录
+        if class_rank > 1:
+            cursor.execute("""
+                SELECT ce.TotalScore, ce.EvaluationID FROM ComprehensiveEvaluations ce
+                JOIN Students s ON ce.StudentID = s.StudentID
+                WHERE ce.AcademicYear = ? AND ce.Semester = ? AND ce.ClassRank = ? AND s.ClassID = ?
+            """, (year, semester, class_rank - 1, class_id))
+            previous = cursor.fetchall()
+            if len(previous) != 1 or not _ranks_before(tuple(previous[0]), current):
+                defects.append(evaluation_id)
+    details = context.sampler.summary(len(rows), len(defects) + len(unranked),
+                                      context.row_counts.get("ComprehensiveEvaluations"))
+    details["unranked"] = len(unranked)
+    if defects or unranked:
+        details["examples"] = (defects + unranked)[:10]
+        return ("warn", f"抽样 {len(rows)} 条中 {len(defects)} 条名次与总分顺序不一致、{len(unranked)} 条没有名次，"
+                        "请重新计算排名", details)
+    return "ok", f"抽样 {len(rows)} 条名次均正确", details
+
+
+SCHEMA_CHECK = ("schema", "表结构", (), check_schema)
+
+CHECKS = (
+    ("row_counts", "数据量", (), check_row_counts),
+    ("view_query", "视图查询", ("ComprehensiveEvaluations",), check_view_query),
+    ("student_class", "学生班级引用", ("Students", "Classes"), check_student_class),
+    ("evaluation_student", "综测学生引用", ("ComprehensiveEvaluations", "Students"), check_evaluation_student),
+    ("bonus_evaluation", "加分明细引用", ("BonusDetails", "ComprehensiveEvaluations"), check_bonus_evaluation),
+    ("scores", "综测总分", ("ComprehensiveEvaluations",), check_scores),
+    ("rankings", "综测排名", ("ComprehensiveEvaluations", "Students"), check_rankings),
+)
+
+
+class _Context:
+    def __init__(self, dialect, sampler):
+        self.dialect = dialect
+        self.sampler = sampler
+        self.objects = None
+        self.row_counts = {}
+
+
+def _run_check(pool, context, check):
+    name, title, _, func = check
+    started = time.perf_counter()
+    try:
+        with pool.acquire() as conn:
+            cursor = conn.cursor()
+            try:
+                status, message, details = func(cursor, context)
+            finally:
+                cursor.close()
+    except Exception as e:
+        status, message, details = "error", f"检查出错: {e}", {}
+    return {
+        "name": name,
+        "title": title,
+        "status": status,
+        "message": message,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        "details": details,
+    }
+
+
+def run_verification(storage, workers=4, confidence=0.95, tolerance=0.01, seed=None, only=None):
+    """执行所有检查，返回报告字典；only 为要执行的检查名集合（表结构检查总会执行）"""
+    started = time.perf_counter()
+    sample_size = required_sample_size(confidence, tolerance)
+    context = _Context(storage.dialect, Sampler(sample_size, confidence, seed))
+    pool = ConnectionPool(storage.connect, min_size=0, max_size=max(workers, 1), timeout=60.0)
+    try:
+        results = [_run_check(pool, context, SCHEMA_CHECK)]
+        tables = context.objects["tables"] if context.objects else set()
+
+        checks = [c for c in CHECKS if only is None or c[0] in only]
+        runnable, skipped = [], []
+        for check in checks:
+            missing = [t for t in check[2] if t not in tables]
+            if missing:
+                skipped.append({"name": check[0], "title": check[1], "status": "skipped",
+                                "message": f"缺少表: {', '.join(missing)}", "elapsed_ms": 0, "details": {}})
+            else:
+                runnable.append(check)
+
+        # 数据量先于抽样检查完成，抽样检查用它估计问题记录数；读元数据很快，不影响并发
+        row_check = [c for c in runnable if c[0] == "row_counts"]
+        if row_check:
+            results.append(_run_check(pool, context, row_check[0]))
+        others = [c for c in runnable if c[0] != "row_counts"]
+        with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="verify") as executor:
+            results.extend(executor.map(lambda check: _run_check(pool, context, check), others))
+        results.extend(skipped)
+    finally:
+        pool.close_all()
+
+    status = max((r["status"] for r in results), key=STATUS_ORDER.index)
+    return {
+        "verified_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "storage": storage.describe(),
+        "status": status,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        "workers": workers,
+        "sampling": {"confidence": confidence, "tolerance": tolerance, "sample_size": sample_size, "seed": seed},
+        "checks": results,
+    }
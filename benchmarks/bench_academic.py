@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GPA / 学业成绩计算性能对比
+对同一学期，比较逐个学生查询成绩、计算并更新综测记录，与 academic.recalculate_academic 一次读取整个学期、
+向量化计算并批量写回的耗时，并核对两者结果一致；再测量修改单个学生成绩后的增量计算耗时。
+
+每种方式先在事务中清空该学期的 GPA 和 X，计算完成后回滚，不改变库中数据。
+
+用法:
+    python benchmarks/generate_data.py --backend sqlite --path /tmp/bench.db --students 40000
+    python benchmarks/bench_academic.py --backend sqlite --path /tmp/bench.db
+    python benchmarks/bench_academic.py --backend sqlserver --academic-year 2024-2025 --semester 1
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from decimal import ROUND_HALF_UP, Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from academic import GRADES_SQL, MAX_GRADE_POINT, PASS_SCORE, recalculate_academic  # noqa: E402
+from bench_storage import DEFAULT_CONN_STR  # noqa: E402
+from scoring import recalculate_scores  # noqa: E402
+from storage import DEFAULT_SQLITE_PATH, SqliteStorage, SqlServerStorage  # noqa: E402
+
+RESET_SQL = """
+    UPDATE ComprehensiveEvaluations SET GPA = NULL, AcademicScore = NULL
+    WHERE AcademicYear = ? AND Semester = ?
+"""
+
+SNAPSHOT_SQL = """
+    SELECT EvaluationID, GPA, AcademicScore, TotalScore FROM ComprehensiveEvaluations
+    WHERE AcademicYear = ? AND Semester = ?
+    ORDER BY EvaluationID
+"""
+
+
+def run_per_student(conn, dialect, academic_year, semester):
+    """逐个学生：查询该学生本学期的成绩，按 Decimal 计算后更新综测记录，再更新总积分"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT StudentID FROM ComprehensiveEvaluations WHERE AcademicYear = ? AND Semester = ?",
+                   (academic_year, semester))
+    student_ids = [row[0] for row in cursor.fetchall()]
+    for student_id in student_ids:
+        cursor.execute(GRADES_SQL + " AND g.StudentID = ?", (academic_year, semester, student_id))
+        points = credits = Decimal(0)
+        for _, regular, midterm, final, credit in cursor.fetchall():
+            total = (Decimal(str(regular or 0)) * Decimal("0.1") + Decimal(str(midterm or 0)) * Decimal("0.3")
+                     + Decimal(str(final or 0)) * Decimal("0.6"))
+            point = min((total - 50) / 10, Decimal(MAX_GRADE_POINT)) if total >= PASS_SCORE else Decimal(0)
+            points += point * Decimal(str(credit))
+            credits += Decimal(str(credit))
+        if not credits:
+            continue
+        gpa = (points / credits).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        cursor.execute("""
+            UPDATE ComprehensiveEvaluations SET GPA = ?, AcademicScore = ?, UpdatedAt = GETDATE()
+            WHERE StudentID = ? AND AcademicYear = ? AND Semester = ?
+        """, (gpa, 50 + 10 * gpa, student_id, academic_year, semester))
+        recalculate_scores(conn, academic_year, semester, [student_id], dialect)
+    cursor.close()
+
+
+def run_vectorized(conn, dialect, academic_year, semester):
+    recalculate_academic(conn, academic_year, semester, dialect=dialect)
+
+
+def measure(conn, dialect, academic_year, semester, method):
+    """清空后计算，返回 (耗时秒数, 结果快照)，最后回滚"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(RESET_SQL, (academic_year, semester))
+        started = time.perf_counter()
+        method(conn, dialect, academic_year, semester)
+        elapsed = time.perf_counter() - started
+        cursor.execute(SNAPSHOT_SQL, (academic_year, semester))
+        snapshot = [(row[0], *(float(v) if v is not None else None for v in row[1:])) for row in cursor.fetchall()]
+        return elapsed, snapshot
+    finally:
+        cursor.close()
+        conn.rollback()
+
+
+def measure_incremental(conn, dialect, academic_year, semester, repeat):
+    """修改一门成绩后只重算该学生，返回每次耗时的中位数（毫秒）"""
+    cursor = conn.cursor()
+    top, params = dialect.page(0, repeat)
+    cursor.execute(f"""
+        SELECT g.GradeID, g.StudentID FROM CourseOfferings o
+        JOIN Grades g ON g.OfferingID = o.OfferingID
+        WHERE o.AcademicYear = ? AND o.Semester = ?
+        ORDER BY g.GradeID
+        {top}
+    """, [academic_year, semester, *params])
+    grades = cursor.fetchall()
+    timings = []
+    try:
+        for grade_id, student_id in grades:
+            started = time.perf_counter()
+            cursor.execute("UPDATE Grades SET FinalScore = 0 WHERE GradeID = ?", (grade_id,))
+            recalculate_academic(conn, academic_year, semester, [student_id], dialect)
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        cursor.close()
+        conn.rollback()
+    timings.sort()
+    return round(timings[len(timings) // 2], 3) if timings else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GPA / 学业成绩计算性能对比")
+    parser.add_argument("--backend", choices=["sqlite", "sqlserver"], default="sqlite")
+    parser.add_argument("--path", default=DEFAULT_SQLITE_PATH, help="SQLite 数据库文件")
+    parser.add_argument("--conn-str", default=DEFAULT_CONN_STR, help="SQL Server 连接字符串")
+    parser.add_argument("--academic-year", help="学年，默认为综测记录最多的学期")
+    parser.add_argument("--semester", type=int)
+    parser.add_argument("--incremental-repeat", type=int, default=50, help="增量计算的测量次数")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    if args.backend == "sqlite":
+        storage = SqliteStorage(args.path)
+        storage.initialize()
+    else:
+        storage = SqlServerStorage(args.conn_str)
+    dialect = storage.dialect
+    conn = storage.connect()
+    try:
+        cursor = conn.cursor()
+        if args.academic_year and args.semester:
+            academic_year, semester = args.academic_year, args.semester
+        else:
+            cursor.execute("""
+                SELECT AcademicYear, Semester, COUNT(*) FROM ComprehensiveEvaluations
+                GROUP BY AcademicYear, Semester ORDER BY COUNT(*) DESC
+            """)
+            row = cursor.fetchone()
+            if row is None:
+                print("❌ 数据库中没有综测数据，请先用 generate_data.py 生成数据")
+                return
+            academic_year, semester = row[0], row[1]
+        cursor.execute("""
+            SELECT COUNT(*) FROM CourseOfferings o
+            JOIN Grades g ON g.OfferingID = o.OfferingID
+            WHERE o.AcademicYear = ? AND o.Semester = ?
+        """, (academic_year, semester))
+        grades = cursor.fetchone()[0]
+        cursor.close()
+        print(f"存储后端: {dialect.name}  测试学期 {academic_year} 第{semester}学期  成绩 {grades} 条")
+
+        per_student, expected = measure(conn, dialect, academic_year, semester, run_per_student)
+        vectorized, actual = measure(conn, dialect, academic_year, semester, run_vectorized)
+        incremental = measure_incremental(conn, dialect, academic_year, semester, args.incremental_repeat)
+    finally:
+        conn.close()
+
+    mismatches = sum(1 for a, b in zip(expected, actual) if a != b) + abs(len(expected) - len(actual))
+    print(f"逐个学生计算: {per_student:.2f} 秒")
+    print(f"整学期向量化: {vectorized:.2f} 秒（{per_student / vectorized:.1f}x）")
+    print(f"修改单门成绩后增量计算: p50 {incremental} ms")
+    print("✅ 两种方式结果一致" if not mismatches else f"❌ {mismatches} 条结果不一致")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"backend": storage.describe(), "academic_year": academic_year, "semester": semester,
+                       "grades": grades, "evaluations": len(actual), "per_student_seconds": round(per_student, 3),
+                       "vectorized_seconds": round(vectorized, 3), "incremental_p50_ms": incremental,
+                       "mismatches": mismatches}, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+接口压测
+按给定并发数压测 main_extended.py 的主要接口（登录、学生 / 课程列表和搜索、综测录入、排名计算和列表、
+学生详情和批量详情、导出），统计每个接口的延迟分位数（p50 / p95 / p99）、吞吐量和错误率。
+
+结果可保存为 JSON，用 --baseline 与之前保存的结果对比：p95 延迟变长、吞吐量下降超过 --tolerance，
+或错误率上升超过 1 个百分点时标记为性能退化，并以退出码 1 结束，便于在不同版本之间比较。
+
+需要先启动扩展版后端，并准备好数据（可用 generate_data.py 生成）。
+读接口使用 --academic-year / --semester 指定的学期；综测录入和排名计算写入单独的学年（默认 bench-2099），
+不会改动真实学期的数据。学生账号默认密码为 123456。综测录入、排名计算、排名列表、学生详情和导出使用
+--admin-user 账号（默认 admin / admin123）的令牌，排名列表不会因未登录而按学生角色只返回前 10 名。
+
+用法:
+    python benchmarks/bench_endpoints.py --concurrency 1 8 32 --duration 10
+    python benchmarks/bench_endpoints.py --scenarios ranking_list student_detail --json after.json
+    python benchmarks/bench_endpoints.py --json after.json --baseline before.json --tolerance 0.2
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from pagination import encode_cursor  # noqa: E402
+
+BATCH_DETAIL_SIZE = 35   # 批量详情场景每次查询的学生数，约一个班
+
+
+# === 压测场景：每个场景返回一次请求的 (方法, 路径, requests 参数) ===
+
+def login(ctx, rng):
+    student_id = rng.choice(ctx["student_ids"])
+    return "POST", "/api/login", {"json": {"username": str(student_id), "password": ctx["password"]}}
+
+
+def students_page(ctx, rng):
+    return "GET", "/api/students/list", {"params": {"page": rng.randint(1, 50), "size": 20}}
+
+
+def students_cursor(ctx, rng):
+    after = rng.choice(ctx["student_ids"])
+    return "GET", "/api/students/list", {"params": {"cursor": encode_cursor(after), "size": 20}}
+
+
+def students_search(ctx, rng):
+    return "GET", "/api/students/list", {"params": {"search": rng.choice(ctx["student_terms"]), "size": 20}}
+
+
+def courses_list(ctx, rng):
+    return "GET", "/api/courses/list", {"params": {"page": rng.randint(1, 5), "size": 20}}
+
+
+def courses_search(ctx, rng):
+    return "GET", "/api/courses/list", {"params": {"search": rng.choice(ctx["course_terms"]), "size": 20}}
+
+
+def evaluation_add(ctx, rng):
+    return "POST", "/api/evaluation/add", {"json": {
+        "student_id": rng.choice(ctx["student_ids"]),
+        "academic_year": ctx["write_year"],
+        "semester": 1,
+        "physical_score": round(rng.uniform(60, 100), 1),
+        "moral_score": round(rng.uniform(80, 90), 2),
+        "gpa": round(rng.uniform(1.5, 4.5), 2),
+        "academic_score": round(rng.uniform(65, 95), 2),
+        "innovation_basic_score": rng.choice([0, 0, 0, 8, 10]),
+        "innovation_bonus_score": rng.choice([0, 0, 0, 0, 3]),
+        "student_work_score": rng.choice([0, 0, 8, 20, 30]),
+        "social_service_score": rng.choice([0, 0, 0, 10, 23]),
+        "social_reward_score": 0,
+        "cultural_sports_score": rng.choice([0, 0, 2, 4]),
+    }, "headers": ctx["admin_headers"]}
+
+
+def ranking_calculate(ctx, rng):
+    return "POST", "/api/ranking/calculate", {"json": {"academic_year": ctx["write_year"], "semester": 1},
+                                              "headers": ctx["admin_headers"]}
+
+
+def ranking_list(ctx, rng):
+    return "GET", "/api/ranking/list", {"params": {
+        "academic_year": ctx["academic_year"], "semester": ctx["semester"], "limit": rng.choice([10, 50, 100]),
+    }, "headers": ctx["admin_headers"]}
+
+
+def student_detail(ctx, rng):
+    return "GET", f"/api/student/{rng.choice(ctx['detail_ids'])}", {"params": {
+        "academic_year": ctx["academic_year"], "semester": ctx["semester"],
+    }, "headers": ctx["admin_headers"]}
+
+
+def student_details_batch(ctx, rng):
+    # 模拟整班审核：一次查询 BATCH_DETAIL_SIZE 名学生的详情
+    ids = ctx["detail_ids"]
+    start = rng.randrange(max(1, len(ids) - BATCH_DETAIL_SIZE + 1))
+    return "POST", "/api/student/details", {"json": {
+        "academic_year": ctx["academic_year"], "semester": ctx["semester"],
+        "student_ids": ids[start:start + BATCH_DETAIL_SIZE],
+    }, "headers": ctx["admin_headers"]}
+
+
+def export_csv(ctx, rng):
+    return "GET", "/api/export/comprehensive", {"params": {
+        "academic_year": ctx["academic_year"], "semester": ctx["semester"], "format": "csv",
+    }, "headers": ctx["admin_headers"]}
+
+
+def export_xlsx(ctx, rng):
+    return "GET", "/api/export/comprehensive", {"params": {
+        "academic_year": ctx["academic_year"], "semester": ctx["semester"], "format": "xlsx",
+    }, "headers": ctx["admin_headers"]}
+
+
+# 混合场景：按日常访问比例随机选择读接口
+MIXED_WEIGHTS = [
+    (ranking_list, 30), (student_detail, 30), (students_cursor, 12), (students_search, 10),
+    (login, 10), (courses_list, 4), (courses_search, 4),
+]
+
+
+def mixed(ctx, rng):
+    scenario = rng.choices([s for s, _ in MIXED_WEIGHTS], weights=[w for _, w in MIXED_WEIGHTS])[0]
+    return scenario(ctx, rng)
+
+
+# 按顺序执行：先录入综测再计算排名
+SCENARIOS = {
+    "login": login,
+    "students_page": students_page,
+    "students_cursor": students_cursor,
+    "students_search": students_search,
+    "courses_list": courses_list,
+    "courses_search": courses_search,
+    "evaluation_add": evaluation_add,
+    "ranking_calculate": ranking_calculate,
+    "ranking_list": ranking_list,
+    "student_detail": student_detail,
+    "student_details_batch": student_details_batch,
+    "export_csv": export_csv,
+    "export_xlsx": export_xlsx,
+    "mixed": mixed,
+}
+
+
+# === 准备数据 ===
+
+def prepare(args):
+    """从后端取压测用的学号、搜索词，学号优先取指定学期有综测记录的学生"""
+    base = args.base_url
+    detail_ids, student_ids, names = [], [], []
+    response = requests.post(f"{base}/api/login", timeout=30,
+                             json={"username": args.admin_user, "password": args.admin_password})
+    if response.status_code != 200:
+        raise SystemExit(f"❌ 管理员登录失败: {response.text}")
+    admin_headers = {"Authorization": f"Bearer {response.json()['token']}"}
+
+    response = requests.get(f"{base}/api/export/comprehensive", stream=True, timeout=60, headers=admin_headers, params={
+        "academic_year": args.academic_year, "semester": args.semester, "format": "ndjson",
+    })
+    if response.status_code == 200:
+        # 只读取前 --sample 行就断开，服务端随即停止导出
+        for line in response.iter_lines():
+            if not line:
+                continue
+            row = json.loads(line)
+            detail_ids.append(row["学号"])
+            names.append(row["姓名"])
+            if len(detail_ids) >= args.sample:
+                break
+    response.close()
+
+    data = requests.get(f"{base}/api/students/list", params={"cursor": "", "size": 100}, timeout=30).json()
+    for student in data["students"]:
+        student_ids.append(student["StudentID"])
+        names.append(student["Name"])
+    student_ids = detail_ids + student_ids
+    if not student_ids:
+        raise SystemExit("❌ 没有学生数据，请先导入数据（可用 benchmarks/generate_data.py 生成）")
+
+    courses = requests.get(f"{base}/api/courses/list", params={"cursor": "", "size": 100}, timeout=30).json()["courses"]
+    course_terms = [c["CourseName"][:2] for c in courses] + [c["CourseCode"][:3] for c in courses]
+    rng = random.Random(args.seed)
+    return {
+        "academic_year": args.academic_year,
+        "semester": args.semester,
+        "write_year": args.write_year,
+        "password": args.password,
+        "admin_headers": admin_headers,
+        "student_ids": student_ids,
+        "detail_ids": detail_ids or student_ids,
+        # 姓名子串、学号前缀两种搜索
+        "student_terms": [n[:2] for n in rng.sample(names, min(50, len(names)))]
+                         + [str(sid)[:7] for sid in rng.sample(student_ids, min(50, len(student_ids)))],
+        "course_terms": course_terms or ["数据"],
+    }
+
+
+# === 执行与统计 ===
+
+def percentile(sorted_values, p):
+    """最近秩法求百分位数"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def run(base_url, scenario, ctx, concurrency, duration, max_requests, seed, timeout):
+    latencies, statuses, errors = [], Counter(), Counter()
+    lock = threading.Lock()
+    counter = iter(range(max_requests)) if max_requests else None
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        session = requests.Session()
+        local_latencies, local_statuses, local_errors = [], Counter(), Counter()
+        while time.perf_counter() < deadline:
+            if counter is not None:
+                with lock:
+                    if next(counter, None) is None:
+                        break
+            method, path, kwargs = scenario(ctx, rng)
+            started = time.perf_counter()
+            try:
+                response = session.request(method, base_url + path, timeout=timeout, **kwargs)
+                response.content  # 读完整个响应体（导出为流式响应）
+                local_statuses[response.status_code] += 1
+            except requests.RequestException as e:
+                local_errors[type(e).__name__] += 1
+            local_latencies.append((time.perf_counter() - started) * 1000)
+        session.close()
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+            errors.update(local_errors)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    total = len(latencies)
+    failed = sum(errors.values()) + sum(n for code, n in statuses.items() if code >= 400)
+    return {
+        "requests": total,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0,
+        "error_rate": round(failed / total, 4) if total else 0,
+        "rejected": statuses.get(503, 0),   # 排队已满或超时被执行器拒绝的请求，计入错误率
+        "p50_ms": _round(percentile(latencies, 50)),
+        "p95_ms": _round(percentile(latencies, 95)),
+        "p99_ms": _round(percentile(latencies, 99)),
+        "max_ms": _round(latencies[-1] if latencies else None),
+        "mean_ms": _round(sum(latencies) / total if total else None),
+        "status": {str(code): n for code, n in sorted(statuses.items())},
+        "exceptions": dict(errors),
+    }
+
+
+def _round(value):
+    return None if value is None else round(value, 2)
+
+
+def compare(results, baseline, tolerance):
+    """与基准结果对比，返回退化的 (场景, 并发数, 原因) 列表"""
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"\n与基准对比（{baseline.get('started_at', '')} {baseline.get('commit') or ''}）:")
+    print(f"{'场景':<20}{'并发':>6}{'p95 变化':>12}{'吞吐量变化':>12}{'错误率':>16}")
+    for r in results:
+        old = previous.get((r["scenario"], r["concurrency"]))
+        if not old:
+            continue
+        p95 = _change(r["p95_ms"], old["p95_ms"])
+        rps = _change(r["throughput_rps"], old["throughput_rps"])
+        reasons = []
+        if p95 is not None and p95 > tolerance:
+            reasons.append("p95 延迟变长")
+        if rps is not None and rps < -tolerance:
+            reasons.append("吞吐量下降")
+        if r["error_rate"] > old["error_rate"] + 0.01:
+            reasons.append("错误率上升")
+        mark = "⚠️ " + "、".join(reasons) if reasons else "✅"
+        print(f"{r['scenario']:<20}{r['concurrency']:>6}{_percent(p95):>12}{_percent(rps):>12}"
+              f"{old['error_rate']:>7.2%} → {r['error_rate']:<7.2%} {mark}")
+        if reasons:
+            regressions.append((r["scenario"], r["concurrency"], reasons))
+    return regressions
+
+
+def _change(new, old):
+    if new is None or not old:
+        return None
+    return new / old - 1
+
+
+def _percent(value):
+    return "-" if value is None else f"{value:+.1%}"
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="接口压测")
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="并发数，可指定多个")
+    parser.add_argument("--duration", type=float, default=10.0, help="每个场景、每个并发数的压测秒数")
+    parser.add_argument("--requests", type=int, default=0, help="每轮最多请求数（0 表示只按时长）")
+    parser.add_argument("--timeout", type=float, default=60.0, help="单个请求超时秒数")
+    parser.add_argument("--academic-year", default="2024-2025")
+    parser.add_argument("--semester", type=int, default=1)
+    parser.add_argument("--write-year", default="bench-2099", help="综测录入和排名计算写入的学年")
+    parser.add_argument("--password", default="123456", help="学生账号密码")
+    parser.add_argument("--admin-user", default="admin", help="调用写接口的管理员账号")
+    parser.add_argument("--admin-password", default="admin123")
+    parser.add_argument("--sample", type=int, default=2000, help="从导出数据中抽取的学号数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    parser.add_argument("--baseline", help="与之前保存的 JSON 结果对比")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的性能波动比例")
+    args = parser.parse_args()
+
+    ctx = prepare(args)
+    print(f"后端地址: {args.base_url}  学期: {args.academic_year} 第{args.semester}学期  "
+          f"学号样本: {len(ctx['student_ids'])}")
+    print(f"{'场景':<20}{'并发':>6}{'请求数':>8}{'吞吐量/秒':>10}{'错误率':>8}"
+          f"{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+
+    started_at = datetime.now().isoformat(timespec="seconds")
+    results = []
+    for name in args.scenarios:
+        for concurrency in args.concurrency:
+            result = run(args.base_url, SCENARIOS[name], ctx, concurrency, args.duration,
+                         args.requests, args.seed, args.timeout)
+            result = {"scenario": name, "concurrency": concurrency, **result}
+            results.append(result)
+            print(f"{name:<20}{concurrency:>6}{result['requests']:>8}{result['throughput_rps']:>10}"
+                  f"{result['error_rate']:>8.2%}{result['p50_ms']!s:>10}{result['p95_ms']!s:>10}"
+                  f"{result['p99_ms']!s:>10}")
+
+    report = {
+        "started_at": started_at,
+        "commit": current_commit(),
+        "base_url": args.base_url,
+        "academic_year": args.academic_year,
+        "semester": args.semester,
+        "duration": args.duration,
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} 项性能退化")
+            sys.exit(1)
+        print("\n✅ 未发现性能退化")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+综测批量录入性能对比
+对同一批学生，比较逐个调用 POST /api/evaluation/add 与一次调用 POST /api/evaluation/batch 的耗时。
+
+需要先启动扩展版后端（python backend/main_extended.py）。录入接口需要管理员或教师权限，
+先用 --username / --password 登录（默认 admin / admin123）。
+数据写入单独的学年（默认 bench-2099），不会覆盖真实学期的综测数据。
+
+用法:
+    python benchmarks/bench_evaluation_batch.py
+    python benchmarks/bench_evaluation_batch.py --students 500 --base-url http://localhost:8001
+"""
+
+import argparse
+import random
+import time
+
+import requests
+
+
+def fetch_student_ids(base_url, count):
+    """用游标分页取前 count 个学号"""
+    ids, cursor = [], ""
+    while len(ids) < count and cursor is not None:
+        response = requests.get(f"{base_url}/api/students/list",
+                                params={"cursor": cursor, "size": min(100, count - len(ids))})
+        response.raise_for_status()
+        data = response.json()
+        ids.extend(s["StudentID"] for s in data["students"])
+        cursor = data["next_cursor"]
+    return ids
+
+
+def login(base_url, username, password):
+    """登录并返回带令牌的会话"""
+    response = requests.post(f"{base_url}/api/login", json={"username": username, "password": password})
+    if response.status_code != 200:
+        raise SystemExit(f"❌ 登录失败: {response.text}")
+    session = login(args.base_url, args.username, args.password)
+    session.headers["Authorization"] = f"Bearer {response.json()['token']}"
+    return session
+
+
+def make_evaluation(student_id, academic_year, rng):
+    return {
+        "student_id": student_id,
+        "academic_year": academic_year,
+        "semester": 1,
+        "physical_score": round(rng.uniform(60, 100), 2),
+        "moral_score": round(rng.uniform(70, 100), 2),
+        "gpa": round(rng.uniform(2, 4), 2),
+        "academic_score": round(rng.uniform(60, 95), 2),
+        "innovation_basic_score": round(rng.uniform(0, 5), 2),
+        "innovation_bonus_score": round(rng.uniform(0, 5), 2),
+        "student_work_score": round(rng.uniform(0, 3), 2),
+        "social_service_score": round(rng.uniform(0, 3), 2),
+        "social_reward_score": round(rng.uniform(0, 2), 2),
+        "cultural_sports_score": round(rng.uniform(0, 5), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="综测批量录入性能对比")
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--academic-year", default="bench-2099")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--username", default="admin", help="管理员或教师账号")
+    parser.add_argument("--password", default="admin123")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    student_ids = fetch_student_ids(args.base_url, args.students)
+    if not student_ids:
+        print("❌ 没有学生数据，请先导入学生")
+        return
+    print(f"学生数: {len(student_ids)}  学年: {args.academic_year}")
+
+    session = login(args.base_url, args.username, args.password)
+
+    # 1. 逐个录入
+    evaluations = [make_evaluation(sid, args.academic_year, rng) for sid in student_ids]
+    started = time.perf_counter()
+    failures = 0
+    for evaluation in evaluations:
+        if session.post(f"{args.base_url}/api/evaluation/add", json=evaluation).status_code != 200:
+            failures += 1
+    single_seconds = time.perf_counter() - started
+    print(f"逐个录入: {single_seconds:.3f} 秒 ({len(evaluations) / single_seconds:.0f} 条/秒, 失败 {failures})")
+
+    # 2. 批量录入（此时记录已存在，走 MERGE 的更新分支；再换一批分数保证确实写入）
+    evaluations = [make_evaluation(sid, args.academic_year, rng) for sid in student_ids]
+    started = time.perf_counter()
+    response = session.post(f"{args.base_url}/api/evaluation/batch", json=evaluations)
+    batch_seconds = time.perf_counter() - started
+    if response.status_code != 200:
+        print(f"❌ 批量录入失败: {response.text}")
+        return
+    report = response.json()
+    print(f"批量录入: {batch_seconds:.3f} 秒 ({len(evaluations) / batch_seconds:.0f} 条/秒, "
+          f"新增 {report['inserted']} 更新 {report['updated']} 拒绝 {report['rejected']})")
+    print(f"加速比: {single_seconds / batch_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
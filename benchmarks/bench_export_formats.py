@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导出格式性能对比
+比较 xlsx / csv / ndjson / parquet 四种导出格式的吞吐量和峰值内存。
+
+不需要数据库：使用模拟游标按块生成与 v_ComprehensiveEvaluationDetails 导出查询
+相同列名和类型（pyodbc 对 DECIMAL 列返回 Decimal）的数据。
+每个 (格式, 行数) 组合在独立子进程中运行，峰值内存取子进程的最大常驻内存。
+
+用法:
+    python benchmarks/bench_export_formats.py
+    python benchmarks/bench_export_formats.py --rows 10000 100000 --formats csv parquet
+    python benchmarks/bench_export_formats.py --json bench_output.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+COLUMNS = ["年级排名", "班级排名", "学号", "姓名", "班级", "体测成绩", "品德表现", "绩点",
+           "学业成绩", "创新实践", "社会实践", "文体实践", "总积分"]
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗"
+GIVEN = "伟芳娜秀英敏静丽强磊军洋勇艳杰娟涛明超秀兰霞平刚桂英"
+
+
+class SyntheticCursor:
+    """只实现导出用到的 description / fetchmany 的模拟游标"""
+
+    def __init__(self, total):
+        self.total = total
+        self.produced = 0
+        self.description = [(name, None, None, None, None, None, True) for name in COLUMNS]
+
+    def fetchmany(self, size):
+        start = self.produced
+        end = min(self.total, start + size)
+        self.produced = end
+        return [self._row(i) for i in range(start, end)]
+
+    @staticmethod
+    def _row(i):
+        class_no = i // 40
+        score = Decimal(900000 - i * 7 % 900000) / 10000
+        return (
+            i + 1,
+            i % 40 + 1,
+            3124000000 + i,
+            SURNAMES[i % len(SURNAMES)] + GIVEN[i % len(GIVEN)] + GIVEN[i * 7 % len(GIVEN)],
+            f"24计算机科学与技术{class_no % 30 + 1}班",
+            Decimal(60 + i % 40),
+            Decimal("85.50"),
+            Decimal(i % 400) / 100,
+            Decimal(60 + i % 35) + Decimal("0.25"),
+            Decimal(i % 10),
+            Decimal(i % 6) / 2,
+            Decimal(i % 5),
+            score,
+        )
+
+
+def run_child(fmt, rows):
+    """在子进程中执行一次导出，输出耗时和字节数"""
+    import exporters
+
+    cursor = SyntheticCursor(rows)
+    started = time.perf_counter()
+    if fmt == "xlsx":
+        body = exporters.iter_file(exporters.write_xlsx(cursor, sheet_name="2024-2025学年第1学期综测"))
+    elif fmt == "parquet":
+        body = exporters.iter_file(exporters.write_parquet(cursor))
+    else:
+        body = exporters.ROW_STREAMERS[fmt](cursor)
+    size = 0
+    for chunk in body:
+        size += len(chunk)
+    elapsed = time.perf_counter() - started
+    print(json.dumps({"seconds": elapsed, "bytes": size}))
+
+
+def run_case(fmt, rows):
+    proc = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--child", fmt, str(rows)],
+        stdout=subprocess.PIPE,
+    )
+    output = proc.stdout.read()
+    proc.stdout.close()
+    _, status, usage = os.wait4(proc.pid, 0)
+    if status != 0:
+        raise RuntimeError(f"{fmt} {rows} 行导出失败")
+    result = json.loads(output)
+    # Linux 下 ru_maxrss 单位为 KB，macOS 下为字节
+    peak_bytes = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    return {
+        "format": fmt,
+        "rows": rows,
+        "seconds": round(result["seconds"], 3),
+        "rows_per_second": round(rows / result["seconds"]) if result["seconds"] else None,
+        "output_bytes": result["bytes"],
+        "peak_rss_mb": round(peak_bytes / 1024 / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导出格式性能对比")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--formats", nargs="+", default=["xlsx", "csv", "ndjson", "parquet"])
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], int(args.child[1]))
+        return
+
+    print(f"{'格式':<8}{'行数':>10}{'耗时(s)':>10}{'行/秒':>12}{'输出(MB)':>10}{'峰值内存(MB)':>14}")
+    results = []
+    for rows in args.rows:
+        for fmt in args.formats:
+            r = run_case(fmt, rows)
+            results.append(r)
+            print(f"{fmt:<8}{rows:>10}{r['seconds']:>10}{r['rows_per_second']:>12}"
+                  f"{r['output_bytes'] / 1024 / 1024:>10.1f}{r['peak_rss_mb']:>14}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+综测查询索引前后对比
+先删除 database/evaluation_indexes_schema.sql 增加的索引，执行排名列表、导出、学生详情、排名计算等查询；
+再建立索引（统计建索引耗时），重复同样的查询，输出每个查询前后的耗时和执行计划。
+结束时索引保持建立后的状态。
+
+排名计算在事务中执行后回滚，不改变库中数据，用于观察索引带来的写入开销。
+建议先用 generate_data.py 生成 10 万条以上的综测记录。
+
+用法:
+    python benchmarks/generate_data.py --backend sqlite --path /tmp/bench.db --students 40000
+    python benchmarks/bench_indexes.py --backend sqlite --path /tmp/bench.db
+    python benchmarks/bench_indexes.py --backend sqlserver --repeat 50 --explain --json indexes.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from bench_storage import DEFAULT_CONN_STR, run_case  # noqa: E402
+from evaluation_detail import DETAIL_SQL  # noqa: E402
+from exporters import FETCH_SIZE, build_export_query  # noqa: E402
+from migrations import split_batches  # noqa: E402
+from ranking import VERIFY_SQL, full_rankings  # noqa: E402
+from storage import DEFAULT_SQLITE_PATH, SqliteStorage, SqlServerStorage  # noqa: E402
+
+MIGRATION = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "database",
+                         "evaluation_indexes_schema.sql")
+
+# 迁移脚本新增的索引：索引名 -> 表名
+MIGRATION_INDEXES = {
+    "IX_ComprehensiveEvaluations_Term_ClassRank": "ComprehensiveEvaluations",
+    "IX_ComprehensiveEvaluations_Term_GradeRank": "ComprehensiveEvaluations",
+    "IX_ComprehensiveEvaluations_Term_TotalScore": "ComprehensiveEvaluations",
+    "IX_Students_ClassID": "Students",
+}
+
+# SQL Server 上迁移前的 IX_BonusDetails_EvaluationID 没有 INCLUDE 列
+SQLSERVER_PREVIOUS_INDEXES = (
+    "CREATE INDEX IX_BonusDetails_EvaluationID ON BonusDetails(EvaluationID) WITH (DROP_EXISTING = ON)",
+)
+
+
+def build_cases(cursor, dialect, batch_size):
+    """返回 (学年, 学期, [(名称, SQL, 参数)])；库中没有综测数据时返回 None"""
+    cursor.execute("""
+        SELECT AcademicYear, Semester, COUNT(*) FROM ComprehensiveEvaluations
+        GROUP BY AcademicYear, Semester ORDER BY COUNT(*) DESC
+    """)
+    semester = cursor.fetchone()
+    if not semester:
+        return None
+    academic_year, term, _ = semester
+
+    # 人数最多的班级，批量详情取该班学生
+    cursor.execute("""
+        SELECT s.ClassID, COUNT(*) FROM ComprehensiveEvaluations ce
+        JOIN Students s ON ce.StudentID = s.StudentID
+        WHERE ce.AcademicYear = ? AND ce.Semester = ?
+        GROUP BY s.ClassID ORDER BY COUNT(*) DESC
+    """, (academic_year, term))
+    class_id = cursor.fetchone()[0]
+    cursor.execute("""
+        SELECT ce.StudentID FROM ComprehensiveEvaluations ce
+        JOIN Students s ON ce.StudentID = s.StudentID
+        WHERE ce.AcademicYear = ? AND ce.Semester = ? AND s.ClassID = ?
+    """, (academic_year, term, class_id))
+    student_ids = [row[0] for row in cursor.fetchall()][:batch_size]
+    cursor.execute("""
+        SELECT AVG(TotalScore) FROM ComprehensiveEvaluations
+        WHERE AcademicYear = ? AND Semester = ?
+    """, (academic_year, term))
+    middle_score = cursor.fetchone()[0] or 0
+
+    top, top_params = dialect.page(0, 50)
+    export_sql, export_params = build_export_query(academic_year, term)
+    class_sql, class_params = build_export_query(academic_year, term, class_id)
+    cases = [
+        ("排名列表", f"""
+            SELECT
+                ClassRank, StudentName, TotalScore, GPA, AcademicScore,
+                InnovationTotalScore, SocialTotalScore, CulturalSportsScore
+            FROM v_ComprehensiveEvaluationDetails
+            WHERE AcademicYear = ? AND Semester = ?
+            ORDER BY ClassRank
+            {top}
+        """, [academic_year, term, *top_params]),
+        ("整学期导出", export_sql, list(export_params)),
+        ("按班级导出", class_sql, list(class_params)),
+        ("批量学生详情", DETAIL_SQL.format(placeholders=", ".join("?" * len(student_ids))),
+         [*student_ids, academic_year, term]),
+        ("分数段人数", """
+            SELECT COUNT(*) FROM ComprehensiveEvaluations
+            WHERE AcademicYear = ? AND Semester = ? AND TotalScore > ?
+        """, [academic_year, term, middle_score]),
+        ("排名校验", VERIFY_SQL, [academic_year, term, academic_year, term]),
+    ]
+    return academic_year, term, cases
+
+
+def run_first_chunk(cursor, sql, params, repeat):
+    """流式导出发出第一块数据前的等待时间：执行查询并取出第一块"""
+    timings = []
+    for i in range(repeat + 1):
+        started = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchmany(FETCH_SIZE)
+        elapsed = time.perf_counter() - started
+        cursor.fetchall()
+        if i:
+            timings.append(elapsed * 1000)
+    timings.sort()
+    return {"p50_ms": round(timings[len(timings) // 2], 3), "mean_ms": round(sum(timings) / len(timings), 3)}
+
+
+def run_ranking(conn, dialect, academic_year, semester, repeat):
+    """全量排名计算，每次执行后回滚"""
+    timings = []
+    for i in range(repeat + 1):
+        started = time.perf_counter()
+        full_rankings(conn, academic_year, semester, dialect)
+        elapsed = time.perf_counter() - started
+        conn.rollback()
+        if i:
+            timings.append(elapsed * 1000)
+    timings.sort()
+    return {"p50_ms": round(timings[len(timings) // 2], 3), "mean_ms": round(sum(timings) / len(timings), 3)}
+
+
+def drop_indexes(conn, dialect):
+    cursor = conn.cursor()
+    for name, table in MIGRATION_INDEXES.items():
+        if dialect.name == "sqlite":
+            cursor.execute(f"DROP INDEX IF EXISTS {name}")
+        else:
+            cursor.execute(f"DROP INDEX IF EXISTS {name} ON {table}")
+    if dialect.name == "sqlserver":
+        for sql in SQLSERVER_PREVIOUS_INDEXES:
+            cursor.execute(sql)
+    conn.commit()
+    cursor.close()
+
+
+def create_indexes(storage):
+    """建立迁移中的索引，返回耗时（秒）"""
+    started = time.perf_counter()
+    if storage.dialect.name == "sqlite":
+        storage.initialize()  # sqlite_schema.sql 中的索引都是 IF NOT EXISTS，之后更新统计信息
+    else:
+        with open(MIGRATION, encoding="utf-8-sig") as f:
+            batches = split_batches(f.read())
+        conn = storage.connect()
+        try:
+            cursor = conn.cursor()
+            for _, batch, _ in batches:
+                cursor.execute(batch)
+                while cursor.nextset():
+                    pass
+            conn.commit()
+        finally:
+            conn.close()
+    return time.perf_counter() - started
+
+
+def run_all(conn, dialect, academic_year, semester, cases, args):
+    cursor = conn.cursor()
+    results = {}
+    for name, sql, params in cases:
+        result = run_case(cursor, sql, params, args.repeat)
+        if args.explain:
+            result["plan"] = dialect.explain(cursor, sql, params)
+        results[name] = result
+    export_sql, export_params = build_export_query(academic_year, semester)
+    results["整学期导出首块"] = run_first_chunk(cursor, export_sql, export_params, args.repeat)
+    cursor.close()
+    results["全量排名计算"] = run_ranking(conn, dialect, academic_year, semester, args.ranking_repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="综测查询索引前后对比")
+    parser.add_argument("--backend", choices=["sqlite", "sqlserver"], default="sqlite")
+    parser.add_argument("--path", default=DEFAULT_SQLITE_PATH, help="SQLite 数据库文件")
+    parser.add_argument("--conn-str", default=DEFAULT_CONN_STR, help="SQL Server 连接字符串")
+    parser.add_argument("--repeat", type=int, default=20, help="每个查询的执行次数")
+    parser.add_argument("--ranking-repeat", type=int, default=3, help="全量排名计算的执行次数")
+    parser.add_argument("--batch-size", type=int, default=35, help="批量学生详情的学生数")
+    parser.add_argument("--explain", action="store_true", help="输出每个查询前后的执行计划")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    if args.backend == "sqlite":
+        storage = SqliteStorage(args.path)
+        storage.initialize()
+    else:
+        storage = SqlServerStorage(args.conn_str)
+    dialect = storage.dialect
+    conn = storage.connect()
+    try:
+        cursor = conn.cursor()
+        prepared = build_cases(cursor, dialect, args.batch_size)
+        cursor.execute("SELECT COUNT(*) FROM ComprehensiveEvaluations")
+        evaluations = cursor.fetchone()[0]
+        cursor.close()
+        if prepared is None:
+            print("❌ 数据库中没有综测数据，请先用 generate_data.py 生成数据")
+            return
+        academic_year, semester, cases = prepared
+        print(f"存储后端: {dialect.name}  综测记录 {evaluations} 条  测试学期 {academic_year} 第{semester}学期")
+
+        drop_indexes(conn, dialect)
+        before = run_all(conn, dialect, academic_year, semester, cases, args)
+    finally:
+        conn.close()
+
+    # 建索引后重新连接：SQLite 的统计信息在打开连接时载入，与重启后端的情况相同
+    build_seconds = create_indexes(storage)
+    conn = storage.connect()
+    try:
+        after = run_all(conn, dialect, academic_year, semester, cases, args)
+    finally:
+        conn.close()
+
+    print(f"建立索引耗时 {build_seconds:.2f} 秒")
+    print(f"{'查询':<14}{'行数':>8}{'之前p50(ms)':>14}{'之后p50(ms)':>14}{'提升':>10}")
+    results = []
+    for name in before:
+        b, a = before[name], after[name]
+        speedup = round(b["p50_ms"] / a["p50_ms"], 1) if a["p50_ms"] else None
+        print(f"{name:<14}{a.get('rows', ''):>8}{b['p50_ms']:>14}{a['p50_ms']:>14}{f'{speedup}x':>10}")
+        if args.explain and "plan" in a:
+            print("    之前:")
+            for line in b["plan"]:
+                print(f"      {line}")
+            print("    之后:")
+            for line in a["plan"]:
+                print(f"      {line}")
+        results.append({"name": name, "before": b, "after": a, "speedup": speedup})
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"backend": storage.describe(), "evaluations": evaluations, "repeat": args.repeat,
+                       "index_build_seconds": round(build_seconds, 3), "results": results},
+                      f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
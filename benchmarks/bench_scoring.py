@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+综测总分计算性能对比
+对同一学期的全部综测记录，比较逐条调用 sp_CalculateComprehensiveScore 与 scoring.recalculate_scores
+一次向量化计算的耗时，并核对两者结果一致。
+
+直接连接数据库执行，每种方式运行前都会把该学期的 C、S、P 清空，保证两者写入的行数相同。
+默认使用 bench_evaluation_batch.py 写入的学年（bench-2099），不会改动真实学期的数据。
+
+用法:
+    python benchmarks/bench_scoring.py
+    python benchmarks/bench_scoring.py --academic-year 2024-2025 --semester 1
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pyodbc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from scoring import recalculate_scores  # noqa: E402
+
+DEFAULT_CONN_STR = (
+    "DRIVER={ODBC Driver 17 for SQL Server};"
+    "SERVER=localhost;"
+    "DATABASE=GradeSystemDB;"
+    "Trusted_Connection=yes;"
+)
+
+
+def reset_totals(conn, academic_year, semester):
+    cursor = conn.cursor()
+    cursor.execute("""
+        UPDATE ComprehensiveEvaluations
+        SET InnovationTotalScore = NULL, SocialTotalScore = NULL, TotalScore = NULL
+        WHERE AcademicYear = ? AND Semester = ?
+    """, (academic_year, semester))
+    conn.commit()
+
+
+def snapshot(conn, academic_year, semester):
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT EvaluationID, InnovationTotalScore, SocialTotalScore, TotalScore
+        FROM ComprehensiveEvaluations
+        WHERE AcademicYear = ? AND Semester = ?
+        ORDER BY EvaluationID
+    """, (academic_year, semester))
+    return [tuple(row) for row in cursor.fetchall()]
+
+
+def run_procedure(conn, academic_year, semester):
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT EvaluationID FROM ComprehensiveEvaluations WHERE AcademicYear = ? AND Semester = ?",
+        (academic_year, semester),
+    )
+    evaluation_ids = [row[0] for row in cursor.fetchall()]
+    for evaluation_id in evaluation_ids:
+        cursor.execute("{CALL sp_CalculateComprehensiveScore (?)}", (evaluation_id,))
+    conn.commit()
+    return len(evaluation_ids)
+
+
+def run_vectorized(conn, academic_year, semester):
+    report = recalculate_scores(conn, academic_year, semester)
+    conn.commit()
+    return report["updated"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="综测总分计算性能对比")
+    parser.add_argument("--conn-str", default=DEFAULT_CONN_STR)
+    parser.add_argument("--academic-year", default="bench-2099")
+    parser.add_argument("--semester", type=int, default=1)
+    args = parser.parse_args()
+
+    conn = pyodbc.connect(args.conn_str)
+    try:
+        timings, results = {}, {}
+        for name, run in (("存储过程逐条计算", run_procedure), ("向量化批量计算", run_vectorized)):
+            reset_totals(conn, args.academic_year, args.semester)
+            started = time.perf_counter()
+            rows = run(conn, args.academic_year, args.semester)
+            timings[name] = time.perf_counter() - started
+            results[name] = snapshot(conn, args.academic_year, args.semester)
+            rate = rows / timings[name] if timings[name] else 0
+            print(f"{name}: {timings[name]:.3f} 秒 ({rows} 条, {rate:.0f} 条/秒)")
+
+        if not results["存储过程逐条计算"]:
+            print("❌ 该学期没有综测数据，请先运行 bench_evaluation_batch.py 或指定 --academic-year")
+            return
+        same = results["存储过程逐条计算"] == results["向量化批量计算"]
+        print(f"结果一致: {'✅' if same else '❌'}")
+        print(f"加速比: {timings['存储过程逐条计算'] / timings['向量化批量计算']:.1f}x")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查询结果序列化性能对比
+1. 对接口中的主要查询（学生分页、排名列表、学生详情、总数），比较原来的 pd.read_sql + to_dict('records')
+   与 serializer.query_records 直接读取游标的单次耗时，并核对两者经 FastAPI 编码后的结果一致
+2. 对同样的结果，比较 FastAPI 默认的 jsonable_encoder + JSONResponse 与 FastJSONResponse
+   （字典列表 / 紧凑的列名 + 行数组）生成响应体的 CPU 耗时和响应大小
+3. 测量 import pandas 的耗时
+
+用法:
+    python benchmarks/bench_serialization.py --backend sqlite --path database/loadtest.db
+    python benchmarks/bench_serialization.py --backend sqlserver --repeat 500
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from serializer import (  # noqa: E402
+    FastJSONResponse, query_record, query_records, query_scalar, query_table, table_content,
+)
+from storage import DEFAULT_SQLITE_PATH, SqliteStorage, SqlServerStorage  # noqa: E402
+
+DEFAULT_CONN_STR = (
+    "DRIVER={ODBC Driver 17 for SQL Server};"
+    "SERVER=localhost;"
+    "DATABASE=GradeSystemDB;"
+    "Trusted_Connection=yes;"
+)
+
+STUDENT_PAGE_SQL = """
+    SELECT
+        s.StudentID, s.Name, s.Major, s.Gender, s.Hometown, s.Phone,
+        s.Email, s.EnrollmentDate, s.Status, c.ClassName,
+        s.CreatedAt, s.UpdatedAt
+    FROM Students s
+    LEFT JOIN Classes c ON s.ClassID = c.ClassID
+    ORDER BY s.StudentID
+    {page}
+"""
+RANKING_SQL = """
+    SELECT
+        ClassRank, StudentName, TotalScore, GPA, AcademicScore,
+        InnovationTotalScore, SocialTotalScore, CulturalSportsScore
+    FROM v_ComprehensiveEvaluationDetails
+    WHERE AcademicYear = ? AND Semester = ?
+    ORDER BY ClassRank
+    {page}
+"""
+DETAIL_SQL = """
+    SELECT * FROM v_ComprehensiveEvaluationDetails
+    WHERE StudentID = ? AND AcademicYear = ? AND Semester = ?
+"""
+
+
+def pandas_records(conn, sql, params):
+    """原来的写法：经 DataFrame 转换，空值统一为 None"""
+    df = pd.read_sql(sql, conn, params=list(params))
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+def build_cases(conn, dialect):
+    evaluation = query_record(conn, """
+        SELECT StudentID, AcademicYear, Semester FROM ComprehensiveEvaluations
+        ORDER BY EvaluationID
+    """)
+    page20, params20 = dialect.page(0, 21)
+    page100, params100 = dialect.page(0, 101)
+    cases = [
+        ("学生分页 20 行", STUDENT_PAGE_SQL.format(page=page20), params20, False),
+        ("学生分页 100 行", STUDENT_PAGE_SQL.format(page=page100), params100, False),
+        ("学生总数", "SELECT COUNT(*) FROM Students", [], True),
+    ]
+    if evaluation:
+        top, top_params = dialect.page(0, 50)
+        key = [evaluation["AcademicYear"], evaluation["Semester"]]
+        cases += [
+            ("排名列表 50 行", RANKING_SQL.format(page=top), key + top_params, False),
+            ("学生详情 1 行", DETAIL_SQL, [evaluation["StudentID"]] + key, False),
+        ]
+    return cases
+
+
+def timed(fn, repeat):
+    fn()  # 预热
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def import_seconds(module):
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return float(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查询结果序列化性能对比")
+    parser.add_argument("--backend", choices=["sqlite", "sqlserver"], default="sqlite")
+    parser.add_argument("--path", default=DEFAULT_SQLITE_PATH, help="SQLite 数据库文件")
+    parser.add_argument("--conn-str", default=DEFAULT_CONN_STR, help="SQL Server 连接字符串")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.backend == "sqlite":
+        storage = SqliteStorage(args.path)
+        storage.initialize()
+    else:
+        storage = SqlServerStorage(args.conn_str)
+    conn = storage.connect()
+    try:
+        cases = build_cases(conn, storage.dialect)
+        print(f"存储后端: {storage.dialect.name}  每个查询执行 {args.repeat} 次")
+        print(f"{'查询':<16}{'pandas(μs)':>12}{'serializer(μs)':>16}{'节省':>8}{'结果一致':>10}")
+        for name, sql, params, scalar in cases:
+            if scalar:
+                old = lambda: int(pd.read_sql(sql, conn, params=list(params)).iloc[0, 0])  # noqa: E731
+                new = lambda: query_scalar(conn, sql, params)  # noqa: E731
+            else:
+                old = lambda: pandas_records(conn, sql, params)  # noqa: E731
+                new = lambda: query_records(conn, sql, params)  # noqa: E731
+            same = jsonable_encoder(old()) == jsonable_encoder(new())
+            old_us, new_us = timed(old, args.repeat), timed(new, args.repeat)
+            print(f"{name:<16}{old_us:>12.0f}{new_us:>16.0f}{1 - new_us / old_us:>8.0%}{'✅' if same else '❌':>10}")
+
+        print(f"\n{'响应编码':<16}{'默认(μs)':>10}{'Fast(μs)':>10}{'紧凑(μs)':>10}{'默认大小':>10}{'紧凑大小':>10}")
+        for name, sql, params, scalar in cases:
+            if scalar:
+                continue
+            columns, rows = query_table(conn, sql, params)
+            records = table_content(columns, rows, False)
+            default = lambda: JSONResponse(jsonable_encoder({"rows": records})).body  # noqa: E731
+            fast = lambda: FastJSONResponse({"rows": records}).body  # noqa: E731
+            compact = lambda: FastJSONResponse({"rows": table_content(columns, rows, True)}).body  # noqa: E731
+            print(f"{name:<16}{timed(default, args.repeat):>10.0f}{timed(fast, args.repeat):>10.0f}"
+                  f"{timed(compact, args.repeat):>10.0f}{len(default()):>10}{len(compact()):>10}")
+    finally:
+        conn.close()
+
+    print(f"\nimport pandas: {import_seconds('pandas') * 1000:.0f} ms"
+          f"  import sqlite3: {import_seconds('sqlite3') * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
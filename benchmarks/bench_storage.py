@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+存储后端查询性能对比
+对同一份数据，在 SQL Server 或 SQLite 上执行后端的主要查询（学生分页、排名列表、学生详情、导出等），
+统计每个查询的耗时分位数，并可输出执行计划，用于比较两种存储后端的查询计划和吞吐量。
+
+查询语句与 main_extended.py 中的相同，参数从库中已有的数据选取。
+
+用法:
+    python benchmarks/bench_storage.py --backend sqlite --path database/gradesystem.db
+    python benchmarks/bench_storage.py --backend sqlserver --repeat 50 --explain
+    python benchmarks/bench_storage.py --backend sqlite --json sqlite_result.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from evaluation_detail import DETAIL_SQL  # noqa: E402
+from exporters import build_export_query  # noqa: E402
+from storage import DEFAULT_SQLITE_PATH, SqliteStorage, SqlServerStorage  # noqa: E402
+
+DEFAULT_CONN_STR = (
+    "DRIVER={ODBC Driver 17 for SQL Server};"
+    "SERVER=localhost;"
+    "DATABASE=GradeSystemDB;"
+    "Trusted_Connection=yes;"
+)
+
+STUDENT_COLUMNS = """
+    s.StudentID, s.Name, s.Major, s.Gender, s.Hometown, s.Phone,
+    s.Email, s.EnrollmentDate, s.Status, c.ClassName,
+    s.CreatedAt, s.UpdatedAt"""
+
+
+def build_cases(cursor, dialect, page_size):
+    """返回 [(名称, SQL, 参数)]；库中没有数据时返回空列表"""
+    cursor.execute("SELECT COUNT(*), MIN(StudentID), MAX(StudentID) FROM Students")
+    students, min_id, max_id = cursor.fetchone()
+    if not students:
+        return []
+    cursor.execute("""
+        SELECT AcademicYear, Semester, COUNT(*) FROM ComprehensiveEvaluations
+        GROUP BY AcademicYear, Semester ORDER BY COUNT(*) DESC
+    """)
+    semester = cursor.fetchone()
+
+    page, page_params = dialect.page(0, page_size + 1)
+    deep_page, deep_params = dialect.page(max(students - page_size, 0), page_size + 1)
+    cases = [
+        ("学生列表-游标分页", f"""
+            SELECT {STUDENT_COLUMNS}
+            FROM Students s LEFT JOIN Classes c ON s.ClassID = c.ClassID
+            WHERE s.StudentID > ?
+            ORDER BY s.StudentID
+            {page}
+        """, [(min_id + max_id) // 2, *page_params]),
+        ("学生列表-末页页码分页", f"""
+            SELECT {STUDENT_COLUMNS}
+            FROM Students s LEFT JOIN Classes c ON s.ClassID = c.ClassID
+            ORDER BY s.StudentID
+            {deep_page}
+        """, deep_params),
+        ("学生总数", "SELECT COUNT(*) FROM Students", []),
+        ("课程搜索", """
+            SELECT COUNT(*) FROM Courses
+            WHERE CourseCode LIKE ? OR CourseName LIKE ? OR Department LIKE ?
+        """, ["%数据%"] * 3),
+    ]
+    if semester:
+        academic_year, term, _ = semester
+        cursor.execute(
+            "SELECT MIN(StudentID) FROM ComprehensiveEvaluations WHERE AcademicYear = ? AND Semester = ?",
+            (academic_year, term),
+        )
+        student_id = cursor.fetchone()[0]
+        top, top_params = dialect.page(0, 50)
+        export_sql, export_params = build_export_query(academic_year, term)
+        cases += [
+            ("排名列表", f"""
+                SELECT
+                    ClassRank, StudentName, TotalScore, GPA, AcademicScore,
+                    InnovationTotalScore, SocialTotalScore, CulturalSportsScore
+                FROM v_ComprehensiveEvaluationDetails
+                WHERE AcademicYear = ? AND Semester = ?
+                ORDER BY ClassRank
+                {top}
+            """, [academic_year, term, *top_params]),
+            ("学生综测详情", DETAIL_SQL.format(placeholders="?"), [student_id, academic_year, term]),
+            ("整学期导出", export_sql, list(export_params)),
+        ]
+    return cases
+
+
+def run_case(cursor, sql, params, repeat):
+    timings, rows = [], 0
+    for i in range(repeat + 1):
+        started = time.perf_counter()
+        cursor.execute(sql, params)
+        rows = len(cursor.fetchall())
+        elapsed = time.perf_counter() - started
+        if i:  # 第一次用于预热，不计入
+            timings.append(elapsed * 1000)
+    timings.sort()
+    return {
+        "rows": rows,
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "qps": round(1000 / statistics.fmean(timings), 1) if statistics.fmean(timings) else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="存储后端查询性能对比")
+    parser.add_argument("--backend", choices=["sqlite", "sqlserver"], default="sqlite")
+    parser.add_argument("--path", default=DEFAULT_SQLITE_PATH, help="SQLite 数据库文件")
+    parser.add_argument("--conn-str", default=DEFAULT_CONN_STR, help="SQL Server 连接字符串")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--explain", action="store_true", help="输出每个查询的执行计划")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    if args.backend == "sqlite":
+        storage = SqliteStorage(args.path)
+        storage.initialize()
+    else:
+        storage = SqlServerStorage(args.conn_str)
+    conn = storage.connect()
+    cursor = conn.cursor()
+    try:
+        cases = build_cases(cursor, storage.dialect, args.page_size)
+        if not cases:
+            print("❌ 数据库中没有学生数据，请先导入数据")
+            return
+        print(f"存储后端: {storage.dialect.name}  每个查询执行 {args.repeat} 次")
+        print(f"{'查询':<16}{'行数':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'平均(ms)':>10}{'次/秒':>10}")
+        results = []
+        for name, sql, params in cases:
+            result = run_case(cursor, sql, params, args.repeat)
+            print(f"{name:<16}{result['rows']:>8}{result['p50_ms']:>10}{result['p95_ms']:>10}"
+                  f"{result['mean_ms']:>10}{result['qps']:>10}")
+            if args.explain:
+                result["plan"] = storage.dialect.explain(cursor, sql, params)
+                for line in result["plan"]:
+                    print(f"    {line}")
+            results.append(dict(result, name=name))
+    finally:
+        conn.close()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"backend": storage.describe(), "repeat": args.repeat, "results": results},
+                      f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
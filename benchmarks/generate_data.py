@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压测数据生成
+按给定规模生成班级、学生、学生账号、课程、课程开设、成绩、综测记录和加分明细，直接批量写入数据库，
+用于在接近生产规模的数据（10万 ~ 100万学生、数千个班级、多个学年）上做性能测试。
+
+数据分布：
+- 班级人数约为 --class-size（正态分布，15 ~ 60 人），专业按热门程度分布，年级覆盖所有在读和已毕业的届次
+- 每名学生在读的 4 年内每学期有一条综测记录和 --courses-per-semester 门课程成绩
+- 课程成绩由学生的学习能力和课程难度决定，绩点按学分加权，学业成绩 X = 50 + 10 × 绩点
+- 加分项目大部分学生为 0，少数学生有一项或多项，每个非 0 分项对应一条加分明细
+- C、S、P 用 scoring.compute_scores 计算，与后端的计算结果一致；生成后按学期计算排名
+
+相同的 --seed 和规模参数总是生成相同的数据。各表的 ID 接在库中已有数据之后分配，
+不会与现有数据冲突（空库上每次生成的 ID 也相同）。学生账号的初始密码与后端相同（123456），
+保存为 auth 模块的密码哈希，只有哈希中的随机盐每次不同。库中没有管理员账号时另建一个
+（admin / admin123，与示例数据相同），供压测脚本调用需要管理员或教师权限的写接口。
+数据按 --batch-size 分批批量写入（SQL Server 使用 fast_executemany），每个学期写完提交一次，内存占用与学期规模成正比。
+
+用法:
+    python benchmarks/generate_data.py --backend sqlite --path database/loadtest.db --students 100000
+    python benchmarks/generate_data.py --backend sqlserver --students 1000000 --start-year 2020 --years 5
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from academic import compute_academic  # noqa: E402
+from auth import default_password_hash  # noqa: E402
+from ranking import full_rankings  # noqa: E402
+from scoring import compute_scores  # noqa: E402
+from storage import DEFAULT_SQLITE_PATH, SqliteStorage, SqlServerStorage  # noqa: E402
+from student_import import DEFAULT_PASSWORD  # noqa: E402
+
+DEFAULT_CONN_STR = (
+    "DRIVER={ODBC Driver 17 for SQL Server};"
+    "SERVER=localhost;"
+    "DATABASE=GradeSystemDB;"
+    "Trusted_Connection=yes;"
+)
+
+STUDENT_ID_BASE = 3200000000    # 生成的学号从这里开始（库中已有更大的学号时接在其后）
+YEARS_OF_STUDY = 4
+ADMIN_USERNAME = "admin"        # 库中没有管理员时新建的账号，与示例数据相同
+ADMIN_PASSWORD = "admin123"
+SEMESTERS_OF_STUDY = YEARS_OF_STUDY * 2
+
+# (专业, 班级简称, 开课院系)，越靠前的专业学生越多
+MAJORS = [
+    ("计算机科学与技术", "计科", "计算机学院"),
+    ("软件工程", "软工", "计算机学院"),
+    ("数据科学与大数据技术", "数据", "计算机学院"),
+    ("电子信息工程", "电信", "信息工程学院"),
+    ("自动化", "自动化", "自动化学院"),
+    ("机械设计制造及其自动化", "机械", "机电工程学院"),
+    ("土木工程", "土木", "土木与交通工程学院"),
+    ("会计学", "会计", "管理学院"),
+    ("国际经济与贸易", "国贸", "经济学院"),
+    ("英语", "英语", "外国语学院"),
+    ("应用化学", "应化", "化工学院"),
+    ("工业设计", "工设", "艺术与设计学院"),
+]
+COMMON_DEPARTMENTS = ["数学与统计学院", "外国语学院", "马克思主义学院", "体育部"]
+COURSE_TOPICS = [
+    "导论", "原理", "程序设计", "实验", "分析", "设计", "方法", "工程", "技术", "系统",
+    "基础", "应用", "管理", "理论", "综合实践", "专题", "前沿", "建模", "测量", "概论",
+]
+COURSE_LEVELS = ["", "A", "B", "（上）", "（下）", "Ⅰ", "Ⅱ"]
+CREDITS = [1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 5.0]
+CREDIT_WEIGHTS = [0.08, 0.07, 0.25, 0.15, 0.22, 0.08, 0.12, 0.03]
+
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘蔡蒋余于杜叶程苏魏吕丁任沈姚卢"
+GIVEN_CHARS = "伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华玉萍红晨浩宇轩然子涵博文思雨欣怡梓航嘉俊泽睿一诺佳琪晓锦鸿启书"
+PROVINCES = [
+    "广东省", "广西壮族自治区", "湖南省", "湖北省", "江西省", "福建省", "四川省", "河南省",
+    "河北省", "山东省", "江苏省", "浙江省", "安徽省", "贵州省", "云南省", "海南省",
+]
+# 广东生源占多数
+PROVINCE_WEIGHTS = [0.62] + [0.38 / (len(PROVINCES) - 1)] * (len(PROVINCES) - 1)
+CLASS_TIMES = [f"周{d}{p}节" for d in "一二三四五" for p in ("1-2", "3-4", "5-6", "7-8")]
+BUILDINGS = "ABCDEFG"
+
+# 综测分项：(列序号, 非 0 的概率, 可能的分值, 分值权重, 加分项目)
+# 列序号对应 scoring.COMPONENT_COLUMNS: X, C1, C2, S1, S2, S3, W
+BONUS_CATEGORIES = {
+    "C1": (1, 0.22, [3, 8, 10, 20], [0.2, 0.3, 0.35, 0.15], ["创新创业团队立项", "大学生创新训练项目", "学科竞赛参赛"]),
+    "C2": (2, 0.08, [0.5, 3, 8, 18, 28], [0.2, 0.3, 0.25, 0.15, 0.1], ["互联网+大赛获奖", "挑战杯竞赛获奖", "发表学术论文", "获得软件著作权"]),
+    "S1": (3, 0.45, [8, 10, 20, 22, 30, 32, 33], [0.25, 0.15, 0.25, 0.05, 0.15, 0.1, 0.05], ["班级委员", "学生会干事", "社团负责人", "团支部书记", "宿舍长"]),
+    "S2": (4, 0.2, [10, 13, 23, 24, 39, 40], [0.25, 0.15, 0.2, 0.1, 0.15, 0.15], ["志愿服务", "社会实践", "三下乡活动", "校园开放日服务"]),
+    "S3": (5, 0.04, [10], [1.0], ["优秀志愿者", "社会实践先进个人"]),
+    "W": (6, 0.35, [2, 4, 6], [0.7, 0.2, 0.1], ["文体比赛获奖", "思政实践教学成果展示", "校运会获奖", "文艺汇演"]),
+}
+
+STUDENT_COLUMNS = (
+    "StudentID", "Name", "ClassID", "Major", "Gender", "Birthdate", "Hometown", "IDCard",
+    "Phone", "Email", "EnrollmentDate", "Status",
+)
+EVALUATION_COLUMNS = (
+    "EvaluationID", "StudentID", "AcademicYear", "Semester", "PhysicalScore", "MoralScore", "GPA",
+    "AcademicScore", "InnovationBasicScore", "InnovationBonusScore", "InnovationTotalScore",
+    "StudentWorkScore", "SocialServiceScore", "SocialRewardScore", "SocialTotalScore",
+    "CulturalSportsScore", "TotalScore",
+)
+GRADE_COLUMNS = (
+    "StudentID", "CourseID", "RegularScore", "MidtermScore", "FinalScore",
+    "OfferingID", "CourseCode", "TeacherName",
+)
+
+
+class Loader:
+    """分批写入并统计各表的行数和耗时"""
+
+    def __init__(self, conn, dialect, batch_size):
+        self.conn = conn
+        self.dialect = dialect
+        self.batch_size = batch_size
+        self.stats = {}
+
+    def insert(self, table, columns, rows, explicit_id=False):
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        started = time.perf_counter()
+        count = 0
+        cursor = self.conn.cursor()
+        try:
+            if explicit_id and self.dialect.identity_insert(table, True):
+                cursor.execute(self.dialect.identity_insert(table, True))
+            rows = iter(rows)
+            while True:
+                batch = list(itertools.islice(rows, self.batch_size))
+                if not batch:
+                    break
+                self.dialect.bulk_insert(cursor, sql, batch)
+                count += len(batch)
+            if explicit_id and self.dialect.identity_insert(table, False):
+                cursor.execute(self.dialect.identity_insert(table, False))
+        finally:
+            cursor.close()
+        total = self.stats.setdefault(table, [0, 0.0])
+        total[0] += count
+        total[1] += time.perf_counter() - started
+        return count
+
+    def commit(self):
+        started = time.perf_counter()
+        self.conn.commit()
+        total = self.stats.setdefault("(提交)", [0, 0.0])
+        total[1] += time.perf_counter() - started
+
+
+def next_id(conn, table, column, base=1):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT MAX({column}) FROM {table}")
+        current = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+    return max(int(current or 0) + 1, base)
+
+
+def pick(rng, values, weights, size):
+    """按权重抽样，values 为列表，返回抽中值的下标"""
+    return rng.choice(len(values), size=size, p=np.asarray(weights) / np.sum(weights))
+
+
+def make_names(rng, n):
+    surnames = rng.integers(0, len(SURNAMES), n)
+    first = rng.integers(0, len(GIVEN_CHARS), n)
+    second = rng.integers(0, len(GIVEN_CHARS), n)
+    two_chars = rng.random(n) < 0.7
+    return [
+        SURNAMES[s] + GIVEN_CHARS[a] + (GIVEN_CHARS[b] if two else "")
+        for s, a, b, two in zip(surnames.tolist(), first.tolist(), second.tolist(), two_chars.tolist())
+    ]
+
+
+def id_card(region, birthdate, seq, male):
+    """18 位身份证号：地区码 + 出生日期 + 顺序码（奇数为男）+ 校验码"""
+    seq = seq * 2 + (1 if male else 0)
+    body = f"{region:06d}{birthdate.replace('-', '')}{seq:03d}"
+    total = sum(int(ch) * w for ch, w in zip(body, (7, 9, 10, 5, 8, 4, 2, 1, 6, 3, 7, 9, 10, 5, 8, 4, 2)))
+    return body + "10X98765432"[total % 11]
+
+
+# === 班级、课程、学生 ===
+
+def generate_classes(rng, n_students, class_size, cohorts, first_id):
+    count = int(n_students / (class_size * 0.8)) + 2
+    sizes = np.clip(np.rint(rng.normal(class_size, class_size * 0.12, count)), 15, 60).astype(np.int64)
+    ends = np.cumsum(sizes)
+    n_classes = int(np.searchsorted(ends, n_students)) + 1
+    sizes = sizes[:n_classes]
+    sizes[-1] -= int(ends[n_classes - 1]) - n_students
+
+    majors = pick(rng, MAJORS, [1 / (i + 1) for i in range(len(MAJORS))], n_classes)
+    class_cohorts = rng.choice(cohorts, n_classes)
+    advisors = make_names(rng, n_classes)
+    names, seq = [], {}
+    for major, cohort in zip(majors.tolist(), class_cohorts.tolist()):
+        seq[major, cohort] = seq.get((major, cohort), 0) + 1
+        names.append(f"{MAJORS[major][1]}{cohort % 100:02d}{seq[major, cohort]}班")
+    return {
+        "id": first_id + np.arange(n_classes),
+        "size": sizes,
+        "major": majors,
+        "cohort": class_cohorts,
+        "name": names,
+        "advisor": advisors,
+    }
+
+
+def generate_courses(rng, n_courses, first_id):
+    departments = sorted({major[2] for major in MAJORS} | set(COMMON_DEPARTMENTS))
+    course_departments = rng.integers(0, len(departments), n_courses)
+    credits = np.asarray(CREDITS)[pick(rng, CREDITS, CREDIT_WEIGHTS, n_courses)]
+    topics = rng.integers(0, len(COURSE_TOPICS), n_courses)
+    levels = rng.integers(0, len(COURSE_LEVELS), n_courses)
+    ids = first_id + np.arange(n_courses)
+    names = [
+        f"{departments[d][:2]}{COURSE_TOPICS[t]}{COURSE_LEVELS[lv]}"
+        for d, t, lv in zip(course_departments.tolist(), topics.tolist(), levels.tolist())
+    ]
+    return {
+        "id": ids,
+        "code": [f"G{course_id:05d}" for course_id in ids.tolist()],
+        "name": names,
+        "credits": credits,
+        "required": rng.random(n_courses) < 0.7,
+        "department": [departments[d] for d in course_departments.tolist()],
+        "difficulty": rng.normal(0, 4, n_courses),
+    }
+
+
+def course_plans(rng, courses, per_semester):
+    """每个专业 8 个学期的课程表 (专业数, 8 × 每学期门数)，同一专业的课程不重复（成绩表每人每门课一条）"""
+    plans = []
+    for _, _, department in MAJORS:
+        weights = np.where(np.asarray(courses["department"]) == department, 6.0, 1.0)
+        weights[np.isin(courses["department"], COMMON_DEPARTMENTS)] = 3.0
+        plans.append(rng.choice(len(weights), SEMESTERS_OF_STUDY * per_semester, replace=False, p=weights / weights.sum()))
+    return np.array(plans)
+
+
+def generate_students(rng, classes, first_id, last_start_year):
+    class_index = np.repeat(np.arange(len(classes["id"])), classes["size"])
+    n = len(class_index)
+    cohorts = classes["cohort"][class_index]
+    male = rng.random(n) < 0.55
+    birth_offsets = rng.integers(0, 365, n)
+    birthdates = np.datetime_as_string(
+        (cohorts - 18 - 1970).astype("datetime64[Y]").astype("datetime64[D]") + birth_offsets.astype("timedelta64[D]")
+    )
+    provinces = pick(rng, PROVINCES, PROVINCE_WEIGHTS, n)
+    regions = 440000 + rng.integers(100, 2000, n)
+    status = np.where(cohorts + YEARS_OF_STUDY <= last_start_year, "毕业", "在读")
+    status[(status == "在读") & (rng.random(n) < 0.01)] = "休学"
+    return {
+        "id": first_id + np.arange(n),
+        "class": class_index,
+        "cohort": cohorts,
+        "major": classes["major"][class_index],
+        "ability": rng.normal(0, 1, n),
+        "name": make_names(rng, n),
+        "male": male,
+        "birthdate": birthdates,
+        "province": provinces,
+        "region": regions,
+        "phone": rng.integers(13000000000, 19999999999, n),
+        "seq": rng.integers(0, 500, n),
+        "status": status,
+    }
+
+
+def student_rows(students, classes):
+    for sid, name, cls, male, birth, province, region, phone, seq, cohort, status in zip(
+        students["id"].tolist(), students["name"], students["class"].tolist(), students["male"].tolist(),
+        students["birthdate"].tolist(), students["province"].tolist(), students["region"].tolist(),
+        students["phone"].tolist(), students["seq"].tolist(), students["cohort"].tolist(), students["status"].tolist(),
+    ):
+        yield (
+            sid, name, int(classes["id"][cls]), MAJORS[classes["major"][cls]][0], "男" if male else "女",
+            birth, PROVINCES[province], id_card(region, birth, seq, male), str(phone),
+            f"{sid}@mail.example.edu.cn", f"{cohort}-09-01", status,
+        )
+
+
+# === 学期数据：课程开设、成绩、综测、加分明细 ===
+
+def generate_semester(rng, loader, ctx, start_year, semester):
+    students, classes, courses = ctx["students"], ctx["classes"], ctx["courses"]
+    academic_year = f"{start_year}-{start_year + 1}"
+    per_semester = ctx["per_semester"]
+
+    active = np.flatnonzero((students["cohort"] <= start_year) & (start_year < students["cohort"] + YEARS_OF_STUDY))
+    if not len(active):
+        return academic_year, 0
+    term = ((start_year - students["cohort"][active]) * 2 + semester - 1)
+
+    # 课程开设：每个在读班级每门课一个教学班
+    active_classes = np.unique(students["class"][active])
+    class_slot = np.full(len(classes["id"]), -1)
+    class_slot[active_classes] = np.arange(len(active_classes))
+    class_terms = (start_year - classes["cohort"][active_classes]) * 2 + semester - 1
+    offering_courses = ctx["plans"][classes["major"][active_classes][:, None],
+                                    class_terms[:, None] * per_semester + np.arange(per_semester)]
+    n_offerings = offering_courses.size
+    offering_ids = ctx["next_offering"] + np.arange(n_offerings)
+    ctx["next_offering"] += n_offerings
+    teachers = make_names(rng, n_offerings)
+    times = rng.integers(0, len(CLASS_TIMES), n_offerings)
+    rooms = rng.integers(0, len(BUILDINGS) * 500, n_offerings)
+    offering_sizes = np.repeat(classes["size"][active_classes], per_semester)
+    loader.insert("CourseOfferings", (
+        "OfferingID", "CourseID", "TeacherName", "AcademicYear", "Semester", "ClassTime",
+        "Classroom", "MaxStudents", "CurrentStudents",
+    ), (
+        (oid, int(courses["id"][course]), teacher, academic_year, semester, CLASS_TIMES[t],
+         f"{BUILDINGS[room // 500]}{room % 5 + 1}{room % 100:02d}", max(50, size), size)
+        for oid, course, teacher, t, room, size in zip(
+            offering_ids.tolist(), offering_courses.ravel().tolist(), teachers,
+            times.tolist(), rooms.tolist(), offering_sizes.tolist())
+    ), explicit_id=True)
+
+    # 成绩：能力越高、课程越容易，成绩越高
+    student_courses = ctx["plans"][students["major"][active][:, None], term[:, None] * per_semester + np.arange(per_semester)]
+    student_offerings = class_slot[students["class"][active]][:, None] * per_semester + np.arange(per_semester)
+    mean = 76 + 7 * students["ability"][active][:, None] - courses["difficulty"][student_courses]
+    shape = student_courses.shape
+    final = np.clip(np.round(rng.normal(mean, 8, shape)), 0, 100)
+    midterm = np.clip(np.round(rng.normal(mean + 2, 7, shape)), 0, 100)
+    regular = np.clip(np.round(rng.normal(mean + 8, 5, shape)), 0, 100)
+    # GPA 与 academic.recalculate_academic 由成绩表计算的结果一致
+    credits = courses["credits"][student_courses]
+    _, gpa_cents, _ = compute_academic(
+        np.repeat(np.arange(len(active)), shape[1]), *(np.rint(v * 100).astype(np.int64).ravel()
+                                                      for v in (regular, midterm, final)),
+        np.rint(credits * 10).astype(np.int64).ravel(),
+    )
+    gpa = gpa_cents / 100
+    loader.insert("Grades", GRADE_COLUMNS, (
+        (sid, int(courses["id"][course]), r, m, f, int(offering_ids[slot]), courses["code"][course], teachers[slot])
+        for sid, course_row, r_row, m_row, f_row, slot_row in zip(
+            students["id"][active].tolist(), student_courses.tolist(), regular.tolist(),
+            midterm.tolist(), final.tolist(), student_offerings.tolist())
+        for course, r, m, f, slot in zip(course_row, r_row, m_row, f_row, slot_row)
+    ))
+
+    # 综测：分项以"分"为单位的整数计算，总分与 scoring.recalculate_scores 的结果一致
+    n = len(active)
+    components = np.zeros((n, 7), dtype=np.int64)
+    components[:, 0] = np.rint((50 + 10 * gpa) * 100)
+    for column, probability, values, weights, _ in BONUS_CATEGORIES.values():
+        awarded = rng.random(n) < probability
+        picked = np.asarray(values)[pick(rng, values, weights, n)]
+        components[:, column] = np.where(awarded, np.rint(picked * 100), 0)
+    innovation, social, total_score = (v / 100 for v in compute_scores(components))
+    scores = components / 100
+    physical = np.clip(np.round(rng.normal(75, 10, n), 1), 45, 100)
+    moral = np.clip(np.round(rng.normal(88, 2.5, n), 2), 75, 90)
+    evaluation_ids = ctx["next_evaluation"] + np.arange(n)
+    ctx["next_evaluation"] += n
+    loader.insert("ComprehensiveEvaluations", EVALUATION_COLUMNS, zip(
+        evaluation_ids.tolist(), students["id"][active].tolist(), itertools.repeat(academic_year),
+        itertools.repeat(semester), physical.tolist(), moral.tolist(), gpa.tolist(),
+        scores[:, 0].tolist(), scores[:, 1].tolist(), scores[:, 2].tolist(), innovation.tolist(),
+        scores[:, 3].tolist(), scores[:, 4].tolist(), scores[:, 5].tolist(), social.tolist(),
+        scores[:, 6].tolist(), total_score.tolist(),
+    ), explicit_id=True)
+
+    # 加分明细：每个非 0 分项一条
+    details = []
+    for category, (column, _, _, _, items) in BONUS_CATEGORIES.items():
+        awarded = np.flatnonzero(components[:, column])
+        item_index = rng.integers(0, len(items), len(awarded))
+        details.extend(
+            (eid, category, items[i], score / 100, f"{academic_year}学年第{semester}学期{items[i]}", None, "已审核")
+            for eid, i, score in zip(evaluation_ids[awarded].tolist(), item_index.tolist(),
+                                     components[awarded, column].tolist())
+        )
+    loader.insert("BonusDetails", (
+        "EvaluationID", "Category", "ItemName", "Score", "Description", "Evidence", "Status",
+    ), details)
+    loader.commit()
+    return academic_year, n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="压测数据生成")
+    parser.add_argument("--backend", choices=["sqlite", "sqlserver"], default="sqlite")
+    parser.add_argument("--path", default=DEFAULT_SQLITE_PATH, help="SQLite 数据库文件")
+    parser.add_argument("--conn-str", default=DEFAULT_CONN_STR, help="SQL Server 连接字符串")
+    parser.add_argument("--students", type=int, default=100000)
+    parser.add_argument("--class-size", type=int, default=35, help="平均班级人数")
+    parser.add_argument("--courses", type=int, default=600, help="课程总数")
+    parser.add_argument("--courses-per-semester", type=int, default=5, help="每名学生每学期的课程数")
+    parser.add_argument("--start-year", type=int, default=2021, help="第一个学年的起始年份")
+    parser.add_argument("--years", type=int, default=4, help="生成的学年数，每学年两个学期")
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--batch-size", type=int, default=20000, help="每批写入的行数")
+    parser.add_argument("--skip-rankings", action="store_true", help="不计算排名")
+    args = parser.parse_args()
+    if args.courses < SEMESTERS_OF_STUDY * args.courses_per_semester:
+        parser.error(f"--courses 至少为 {SEMESTERS_OF_STUDY} × --courses-per-semester")
+
+    if args.backend == "sqlite":
+        storage = SqliteStorage(args.path)
+        storage.initialize()
+    else:
+        storage = SqlServerStorage(args.conn_str)
+    conn = storage.connect()
+    loader = Loader(conn, storage.dialect, args.batch_size)
+    rng = np.random.default_rng(args.seed)
+    started = time.perf_counter()
+    try:
+        last_start_year = args.start_year + args.years - 1
+        # 每个学年都有 4 届在读学生：最早一届在第一个学年读大四
+        cohorts = np.arange(args.start_year - YEARS_OF_STUDY + 1, last_start_year + 1)
+        classes = generate_classes(rng, args.students, args.class_size, cohorts,
+                                   next_id(conn, "Classes", "ClassID"))
+        courses = generate_courses(rng, args.courses, next_id(conn, "Courses", "CourseID"))
+        students = generate_students(rng, classes, next_id(conn, "Students", "StudentID", STUDENT_ID_BASE),
+                                     last_start_year)
+        print(f"存储后端: {storage.dialect.name}  种子: {args.seed}")
+        print(f"生成 {len(classes['id'])} 个班级、{len(students['id'])} 名学生、{args.courses} 门课程")
+
+        loader.insert("Classes", ("ClassID", "ClassName", "Major", "Grade", "Advisor"), (
+            (cid, name, MAJORS[major][0], cohort, advisor)
+            for cid, name, major, cohort, advisor in zip(
+                classes["id"].tolist(), classes["name"], classes["major"].tolist(),
+                classes["cohort"].tolist(), classes["advisor"])
+        ), explicit_id=True)
+        loader.insert("Courses", (
+            "CourseID", "CourseCode", "CourseName", "Credits", "Hours", "CourseType", "Department", "Status",
+        ), (
+            (cid, code, name, credit, int(credit * 16), "必修" if required else "选修", department, "开设")
+            for cid, code, name, credit, required, department in zip(
+                courses["id"].tolist(), courses["code"], courses["name"], courses["credits"].tolist(),
+                courses["required"].tolist(), courses["department"])
+        ), explicit_id=True)
+        loader.insert("Students", STUDENT_COLUMNS, student_rows(students, classes))
+        loader.insert("Users", ("Username", "PasswordHash", "Role", "RelatedID"), (
+            (str(sid), default_password_hash(DEFAULT_PASSWORD), "Student", sid) for sid in students["id"].tolist()
+        ))
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM Users WHERE Role = 'Admin' OR Username = ?", (ADMIN_USERNAME,))
+        has_admin = cursor.fetchone()[0] > 0
+        cursor.close()
+        if not has_admin:
+            loader.insert("Users", ("Username", "PasswordHash", "Role", "RelatedID"), (
+                (ADMIN_USERNAME, default_password_hash(ADMIN_PASSWORD), "Admin", None),
+            ))
+        loader.commit()
+
+        ctx = {
+            "students": students,
+            "classes": classes,
+            "courses": courses,
+            "per_semester": args.courses_per_semester,
+            "plans": course_plans(rng, courses, args.courses_per_semester),
+            "next_offering": next_id(conn, "CourseOfferings", "OfferingID"),
+            "next_evaluation": next_id(conn, "ComprehensiveEvaluations", "EvaluationID"),
+        }
+        semesters = []
+        for start_year in range(args.start_year, last_start_year + 1):
+            for semester in (1, 2):
+                academic_year, count = generate_semester(rng, loader, ctx, start_year, semester)
+                semesters.append((academic_year, semester))
+                print(f"  {academic_year} 第{semester}学期: {count} 条综测记录")
+
+        cursor = conn.cursor()
+        storage.dialect.update_statistics(cursor)  # 排名计算和之后的查询按新数据选择索引
+        cursor.close()
+        conn.commit()
+
+        if not args.skip_rankings:
+            ranking_started = time.perf_counter()
+            for academic_year, semester in semesters:
+                full_rankings(conn, academic_year, semester, storage.dialect)
+                conn.commit()
+            loader.stats["(排名计算)"] = [0, time.perf_counter() - ranking_started]
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"\n{'表':<28}{'行数':>12}{'耗时(秒)':>10}{'行/秒':>12}")
+    for table, (rows, seconds) in loader.stats.items():
+        rate = f"{rows / seconds:.0f}" if rows and seconds else "-"
+        print(f"{table:<28}{rows:>12}{seconds:>10.2f}{rate:>12}")
+    print(f"总耗时: {elapsed:.1f} 秒")
+
+
+if __name__ == "__main__":
+    main()
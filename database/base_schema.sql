@@ -0,0 +1,253 @@
+-- 学生成绩管理系统 - SQL Server 基础表结构（迁移 001）
+-- 与 sqlite_schema.sql 的表、视图和索引一致，包含 extend_database_schema.sql、
+-- incremental_ranking_schema.sql 增加的字段，新建的库执行本脚本即得到完整结构。
+--
+-- 原有的 rebuild_database.sql / comprehensive_evaluation_schema.sql 会删除已有表，且与后端使用的列不一致
+-- （如课程表缺少 CourseCode、Credits），依次执行时会出错。
+-- 本脚本只创建缺少的对象，不修改、不删除已有表，可重复执行。
+-- 排名存储过程 sp_CalculateRankings 由迁移 003（incremental_ranking_schema.sql）创建。
+
+USE GradeSystemDB;
+GO
+
+-- 1. 班级信息表
+IF OBJECT_ID('Classes', 'U') IS NULL
+    CREATE TABLE Classes (
+        ClassID INT IDENTITY(1,1) PRIMARY KEY,
+        ClassName NVARCHAR(100) NOT NULL,       -- 班级名称
+        Major NVARCHAR(100) NOT NULL,           -- 专业
+        Grade INT NOT NULL DEFAULT 2024,        -- 年级 (如: 2024)
+        Advisor NVARCHAR(50),                   -- 班主任
+        CreatedAt DATETIME DEFAULT GETDATE()
+    );
+GO
+
+-- 2. 学生信息表
+IF OBJECT_ID('Students', 'U') IS NULL
+    CREATE TABLE Students (
+        StudentID BIGINT PRIMARY KEY,           -- 学号 (如: 3124001479)
+        Name NVARCHAR(50) NOT NULL,             -- 姓名
+        ClassID INT,                            -- 班级ID
+        Major NVARCHAR(100),                    -- 专业
+        Gender NVARCHAR(10),                    -- 性别
+        Birthdate DATE,                         -- 出生日期
+        Hometown NVARCHAR(100),                 -- 籍贯
+        IDCard NVARCHAR(18),                    -- 身份证号
+        Phone NVARCHAR(20),                     -- 联系电话
+        Email NVARCHAR(100),                    -- 邮箱
+        Address NVARCHAR(200),                  -- 家庭住址
+        EnrollmentDate DATE,                    -- 入学日期
+        Status NVARCHAR(20) DEFAULT '在读',      -- 学生状态
+        CreatedAt DATETIME DEFAULT GETDATE(),
+        UpdatedAt DATETIME DEFAULT GETDATE(),
+        FOREIGN KEY (ClassID) REFERENCES Classes(ClassID)
+    );
+GO
+
+-- 3. 用户表
+IF OBJECT_ID('Users', 'U') IS NULL
+    CREATE TABLE Users (
+        UserID INT IDENTITY(1,1) PRIMARY KEY,
+        Username NVARCHAR(50) UNIQUE NOT NULL,
+        PasswordHash NVARCHAR(255) NOT NULL,
+        Role NVARCHAR(20) NOT NULL,             -- Student, Teacher, Admin
+        RelatedID BIGINT,                       -- 关联的学生ID或教师ID
+        CreatedAt DATETIME DEFAULT GETDATE()
+    );
+GO
+
+-- 4. 课程信息表
+IF OBJECT_ID('Courses', 'U') IS NULL
+    CREATE TABLE Courses (
+        CourseID INT IDENTITY(1,1) PRIMARY KEY,
+        CourseCode NVARCHAR(20) UNIQUE NOT NULL,    -- 课程编号
+        CourseName NVARCHAR(100) NOT NULL,          -- 课程名称
+        Credits DECIMAL(3,1) NOT NULL,              -- 学分
+        Hours INT NOT NULL,                         -- 学时
+        CourseType NVARCHAR(20) DEFAULT '必修',      -- 课程类型(必修/选修)
+        Department NVARCHAR(50),                    -- 开课院系
+        Prerequisites NVARCHAR(200),                -- 先修课程
+        Description NTEXT,                          -- 课程描述
+        Status NVARCHAR(20) DEFAULT '开设',         -- 课程状态
+        CreatedAt DATETIME DEFAULT GETDATE(),
+        UpdatedAt DATETIME DEFAULT GETDATE()
+    );
+GO
+
+-- 5. 课程开设表
+IF OBJECT_ID('CourseOfferings', 'U') IS NULL
+    CREATE TABLE CourseOfferings (
+        OfferingID INT IDENTITY(1,1) PRIMARY KEY,
+        CourseID INT NOT NULL,
+        TeacherName NVARCHAR(50),                   -- 授课教师
+        AcademicYear NVARCHAR(20),                  -- 学年
+        Semester INT,                               -- 学期
+        ClassTime NVARCHAR(100),                    -- 上课时间
+        Classroom NVARCHAR(50),                     -- 教室
+        MaxStudents INT DEFAULT 50,                 -- 最大选课人数
+        CurrentStudents INT DEFAULT 0,              -- 当前选课人数
+        CreatedAt DATETIME DEFAULT GETDATE(),
+        FOREIGN KEY (CourseID) REFERENCES Courses(CourseID)
+    );
+GO
+
+-- 6. 成绩表
+IF OBJECT_ID('Grades', 'U') IS NULL
+    CREATE TABLE Grades (
+        GradeID INT IDENTITY(1,1) PRIMARY KEY,
+        StudentID BIGINT NOT NULL,
+        CourseID INT NOT NULL,
+        RegularScore DECIMAL(5,2),              -- 平时成绩
+        MidtermScore DECIMAL(5,2),              -- 期中成绩
+        FinalScore DECIMAL(5,2),                -- 期末成绩
+        TotalScore AS (ISNULL(RegularScore,0) * 0.1 + ISNULL(MidtermScore,0) * 0.3 + ISNULL(FinalScore,0) * 0.6),
+        OfferingID INT,                         -- 关联课程开设
+        CourseCode NVARCHAR(20),                -- 课程编号
+        TeacherName NVARCHAR(50),               -- 授课教师
+        CreatedAt DATETIME DEFAULT GETDATE(),
+        UpdatedAt DATETIME DEFAULT GETDATE(),
+        FOREIGN KEY (StudentID) REFERENCES Students(StudentID),
+        FOREIGN KEY (CourseID) REFERENCES Courses(CourseID),
+        UNIQUE(StudentID, CourseID)
+    );
+GO
+
+-- 7. 奖学金表
+IF OBJECT_ID('Scholarships', 'U') IS NULL
+    CREATE TABLE Scholarships (
+        ScholarshipID INT IDENTITY(1,1) PRIMARY KEY,
+        StudentID BIGINT NOT NULL,
+        AcademicYear INT NOT NULL,
+        Term INT NOT NULL,
+        ScholarshipType NVARCHAR(50),
+        Amount DECIMAL(10,2),
+        CreatedAt DATETIME DEFAULT GETDATE(),
+        FOREIGN KEY (StudentID) REFERENCES Students(StudentID)
+    );
+GO
+
+-- 8. 综合测评主表
+IF OBJECT_ID('ComprehensiveEvaluations', 'U') IS NULL
+    CREATE TABLE ComprehensiveEvaluations (
+        EvaluationID INT IDENTITY(1,1) PRIMARY KEY,
+        StudentID BIGINT NOT NULL,              -- 学号
+        AcademicYear NVARCHAR(20) NOT NULL,     -- 学年 (如: 2024-2025)
+        Semester INT NOT NULL,                  -- 学期 (1或2)
+
+        PhysicalScore DECIMAL(5,2),             -- T: 体测成绩
+        MoralScore DECIMAL(5,2),                -- D: 品德表现评价分
+        GPA DECIMAL(4,2),                       -- 绩点
+        AcademicScore DECIMAL(6,2),             -- X: 学业成绩考核分
+
+        InnovationBasicScore DECIMAL(5,2),      -- C1: 创新实践基本分
+        InnovationBonusScore DECIMAL(5,2),      -- C2: 创新实践加分
+        InnovationTotalScore DECIMAL(5,2),      -- C: 创新实践总分
+
+        StudentWorkScore DECIMAL(5,2),          -- S1: 学生工作加分
+        SocialServiceScore DECIMAL(5,2),        -- S2: 社会服务加分
+        SocialRewardScore DECIMAL(5,2),         -- S3: 社会服务奖励加分
+        SocialTotalScore DECIMAL(5,2),          -- S: 社会实践总分
+
+        CulturalSportsScore DECIMAL(5,2),       -- W: 文体实践评分
+
+        TotalScore DECIMAL(7,2),                -- P: 总积分
+
+        ClassRank INT,                          -- 班级排名
+        GradeRank INT,                          -- 年级排名
+
+        RankedScore DECIMAL(7,2),               -- 上次计算排名时的总积分
+        RankedClassID INT,                      -- 上次计算排名时所在班级
+        RankedAt DATETIME,                      -- 上次计算排名的时间，NULL 表示尚未参与排名
+
+        CreatedAt DATETIME DEFAULT GETDATE(),
+        UpdatedAt DATETIME DEFAULT GETDATE(),
+
+        FOREIGN KEY (StudentID) REFERENCES Students(StudentID),
+        UNIQUE(StudentID, AcademicYear, Semester)
+    );
+GO
+
+-- 9. 加分项目详情表
+IF OBJECT_ID('BonusDetails', 'U') IS NULL
+    CREATE TABLE BonusDetails (
+        DetailID INT IDENTITY(1,1) PRIMARY KEY,
+        EvaluationID INT NOT NULL,              -- 关联综测记录
+        Category NVARCHAR(20) NOT NULL,         -- 加分类别: C1, C2, S1, S2, S3, W
+        ItemName NVARCHAR(200) NOT NULL,        -- 加分项目名称
+        Score DECIMAL(5,2) NOT NULL,            -- 加分分数
+        Description NVARCHAR(500),              -- 详细描述
+        Evidence NVARCHAR(200),                 -- 证明材料
+        Status NVARCHAR(20) DEFAULT '已审核',    -- 审核状态
+        CreatedAt DATETIME DEFAULT GETDATE(),
+        FOREIGN KEY (EvaluationID) REFERENCES ComprehensiveEvaluations(EvaluationID)
+    );
+GO
+
+-- 10. 综测详细信息视图
+IF OBJECT_ID('v_ComprehensiveEvaluationDetails', 'V') IS NULL
+    EXEC('
+    CREATE VIEW v_ComprehensiveEvaluationDetails AS
+    SELECT
+        ce.EvaluationID,
+        s.StudentID,
+        s.Name AS StudentName,
+        c.ClassName,
+        ce.AcademicYear,
+        ce.Semester,
+        ce.PhysicalScore,
+        ce.MoralScore,
+        ce.GPA,
+        ce.AcademicScore,
+        ce.InnovationBasicScore,
+        ce.InnovationBonusScore,
+        ce.InnovationTotalScore,
+        ce.StudentWorkScore,
+        ce.SocialServiceScore,
+        ce.SocialRewardScore,
+        ce.SocialTotalScore,
+        ce.CulturalSportsScore,
+        ce.TotalScore,
+        ce.ClassRank,
+        ce.GradeRank
+    FROM ComprehensiveEvaluations ce
+    JOIN Students s ON ce.StudentID = s.StudentID
+    JOIN Classes c ON s.ClassID = c.ClassID
+    ');
+GO
+
+-- 11. 综测总分存储过程（逐条计算；批量计算见 backend/scoring.py）
+IF OBJECT_ID('sp_CalculateComprehensiveScore', 'P') IS NULL
+    EXEC('
+    CREATE PROCEDURE sp_CalculateComprehensiveScore
+        @EvaluationID INT
+    AS
+    BEGIN
+        UPDATE ComprehensiveEvaluations
+        SET
+            InnovationTotalScore = ISNULL(InnovationBasicScore, 0) + ISNULL(InnovationBonusScore, 0),
+            SocialTotalScore = ISNULL(StudentWorkScore, 0) + ISNULL(SocialServiceScore, 0) + ISNULL(SocialRewardScore, 0),
+            TotalScore = ISNULL(AcademicScore, 0) +
+                        ISNULL(InnovationBasicScore, 0) + ISNULL(InnovationBonusScore, 0) +
+                        ISNULL(StudentWorkScore, 0) + ISNULL(SocialServiceScore, 0) + ISNULL(SocialRewardScore, 0) +
+                        ISNULL(CulturalSportsScore, 0),
+            UpdatedAt = GETDATE()
+        WHERE EvaluationID = @EvaluationID;
+    END
+    ');
+GO
+
+-- 12. 索引（与 extend_database_schema.sql 相同；旧库缺少的列由迁移 002 补上后再建）
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_Students_IDCard') AND COL_LENGTH('Students', 'IDCard') IS NOT NULL
+    CREATE INDEX IX_Students_IDCard ON Students(IDCard);
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_Students_Status')
+    CREATE INDEX IX_Students_Status ON Students(Status);
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_Courses_CourseCode')
+    CREATE INDEX IX_Courses_CourseCode ON Courses(CourseCode);
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_CourseOfferings_AcademicYear')
+    CREATE INDEX IX_CourseOfferings_AcademicYear ON CourseOfferings(AcademicYear, Semester);
+GO
+
+PRINT '基础表结构检查完成！';
@@ -0,0 +1,89 @@
+-- 综测详情索引视图（可选，SQL Server）
+-- 把 v_ComprehensiveEvaluationDetails 改为 SCHEMABINDING 视图并建立唯一聚集索引，视图结果物化存储，
+-- 排名列表、学生详情、导出直接读取视图索引，不再连接 Students、Classes。
+-- 视图的列和名称不变，后端代码不需要修改。
+--
+-- 注意：
+-- - 企业版、开发版的优化器自动使用视图索引；标准版只有在查询中加 WITH (NOEXPAND) 时才使用，
+--   否则仍展开为基表查询（由 evaluation_indexes_schema.sql 的索引支持），结果相同
+-- - 修改综测成绩、计算排名、修改学生姓名 / 班级、修改班级名称时都要同步维护视图索引，写入变慢；
+--   排名计算会更新整个学期的 ClassRank / GradeRank，数据量大时先用 benchmarks/bench_indexes.py 对比
+-- - SCHEMABINDING 之后不能删除或修改视图引用的列；修改表结构前先执行文件末尾的撤销语句
+-- - 修改这三张表的连接需要 ANSI_NULLS、QUOTED_IDENTIFIER、ANSI_WARNINGS 等为 ON（ODBC 连接默认如此）
+--
+-- 先执行 evaluation_indexes_schema.sql；可重复执行。
+
+USE GradeSystemDB;
+GO
+
+SET ANSI_NULLS ON;
+SET QUOTED_IDENTIFIER ON;
+SET ANSI_PADDING ON;
+SET ANSI_WARNINGS ON;
+SET ARITHABORT ON;
+SET CONCAT_NULL_YIELDS_NULL ON;
+SET NUMERIC_ROUNDABORT OFF;
+GO
+
+-- 1. 绑定架构的视图（列与原视图相同，表名须带架构名）
+ALTER VIEW dbo.v_ComprehensiveEvaluationDetails
+WITH SCHEMABINDING
+AS
+SELECT
+    ce.EvaluationID,
+    s.StudentID,
+    s.Name AS StudentName,
+    c.ClassName,
+    ce.AcademicYear,
+    ce.Semester,
+    ce.PhysicalScore,
+    ce.MoralScore,
+    ce.GPA,
+    ce.AcademicScore,
+    ce.InnovationBasicScore,
+    ce.InnovationBonusScore,
+    ce.InnovationTotalScore,
+    ce.StudentWorkScore,
+    ce.SocialServiceScore,
+    ce.SocialRewardScore,
+    ce.SocialTotalScore,
+    ce.CulturalSportsScore,
+    ce.TotalScore,
+    ce.ClassRank,
+    ce.GradeRank
+FROM dbo.ComprehensiveEvaluations ce
+JOIN dbo.Students s ON ce.StudentID = s.StudentID
+JOIN dbo.Classes c ON s.ClassID = c.ClassID;
+GO
+
+-- 2. 唯一聚集索引：(学年, 学期, 学号) 与 ComprehensiveEvaluations 的唯一约束一致，
+--    计算排名不会移动视图的行；学生详情按学号查询直接定位
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_v_ComprehensiveEvaluationDetails')
+    CREATE UNIQUE CLUSTERED INDEX IX_v_ComprehensiveEvaluationDetails
+        ON dbo.v_ComprehensiveEvaluationDetails(AcademicYear, Semester, StudentID);
+GO
+
+-- 3. 排名列表、导出的排序
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_v_ComprehensiveEvaluationDetails_ClassRank')
+    CREATE INDEX IX_v_ComprehensiveEvaluationDetails_ClassRank
+        ON dbo.v_ComprehensiveEvaluationDetails(AcademicYear, Semester, ClassRank);
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_v_ComprehensiveEvaluationDetails_GradeRank')
+    CREATE INDEX IX_v_ComprehensiveEvaluationDetails_GradeRank
+        ON dbo.v_ComprehensiveEvaluationDetails(AcademicYear, Semester, GradeRank);
+GO
+
+PRINT '综测详情索引视图创建完成！';
+GO
+
+-- 撤销（恢复为普通视图，视图上的索引随之删除）：
+-- ALTER VIEW dbo.v_ComprehensiveEvaluationDetails AS
+-- SELECT ce.EvaluationID, s.StudentID, s.Name AS StudentName, c.ClassName, ce.AcademicYear, ce.Semester,
+--        ce.PhysicalScore, ce.MoralScore, ce.GPA, ce.AcademicScore,
+--        ce.InnovationBasicScore, ce.InnovationBonusScore, ce.InnovationTotalScore,
+--        ce.StudentWorkScore, ce.SocialServiceScore, ce.SocialRewardScore, ce.SocialTotalScore,
+--        ce.CulturalSportsScore, ce.TotalScore, ce.ClassRank, ce.GradeRank
+-- FROM ComprehensiveEvaluations ce
+-- JOIN Students s ON ce.StudentID = s.StudentID
+-- JOIN Classes c ON s.ClassID = c.ClassID;
@@ -0,0 +1,69 @@
+-- 综测查询索引
+-- 排名列表、学生详情、导出都按 AcademicYear, Semester 查询 v_ComprehensiveEvaluationDetails，
+-- 再按 ClassRank / GradeRank 排序；排名计算按 TotalScore 排序，按班级分组。
+-- 原有索引只覆盖 IDCard、Status、CourseCode、CourseOfferings，这些查询都要扫描整个综测表再排序。
+--
+-- 1. 排名列表 / 导出：(学年, 学期, 名次) 顺序读取，取前 N 名时读到 N 条即停止，不再排序整个学期；
+--    INCLUDE 排名列表和导出用到的综测列，不需要回表
+-- 2. 排名计算：(学年, 学期, 总积分 DESC) 与 ROW_NUMBER() 的排序一致（聚集键 EvaluationID 在最后），
+--    增量排名统计分数段人数时只读索引
+-- 3. 按班级导出、按班级重算排名：Students(ClassID)
+-- 4. 学生详情的加分明细：BonusDetails(EvaluationID) 加上 INCLUDE 列
+--
+-- 代价：计算排名时更新 ClassRank / GradeRank，索引 1 的对应行随之移动；录入成绩时更新索引 2。
+-- 可重复执行，已存在的索引跳过。
+
+USE GradeSystemDB;
+GO
+
+-- 1. 排名列表（ORDER BY ClassRank）
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_ComprehensiveEvaluations_Term_ClassRank')
+    CREATE INDEX IX_ComprehensiveEvaluations_Term_ClassRank
+        ON ComprehensiveEvaluations(AcademicYear, Semester, ClassRank)
+        INCLUDE (StudentID, GradeRank, PhysicalScore, MoralScore, GPA, AcademicScore,
+                 InnovationTotalScore, SocialTotalScore, CulturalSportsScore, TotalScore);
+GO
+
+-- 整学期导出（ORDER BY GradeRank）
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_ComprehensiveEvaluations_Term_GradeRank')
+    CREATE INDEX IX_ComprehensiveEvaluations_Term_GradeRank
+        ON ComprehensiveEvaluations(AcademicYear, Semester, GradeRank)
+        INCLUDE (StudentID, ClassRank, PhysicalScore, MoralScore, GPA, AcademicScore,
+                 InnovationTotalScore, SocialTotalScore, CulturalSportsScore, TotalScore);
+GO
+
+-- 2. 排名计算、排名校验、增量排名的分数段统计（ORDER BY TotalScore DESC, EvaluationID）
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_ComprehensiveEvaluations_Term_TotalScore')
+    CREATE INDEX IX_ComprehensiveEvaluations_Term_TotalScore
+        ON ComprehensiveEvaluations(AcademicYear, Semester, TotalScore DESC)
+        INCLUDE (StudentID);
+GO
+
+-- 3. 按班级导出（StudentID IN (SELECT StudentID FROM Students WHERE ClassID = ?)）、按班级重算排名
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_Students_ClassID')
+    CREATE INDEX IX_Students_ClassID ON Students(ClassID) INCLUDE (Name);
+GO
+
+-- 4. 学生详情的加分明细；extend_database_schema.sql 已建的同名索引没有 INCLUDE 列时重建
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_BonusDetails_EvaluationID')
+    CREATE INDEX IX_BonusDetails_EvaluationID
+        ON BonusDetails(EvaluationID)
+        INCLUDE (Category, ItemName, Score, Description);
+ELSE IF NOT EXISTS (
+    SELECT * FROM sys.index_columns ic
+    JOIN sys.indexes i ON i.object_id = ic.object_id AND i.index_id = ic.index_id
+    WHERE i.name = 'IX_BonusDetails_EvaluationID' AND ic.is_included_column = 1
+)
+    CREATE INDEX IX_BonusDetails_EvaluationID
+        ON BonusDetails(EvaluationID)
+        INCLUDE (Category, ItemName, Score, Description)
+        WITH (DROP_EXISTING = ON);
+GO
+
+-- 更新统计信息，让已有查询计划按新索引重新编译
+UPDATE STATISTICS ComprehensiveEvaluations;
+UPDATE STATISTICS Students;
+UPDATE STATISTICS BonusDetails;
+GO
+
+PRINT '综测查询索引创建完成！';
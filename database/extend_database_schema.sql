@@ -4,22 +4,29 @@
 USE GradeSystemDB;
 GO
 
--- 1. 扩展Students表，添加详细信息字段
-IF NOT EXISTS (SELECT * FROM sys.columns WHERE object_id = OBJECT_ID('Students') AND name = 'Gender')
-BEGIN
-    ALTER TABLE Students ADD 
-        Gender NVARCHAR(10),                    -- 性别
-        Birthdate DATE,                         -- 出生日期  
-        Hometown NVARCHAR(100),                 -- 籍贯
-        IDCard NVARCHAR(18),                    -- 身份证号
-        Phone NVARCHAR(20),                     -- 联系电话
-        Email NVARCHAR(100),                    -- 邮箱
-        Address NVARCHAR(200),                  -- 家庭住址
-        EnrollmentDate DATE,                    -- 入学日期
-        Status NVARCHAR(20) DEFAULT '在读',      -- 学生状态
-        CreatedAt DATETIME DEFAULT GETDATE(),
-        UpdatedAt DATETIME DEFAULT GETDATE();
-END
+-- 1. 扩展Students表，添加详细信息字段（逐列检查：rebuild_database.sql 建的表已有 Gender，但没有其余字段）
+IF COL_LENGTH('Students', 'Gender') IS NULL
+    ALTER TABLE Students ADD Gender NVARCHAR(10);           -- 性别
+IF COL_LENGTH('Students', 'Birthdate') IS NULL
+    ALTER TABLE Students ADD Birthdate DATE;                -- 出生日期
+IF COL_LENGTH('Students', 'Hometown') IS NULL
+    ALTER TABLE Students ADD Hometown NVARCHAR(100);        -- 籍贯
+IF COL_LENGTH('Students', 'IDCard') IS NULL
+    ALTER TABLE Students ADD IDCard NVARCHAR(18);           -- 身份证号
+IF COL_LENGTH('Students', 'Phone') IS NULL
+    ALTER TABLE Students ADD Phone NVARCHAR(20);            -- 联系电话
+IF COL_LENGTH('Students', 'Email') IS NULL
+    ALTER TABLE Students ADD Email NVARCHAR(100);           -- 邮箱
+IF COL_LENGTH('Students', 'Address') IS NULL
+    ALTER TABLE Students ADD Address NVARCHAR(200);         -- 家庭住址
+IF COL_LENGTH('Students', 'EnrollmentDate') IS NULL
+    ALTER TABLE Students ADD EnrollmentDate DATE;           -- 入学日期
+IF COL_LENGTH('Students', 'Status') IS NULL
+    ALTER TABLE Students ADD Status NVARCHAR(20) DEFAULT '在读';  -- 学生状态
+IF COL_LENGTH('Students', 'CreatedAt') IS NULL
+    ALTER TABLE Students ADD CreatedAt DATETIME DEFAULT GETDATE();
+IF COL_LENGTH('Students', 'UpdatedAt') IS NULL
+    ALTER TABLE Students ADD UpdatedAt DATETIME DEFAULT GETDATE();
 GO
 
 -- 2. 创建课程信息表
@@ -84,6 +91,10 @@ IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_Courses_CourseCode')
 IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_CourseOfferings_AcademicYear')
     CREATE INDEX IX_CourseOfferings_AcademicYear ON CourseOfferings(AcademicYear, Semester);
 
+-- 学生详情按综测记录取加分明细
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_BonusDetails_EvaluationID')
+    CREATE INDEX IX_BonusDetails_EvaluationID ON BonusDetails(EvaluationID);
+
 -- 6. 插入示例课程数据
 IF NOT EXISTS (SELECT * FROM Courses WHERE CourseCode = 'CS001')
 BEGIN
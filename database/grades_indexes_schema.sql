@@ -0,0 +1,16 @@
+-- 成绩表查询索引
+-- backend/academic.py 按学期计算 GPA 和学业成绩：先按 (学年, 学期) 找到该学期的课程开设记录，
+-- 再按 OfferingID 读取成绩。原来 Grades 只有 (StudentID, CourseID) 唯一索引，整学期计算要扫描全部学期的成绩。
+-- INCLUDE 计算用到的列，不需要回表；修改单个学生的成绩时按 (StudentID, CourseID) 唯一索引定位，不受影响。
+-- 可重复执行，已存在的索引跳过。
+
+USE GradeSystemDB;
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_Grades_OfferingID')
+    CREATE INDEX IX_Grades_OfferingID
+        ON Grades(OfferingID)
+        INCLUDE (StudentID, CourseID, RegularScore, MidtermScore, FinalScore);
+GO
+
+PRINT '成绩表查询索引创建完成！';
@@ -0,0 +1,61 @@
+-- 增量排名所需的数据库变更
+-- 1. 记录每条综测上次参与排名时的总积分和班级，用于找出排名后发生变化的记录
+-- 2. sp_CalculateRankings 同分按 EvaluationID 排序，使全量和增量计算结果完全一致
+
+USE GradeSystemDB;
+GO
+
+-- 1. 排名快照字段
+IF NOT EXISTS (SELECT * FROM sys.columns WHERE object_id = OBJECT_ID('ComprehensiveEvaluations') AND name = 'RankedScore')
+BEGIN
+    ALTER TABLE ComprehensiveEvaluations ADD
+        RankedScore DECIMAL(7,2),               -- 上次计算排名时的总积分
+        RankedClassID INT,                      -- 上次计算排名时所在班级
+        RankedAt DATETIME;                      -- 上次计算排名的时间，NULL 表示尚未参与排名
+END
+GO
+
+-- 2. 全量排名存储过程
+IF OBJECT_ID('sp_CalculateRankings', 'P') IS NOT NULL
+    DROP PROCEDURE sp_CalculateRankings;
+GO
+
+CREATE PROCEDURE sp_CalculateRankings
+    @AcademicYear NVARCHAR(20),
+    @Semester INT
+AS
+BEGIN
+    -- 计算班级排名（同分按 EvaluationID 排序）
+    WITH ClassRankings AS (
+        SELECT
+            ce.EvaluationID,
+            s.ClassID,
+            ROW_NUMBER() OVER (PARTITION BY s.ClassID ORDER BY ce.TotalScore DESC, ce.EvaluationID) AS ClassRank
+        FROM ComprehensiveEvaluations ce
+        JOIN Students s ON ce.StudentID = s.StudentID
+        WHERE ce.AcademicYear = @AcademicYear AND ce.Semester = @Semester
+    )
+    UPDATE ce
+    SET ClassRank = cr.ClassRank,
+        RankedClassID = cr.ClassID
+    FROM ComprehensiveEvaluations ce
+    JOIN ClassRankings cr ON ce.EvaluationID = cr.EvaluationID;
+
+    -- 计算年级排名（同分按 EvaluationID 排序）
+    WITH GradeRankings AS (
+        SELECT
+            EvaluationID,
+            ROW_NUMBER() OVER (ORDER BY TotalScore DESC, EvaluationID) AS GradeRank
+        FROM ComprehensiveEvaluations
+        WHERE AcademicYear = @AcademicYear AND Semester = @Semester
+    )
+    UPDATE ce
+    SET GradeRank = gr.GradeRank,
+        RankedScore = ce.TotalScore,
+        RankedAt = GETDATE()
+    FROM ComprehensiveEvaluations ce
+    JOIN GradeRankings gr ON ce.EvaluationID = gr.EvaluationID;
+END;
+GO
+
+PRINT '增量排名字段和排名存储过程更新完成！';
@@ -0,0 +1,196 @@
+-- 学生成绩管理系统 - SQLite 数据库结构
+-- 与 SQL Server 版本（comprehensive_evaluation_schema.sql + extend_database_schema.sql
+-- + incremental_ranking_schema.sql）的表、视图和索引一致，用于在没有 SQL Server 的环境中运行和做性能测试。
+-- 后端使用 SQLite 存储时首次连接会自动执行本脚本，脚本可重复执行。
+--
+-- 类型说明：NVARCHAR 按 TEXT、DECIMAL 按 NUMERIC 亲和性存储；
+-- 自增主键和学号使用 INTEGER PRIMARY KEY（64 位，等同于行号，按主键查找无需额外索引）；
+-- 存储过程 sp_CalculateComprehensiveScore / sp_CalculateRankings 的逻辑由后端 scoring.py / ranking.py 执行。
+
+PRAGMA foreign_keys = ON;
+
+-- 1. 班级信息表
+CREATE TABLE IF NOT EXISTS Classes (
+    ClassID INTEGER PRIMARY KEY,
+    ClassName NVARCHAR(100) NOT NULL,       -- 班级名称
+    Major NVARCHAR(100) NOT NULL,           -- 专业
+    Grade INT NOT NULL DEFAULT 2024,        -- 年级 (如: 2024)
+    Advisor NVARCHAR(50),                   -- 班主任
+    CreatedAt DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+
+-- 2. 学生信息表
+CREATE TABLE IF NOT EXISTS Students (
+    StudentID INTEGER PRIMARY KEY,          -- 学号 (如: 3124001479)
+    Name NVARCHAR(50) NOT NULL,             -- 姓名
+    ClassID INT REFERENCES Classes(ClassID),-- 班级ID
+    Major NVARCHAR(100),                    -- 专业
+    Gender NVARCHAR(10),                    -- 性别
+    Birthdate DATE,                         -- 出生日期
+    Hometown NVARCHAR(100),                 -- 籍贯
+    IDCard NVARCHAR(18),                    -- 身份证号
+    Phone NVARCHAR(20),                     -- 联系电话
+    Email NVARCHAR(100),                    -- 邮箱
+    Address NVARCHAR(200),                  -- 家庭住址
+    EnrollmentDate DATE,                    -- 入学日期
+    Status NVARCHAR(20) DEFAULT '在读',      -- 学生状态
+    CreatedAt DATETIME DEFAULT (datetime('now', 'localtime')),
+    UpdatedAt DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+
+-- 3. 用户表
+CREATE TABLE IF NOT EXISTS Users (
+    UserID INTEGER PRIMARY KEY,
+    Username NVARCHAR(50) UNIQUE NOT NULL,
+    PasswordHash NVARCHAR(255) NOT NULL,
+    Role NVARCHAR(20) NOT NULL,             -- Student, Teacher, Admin
+    RelatedID BIGINT,                       -- 关联的学生ID或教师ID
+    CreatedAt DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+
+-- 4. 课程信息表
+CREATE TABLE IF NOT EXISTS Courses (
+    CourseID INTEGER PRIMARY KEY,
+    CourseCode NVARCHAR(20) UNIQUE NOT NULL,    -- 课程编号
+    CourseName NVARCHAR(100) NOT NULL,          -- 课程名称
+    Credits DECIMAL(3,1) NOT NULL,              -- 学分
+    Hours INT NOT NULL,                         -- 学时
+    CourseType NVARCHAR(20) DEFAULT '必修',      -- 课程类型(必修/选修)
+    Department NVARCHAR(50),                    -- 开课院系
+    Prerequisites NVARCHAR(200),                -- 先修课程
+    Description TEXT,                           -- 课程描述
+    Status NVARCHAR(20) DEFAULT '开设',         -- 课程状态
+    CreatedAt DATETIME DEFAULT (datetime('now', 'localtime')),
+    UpdatedAt DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+
+-- 5. 课程开设表
+CREATE TABLE IF NOT EXISTS CourseOfferings (
+    OfferingID INTEGER PRIMARY KEY,
+    CourseID INT NOT NULL REFERENCES Courses(CourseID),
+    TeacherName NVARCHAR(50),                   -- 授课教师
+    AcademicYear NVARCHAR(20),                  -- 学年
+    Semester INT,                               -- 学期
+    ClassTime NVARCHAR(100),                    -- 上课时间
+    Classroom NVARCHAR(50),                     -- 教室
+    MaxStudents INT DEFAULT 50,                 -- 最大选课人数
+    CurrentStudents INT DEFAULT 0,              -- 当前选课人数
+    CreatedAt DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+
+-- 6. 成绩表
+CREATE TABLE IF NOT EXISTS Grades (
+    GradeID INTEGER PRIMARY KEY,
+    StudentID BIGINT NOT NULL REFERENCES Students(StudentID),
+    CourseID INT NOT NULL REFERENCES Courses(CourseID),
+    RegularScore DECIMAL(5,2),              -- 平时成绩
+    MidtermScore DECIMAL(5,2),              -- 期中成绩
+    FinalScore DECIMAL(5,2),                -- 期末成绩
+    TotalScore DECIMAL(5,2) GENERATED ALWAYS AS (
+        IFNULL(RegularScore, 0) * 0.1 + IFNULL(MidtermScore, 0) * 0.3 + IFNULL(FinalScore, 0) * 0.6
+    ) VIRTUAL,
+    OfferingID INT,                         -- 关联课程开设
+    CourseCode NVARCHAR(20),                -- 课程编号
+    TeacherName NVARCHAR(50),               -- 授课教师
+    CreatedAt DATETIME DEFAULT (datetime('now', 'localtime')),
+    UpdatedAt DATETIME DEFAULT (datetime('now', 'localtime')),
+    UNIQUE(StudentID, CourseID)
+);
+
+-- 7. 综合测评主表
+CREATE TABLE IF NOT EXISTS ComprehensiveEvaluations (
+    EvaluationID INTEGER PRIMARY KEY,
+    StudentID BIGINT NOT NULL REFERENCES Students(StudentID),
+    AcademicYear NVARCHAR(20) NOT NULL,     -- 学年 (如: 2024-2025)
+    Semester INT NOT NULL,                  -- 学期 (1或2)
+
+    PhysicalScore DECIMAL(5,2),             -- T: 体测成绩
+    MoralScore DECIMAL(5,2),                -- D: 品德表现评价分
+    GPA DECIMAL(4,2),                       -- 绩点
+    AcademicScore DECIMAL(6,2),             -- X: 学业成绩考核分
+
+    InnovationBasicScore DECIMAL(5,2),      -- C1: 创新实践基本分
+    InnovationBonusScore DECIMAL(5,2),      -- C2: 创新实践加分
+    InnovationTotalScore DECIMAL(5,2),      -- C: 创新实践总分
+
+    StudentWorkScore DECIMAL(5,2),          -- S1: 学生工作加分
+    SocialServiceScore DECIMAL(5,2),        -- S2: 社会服务加分
+    SocialRewardScore DECIMAL(5,2),         -- S3: 社会服务奖励加分
+    SocialTotalScore DECIMAL(5,2),          -- S: 社会实践总分
+
+    CulturalSportsScore DECIMAL(5,2),       -- W: 文体实践评分
+
+    TotalScore DECIMAL(7,2),                -- P: 总积分
+
+    ClassRank INT,                          -- 班级排名
+    GradeRank INT,                          -- 年级排名
+
+    RankedScore DECIMAL(7,2),               -- 上次计算排名时的总积分
+    RankedClassID INT,                      -- 上次计算排名时所在班级
+    RankedAt DATETIME,                      -- 上次计算排名的时间，NULL 表示尚未参与排名
+
+    CreatedAt DATETIME DEFAULT (datetime('now', 'localtime')),
+    UpdatedAt DATETIME DEFAULT (datetime('now', 'localtime')),
+
+    UNIQUE(StudentID, AcademicYear, Semester)
+);
+
+-- 8. 加分项目详情表
+CREATE TABLE IF NOT EXISTS BonusDetails (
+    DetailID INTEGER PRIMARY KEY,
+    EvaluationID INT NOT NULL REFERENCES ComprehensiveEvaluations(EvaluationID),
+    Category NVARCHAR(20) NOT NULL,         -- 加分类别: C1, C2, S1, S2, S3, W
+    ItemName NVARCHAR(200) NOT NULL,        -- 加分项目名称
+    Score DECIMAL(5,2) NOT NULL,            -- 加分分数
+    Description NVARCHAR(500),              -- 详细描述
+    Evidence NVARCHAR(200),                 -- 证明材料
+    Status NVARCHAR(20) DEFAULT '已审核',    -- 审核状态
+    CreatedAt DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+
+-- 9. 综测详细信息视图
+CREATE VIEW IF NOT EXISTS v_ComprehensiveEvaluationDetails AS
+SELECT
+    ce.EvaluationID,
+    s.StudentID,
+    s.Name AS StudentName,
+    c.ClassName,
+    ce.AcademicYear,
+    ce.Semester,
+    ce.PhysicalScore,
+    ce.MoralScore,
+    ce.GPA,
+    ce.AcademicScore,
+    ce.InnovationBasicScore,
+    ce.InnovationBonusScore,
+    ce.InnovationTotalScore,
+    ce.StudentWorkScore,
+    ce.SocialServiceScore,
+    ce.SocialRewardScore,
+    ce.SocialTotalScore,
+    ce.CulturalSportsScore,
+    ce.TotalScore,
+    ce.ClassRank,
+    ce.GradeRank
+FROM ComprehensiveEvaluations ce
+JOIN Students s ON ce.StudentID = s.StudentID
+JOIN Classes c ON s.ClassID = c.ClassID;
+
+-- 10. 索引（与 extend_database_schema.sql 相同）
+CREATE INDEX IF NOT EXISTS IX_Students_IDCard ON Students(IDCard);
+CREATE INDEX IF NOT EXISTS IX_Students_Status ON Students(Status);
+CREATE INDEX IF NOT EXISTS IX_Courses_CourseCode ON Courses(CourseCode);
+CREATE INDEX IF NOT EXISTS IX_CourseOfferings_AcademicYear ON CourseOfferings(AcademicYear, Semester);
+CREATE INDEX IF NOT EXISTS IX_BonusDetails_EvaluationID ON BonusDetails(EvaluationID);
+
+-- 11. 综测查询索引（与 evaluation_indexes_schema.sql 相同）
+-- SQLite 没有 INCLUDE 列：排名列表只取前 N 条，按 rowid 回表即可；整学期导出要读全部记录，导出列放在索引键后面
+CREATE INDEX IF NOT EXISTS IX_ComprehensiveEvaluations_Term_ClassRank ON ComprehensiveEvaluations(AcademicYear, Semester, ClassRank);
+CREATE INDEX IF NOT EXISTS IX_ComprehensiveEvaluations_Term_GradeRank ON ComprehensiveEvaluations(
+    AcademicYear, Semester, GradeRank, StudentID, ClassRank, PhysicalScore, MoralScore, GPA, AcademicScore,
+    InnovationTotalScore, SocialTotalScore, CulturalSportsScore, TotalScore);
+CREATE INDEX IF NOT EXISTS IX_ComprehensiveEvaluations_Term_TotalScore ON ComprehensiveEvaluations(AcademicYear, Semester, TotalScore DESC);
+CREATE INDEX IF NOT EXISTS IX_Students_ClassID ON Students(ClassID);
+
+-- 12. 成绩表按学期计算学业成绩（与 grades_indexes_schema.sql 相同）
+CREATE INDEX IF NOT EXISTS IX_Grades_OfferingID ON Grades(OfferingID);
@@ -2,7 +2,7 @@ import React, { useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { Form, Input, Button, Card, message } from 'antd';
 import { UserOutlined, LockOutlined } from '@ant-design/icons';
-import axios from 'axios';
+import api from '../utils/api';
 import { UserState } from '../App';
 
 interface LoginPageProps {
@@ -16,12 +16,14 @@ export default function LoginPage({ onLogin }: LoginPageProps) {
   const handleLogin = async (values: { username: string; password: string }) => {
     setLoading(true);
     try {
-      const res = await axios.post('http://127.0.0.1:8000/api/login', {
+      // 与其他接口相同，登录扩展版后端（main_extended.py），返回的会话令牌由 api 拦截器携带
+      const res = await api.post('/api/login', {
         username: values.username,
         password: values.password
       });
       
       if (res.data.status === 'success') {
+        localStorage.setItem('token', res.data.token);
         const userState: UserState = {
           isLoggedIn: true,
           role: res.data.role,
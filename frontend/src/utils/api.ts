@@ -12,7 +12,11 @@ const api = axios.create({
 // 请求拦截器
 api.interceptors.request.use(
   (config) => {
-    // 可以在这里添加token等认证信息
+    // 携带登录时保存的会话令牌
+    const token = localStorage.getItem('token');
+    if (token) {
+      config.headers.Authorization = `Bearer ${token}`;
+    }
     return config;
   },
   (error) => {
@@ -27,8 +31,10 @@ api.interceptors.response.use(
   },
   (error) => {
     // 统一错误处理
-    if (error.response?.status === 401) {
-      // 未授权，跳转到登录页
+    // 登录接口的 401 是用户名或密码错误，由登录页提示，不跳转
+    if (error.response?.status === 401 && !error.config?.url?.endsWith('/api/login')) {
+      // 未授权或登录已失效，清除令牌并跳转到登录页
+      localStorage.removeItem('token');
       window.location.href = '/login';
     }
     return Promise.reject(error);
@@ -2,13 +2,28 @@
 # -*- coding: utf-8 -*-
 """
 数据库初始化脚本
-自动执行SQL脚本来创建表结构和导入数据
+按版本执行 database/ 下的迁移脚本（见 backend/migrations.py），已执行且未修改的脚本跳过，
+重复执行时没有变化即直接返回。
+
+用法:
+    python init_database.py                  # 创建数据库并执行未执行的迁移
+    python init_database.py --status         # 查看各迁移的执行状态
+    python init_database.py --sample-data    # 同时导入示例综测数据（会清空学生和综测数据）
+    python init_database.py --baseline 002   # 迁移工具引入前已建好的库：登记 001-002 为已执行
 """
 
-import pyodbc
+import argparse
 import os
+import sys
+import time
 from datetime import datetime
 
+import pyodbc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from migrations import MIGRATIONS, SAMPLE_DATA, MigrationError, MigrationRunner  # noqa: E402
+
 # 数据库连接配置
 conn_str = (
     "DRIVER={ODBC Driver 17 for SQL Server};"
@@ -30,45 +45,23 @@ def get_db_connection():
         print("3. 如果数据库不存在，请先创建: CREATE DATABASE GradeSystemDB;")
         return None
 
-def execute_sql_file(conn, file_path, description):
-    """执行SQL文件"""
-    print(f"正在执行: {description}")
-    print(f"文件: {file_path}")
-    
-    if not os.path.exists(file_path):
-        print(f"❌ 文件不存在: {file_path}")
-        return False
-    
-    try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            sql_content = file.read()
-        
-        # 分割SQL语句（以GO为分隔符）
-        sql_commands = sql_content.split('GO')
-        
-        cursor = conn.cursor()
-        
-        for i, command in enumerate(sql_commands):
-            command = command.strip()
-            if command and not command.startswith('--'):
-                try:
-                    cursor.execute(command)
-                    conn.commit()
-                except Exception as e:
-                    print(f"⚠️  执行第{i+1}个命令时出错: {e}")
-                    print(f"命令内容: {command[:100]}...")
-                    # 继续执行其他命令
-        
-        cursor.close()
-        print(f"✅ {description} 执行完成")
-        return True
-        
-    except Exception as e:
-        print(f"❌ 执行失败: {e}")
+def has_untracked_tables(conn, runner):
+    """库中已有业务表但没有迁移记录（用旧脚本建的库）"""
+    if runner.applied():
         return False
+    cursor = conn.cursor()
+    cursor.execute("SELECT OBJECT_ID('Students', 'U')")
+    exists = cursor.fetchone()[0] is not None
+    cursor.close()
+    return exists
+
+def print_status(runner):
+    labels = {"pending": "未执行", "applied": "已执行", "baseline": "已登记", "changed": "已修改"}
+    for migration, state in runner.status():
+        print(f"  {migration.version}  {labels[state]:<4}  {migration.script}  {migration.description}")
 
-def init_database():
-    """初始化数据库"""
+def init_database(args):
+    """执行迁移"""
     print("=== 数据库初始化开始 ===")
     print(f"初始化时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print()
@@ -77,27 +70,32 @@ def init_database():
     if not conn:
         return False
     
+    migrations = MIGRATIONS + ((SAMPLE_DATA,) if args.sample_data else ())
+    runner = MigrationRunner(conn, migrations)
     try:
-        # 1. 创建表结构
-        schema_file = "database/comprehensive_evaluation_schema.sql"
-        if not execute_sql_file(conn, schema_file, "创建综合测评表结构"):
-            print("❌ 表结构创建失败")
-            return False
+        if args.status:
+            print_status(runner)
+            return True
         
-        print()
-        
-        # 2. 导入数据
-        data_file = "database/import_comprehensive_data.sql"
-        if not execute_sql_file(conn, data_file, "导入综合测评数据"):
-            print("❌ 数据导入失败")
+        if args.baseline:
+            runner.baseline(args.baseline)
+        elif has_untracked_tables(conn, runner):
+            print("❌ 数据库中已有表但没有迁移记录（用旧脚本初始化的库）")
+            print("确认表结构后先登记已有的迁移，例如: python init_database.py --baseline 001")
             return False
         
+        result = runner.run(reapply_changed=args.reapply_changed)
         print()
-        print("🎉 数据库初始化完成！")
+        if result["applied"]:
+            print(f"🎉 执行迁移 {len(result['applied'])} 个，跳过 {result['skipped']} 个，"
+                  f"共 {result['seconds']:.2f} 秒")
+        else:
+            print(f"✅ 数据库已是最新（{result['skipped']} 个迁移，{result['seconds'] * 1000:.0f} 毫秒）")
         return True
         
-    except Exception as e:
-        print(f"❌ 初始化过程中出错: {e}")
+    except MigrationError as e:
+        print(f"❌ {e}")
+        print("出错的迁移已回滚，之前的迁移保持已执行")
         return False
     finally:
         conn.close()
@@ -115,7 +113,8 @@ def create_database_if_not_exists():
     )
     
     try:
-        conn = pyodbc.connect(master_conn_str)
+        # CREATE DATABASE 不能在事务中执行
+        conn = pyodbc.connect(master_conn_str, autocommit=True)
         cursor = conn.cursor()
         
         # 检查数据库是否存在
@@ -125,7 +124,6 @@ def create_database_if_not_exists():
         if not db_exists:
             print("数据库不存在，正在创建...")
             cursor.execute("CREATE DATABASE GradeSystemDB")
-            conn.commit()
             print("✅ 数据库 GradeSystemDB 创建成功")
         else:
             print("✅ 数据库 GradeSystemDB 已存在")
@@ -139,6 +137,14 @@ def create_database_if_not_exists():
         return False
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="学生成绩管理系统 - 数据库初始化")
+    parser.add_argument("--status", action="store_true", help="只显示各迁移的执行状态")
+    parser.add_argument("--sample-data", action="store_true", help="导入示例综测数据（会清空学生和综测数据）")
+    parser.add_argument("--reapply-changed", action="store_true", help="重新执行内容有变化的已执行迁移")
+    parser.add_argument("--baseline", metavar="VERSION", help="把该版本及之前的迁移登记为已执行，不执行脚本")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    
     print("=== 学生成绩管理系统 - 数据库初始化 ===")
     print()
     
@@ -149,17 +155,19 @@ if __name__ == "__main__":
     
     print()
     
-    # 2. 初始化表结构和数据
-    if init_database():
-        print()
-        print("=== 初始化成功 ===")
-        print("现在可以:")
-        print("1. 运行验证脚本: python verify_database.py")
-        print("2. 启动后端服务: python backend/main.py")
-        print("3. 启动前端服务: cd frontend && npm run dev")
+    # 2. 执行迁移
+    if init_database(args):
+        if not args.status:
+            print()
+            print("=== 初始化成功 ===")
+            print("现在可以:")
+            print("1. 运行验证脚本: python verify_database.py")
+            print("2. 启动后端服务: python backend/main_extended.py")
+            print("3. 启动前端服务: cd frontend && npm run dev")
     else:
         print()
         print("=== 初始化失败 ===")
-        print("请检查错误信息并手动执行SQL脚本")
+        print("请检查错误信息，修正脚本后重新执行（已执行的迁移会跳过）")
+        exit(1)
     
-    print(f"\n完成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
\ No newline at end of file
+    print(f"\n完成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}（{time.perf_counter() - started:.2f} 秒）")
@@ -5,6 +5,8 @@ echo.
 echo 1. 启动后端服务...
 cd backend
 start "后端服务" cmd /k "python main.py"
+rem 前端的登录和其余接口都访问扩展版后端（8001），登录后携带它签发的会话令牌
+start "扩展版后端服务" cmd /k "python main_extended.py"
 
 echo.
 echo 2. 启动前端服务...
@@ -14,6 +16,7 @@ start "前端服务" cmd /k "npm run dev"
 echo.
 echo 开发环境启动完成！
 echo 后端地址: http://127.0.0.1:8000
+echo 扩展版后端地址: http://127.0.0.1:8001
 echo 前端地址: http://localhost:5173
 echo.
 pause
\ No newline at end of file
@@ -12,19 +12,60 @@ from datetime import datetime
 # API基础URL
 BASE_URL = "http://localhost:8001"
 
-def test_api_endpoint(method, endpoint, data=None, params=None):
-    """测试API接口"""
+# 管理员令牌：学生、课程的增删改需要管理员权限
+ADMIN_HEADERS = {}
+
+def admin_login():
+    """以管理员登录，之后的请求携带令牌"""
+    response = requests.post(f"{BASE_URL}/api/login", json={"username": "admin", "password": "admin123"})
+    if response.status_code == 200:
+        ADMIN_HEADERS["Authorization"] = f"Bearer {response.json()['token']}"
+        print("管理员登录成功")
+    else:
+        print(f"管理员登录失败: {response.text}")
+    print("-" * 50)
+
+def test_auth_flow():
+    """按前端的方式登录（POST 8001 的 /api/login，之后携带 Bearer 令牌），检查受保护的写接口"""
+    params = {'academic_year': '2024-2025', 'semester': 1}
+    response = requests.post(f"{BASE_URL}/api/ranking/calculate", json=params)
+    print(f"未登录计算排名: {response.status_code}（应为 401）")
+    ok = response.status_code == 401
+
+    response = requests.post(f"{BASE_URL}/api/login", json={"username": "admin", "password": "admin123"})
+    token = response.json().get("token") if response.status_code == 200 else None
+    print(f"管理员登录: {response.status_code}，{'返回' if token else '没有返回'}会话令牌")
+    ok = ok and token is not None
+    if token:
+        headers = {"Authorization": f"Bearer {token}"}
+        response = requests.post(f"{BASE_URL}/api/ranking/calculate", json=params, headers=headers)
+        print(f"携带令牌计算排名: {response.status_code}（应为 200）")
+        ok = ok and response.status_code == 200
+        response = requests.get(f"{BASE_URL}/api/ranking/list", params={**params, 'limit': 20}, headers=headers)
+        rankings = response.json().get('rankings', []) if response.status_code == 200 else []
+        print(f"管理员排名列表: {len(rankings)} 条（不受学生 10 条的限制）")
+
+    response = requests.post(f"{BASE_URL}/api/login", json={"username": "admin", "password": "wrong-password"})
+    print(f"密码错误: {response.status_code}（应为 401）")
+    ok = ok and response.status_code == 401
+    print("✅ 登录与权限检查通过" if ok else "❌ 登录与权限检查失败")
+    print("-" * 50)
+    return ok
+
+def test_api_endpoint(method, endpoint, data=None, params=None, auth=True):
+    """测试API接口；auth 为 False 时不携带令牌"""
     url = f"{BASE_URL}{endpoint}"
+    headers = ADMIN_HEADERS if auth else {}
     
     try:
         if method.upper() == 'GET':
-            response = requests.get(url, params=params)
+            response = requests.get(url, params=params, headers=headers)
         elif method.upper() == 'POST':
-            response = requests.post(url, json=data)
+            response = requests.post(url, json=data, headers=headers)
         elif method.upper() == 'PUT':
-            response = requests.put(url, json=data)
+            response = requests.put(url, json=data, headers=headers)
         elif method.upper() == 'DELETE':
-            response = requests.delete(url)
+            response = requests.delete(url, headers=headers)
         
         print(f"{method.upper()} {endpoint}")
         print(f"状态码: {response.status_code}")
@@ -64,7 +105,9 @@ def main():
     test_api_endpoint('GET', '/')
     
     # 2. 测试用户接口
-    print("2. 测试用户管理")
+    print("2. 测试登录与用户管理")
+    test_auth_flow()
+    admin_login()
     test_api_endpoint('GET', '/api/test/users')
     
     # 3. 测试学生管理接口
@@ -147,20 +190,18 @@ def main():
     # 5. 测试综合测评接口（保持原有功能）
     print("5. 测试综合测评接口")
     
-    # 测试排名查询（学生权限限制）
+    # 测试排名查询（未登录按学生权限，最多 10 条）
     test_api_endpoint('GET', '/api/ranking/list', params={
         'academic_year': '2024-2025',
         'semester': 1,
-        'limit': 20,
-        'role': 'Student'
-    })
+        'limit': 20
+    }, auth=False)
     
     # 测试排名查询（管理员权限）
     test_api_endpoint('GET', '/api/ranking/list', params={
         'academic_year': '2024-2025',
         'semester': 1,
-        'limit': 20,
-        'role': 'Admin'
+        'limit': 20
     })
     
     # 测试学生详情查询
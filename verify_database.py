@@ -3,295 +3,101 @@
 """
 数据库验证脚本
 用于检查数据库表结构和数据是否正确导入
+
+检查项在多个连接上并发执行（见 backend/verification.py）：表行数读元数据，
+引用完整性、总分、排名按置信度抽样检查，不扫描整张表，可以在生产库或只读副本上执行。
+
+用法:
+    python verify_database.py
+    python verify_database.py --confidence 0.99 --tolerance 0.001 --json report.json
+    python verify_database.py --backend sqlite --path database/gradesystem.db --json -
 """
 
-import pyodbc
-import pandas as pd
+import argparse
+import json
+import os
+import sys
 from datetime import datetime
 
-# 数据库连接配置
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from storage import DEFAULT_SQLITE_PATH, SqliteStorage, SqlServerStorage  # noqa: E402
+from verification import CHECKS, run_verification  # noqa: E402
+
+# 数据库连接配置；可以指向只读副本（连接字符串加 ApplicationIntent=ReadOnly），不占用主库资源
 conn_str = (
     "DRIVER={ODBC Driver 17 for SQL Server};"
-    "SERVER=localhost;" 
+    "SERVER=localhost;"
     "DATABASE=GradeSystemDB;"
     "Trusted_Connection=yes;"
 )
 
-def get_db_connection():
-    """获取数据库连接"""
-    try:
-        conn = pyodbc.connect(conn_str)
-        return conn
-    except Exception as e:
-        print(f"❌ 数据库连接失败: {e}")
-        print("请检查:")
-        print("1. SQL Server 是否启动")
-        print("2. 数据库 GradeSystemDB 是否存在")
-        print("3. 连接字符串是否正确")
-        return None
+STATUS_ICONS = {"ok": "✅", "warn": "⚠️ ", "fail": "❌", "error": "❌", "skipped": "⏭️ "}
 
-def verify_database():
-    """验证数据库结构和数据"""
+def print_report(report):
+    """按检查项输出验证结果"""
     print("=== 数据库验证开始 ===")
-    print(f"验证时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"验证时间: {report['verified_at']}")
+    sampling = report["sampling"]
+    print(f"抽样: 每项 {sampling['sample_size']} 条（置信度 {sampling['confidence']:.0%}，"
+          f"问题比例上限 {sampling['tolerance']:.2%}），并发 {report['workers']}")
     print()
-    
-    conn = get_db_connection()
-    if not conn:
-        return False
-    
-    cursor = conn.cursor()
-    
-    try:
-        # 1. 检查数据库是否存在
-        print("1. 检查数据库...")
-        cursor.execute("SELECT DB_NAME() as CurrentDatabase")
-        db_name = cursor.fetchone()[0]
-        if db_name == 'GradeSystemDB':
-            print("✅ 数据库 GradeSystemDB 连接成功")
-        else:
-            print(f"❌ 当前连接的数据库是: {db_name}")
-            return False
-        
-        print()
-        
-        # 2. 检查表结构
-        print("2. 检查表结构...")
-        expected_tables = [
-            'Students', 'ComprehensiveEvaluations', 'BonusDetails', 
-            'Classes', 'Users'
-        ]
-        
-        cursor.execute("""
-            SELECT TABLE_NAME 
-            FROM INFORMATION_SCHEMA.TABLES 
-            WHERE TABLE_TYPE = 'BASE TABLE'
-            ORDER BY TABLE_NAME
-        """)
-        
-        existing_tables = [row[0] for row in cursor.fetchall()]
-        print(f"   现有表: {', '.join(existing_tables)}")
-        
-        missing_tables = [table for table in expected_tables if table not in existing_tables]
-        if missing_tables:
-            print(f"❌ 缺少表: {', '.join(missing_tables)}")
-            print("   请执行 comprehensive_evaluation_schema.sql 创建表结构")
-            return False
-        else:
-            print("✅ 所有必需的表都存在")
-        
-        print()
-        
-        # 3. 检查数据量
-        print("3. 检查数据量...")
-        tables_data = {}
-        
-        for table in expected_tables:
-            cursor.execute(f"SELECT COUNT(*) FROM {table}")
-            count = cursor.fetchone()[0]
-            tables_data[table] = count
-            print(f"   {table}: {count} 条记录")
-        
-        print()
-        
-        # 4. 检查关键数据
-        print("4. 检查关键数据...")
-        
-        # 检查班级数据
-        cursor.execute("SELECT ClassID, ClassName, Major FROM Classes")
-        classes = cursor.fetchall()
-        if classes:
-            print("✅ 班级数据:")
-            for cls in classes:
-                print(f"   - {cls[1]} ({cls[2]}) [ID: {cls[0]}]")
-        else:
-            print("❌ 没有班级数据")
-        
-        print()
-        
-        # 检查学生数据
-        cursor.execute("""
-            SELECT TOP 5 StudentID, Name, ClassName 
-            FROM Students s
-            JOIN Classes c ON s.ClassID = c.ClassID
-            ORDER BY StudentID
-        """)
-        students = cursor.fetchall()
-        if students:
-            print("✅ 学生数据 (前5名):")
-            for student in students:
-                print(f"   - {student[0]}: {student[1]} ({student[2]})")
-        else:
-            print("❌ 没有学生数据")
-        
-        print()
-        
-        # 检查综测数据
-        cursor.execute("""
-            SELECT COUNT(*) as 综测记录数,
-                   AVG(TotalScore) as 平均总积分,
-                   MAX(TotalScore) as 最高总积分,
-                   MIN(TotalScore) as 最低总积分
-            FROM ComprehensiveEvaluations
-            WHERE TotalScore IS NOT NULL
-        """)
-        eval_stats = cursor.fetchone()
-        if eval_stats and eval_stats[0] > 0:
-            print("✅ 综测数据统计:")
-            print(f"   - 记录数: {eval_stats[0]}")
-            print(f"   - 平均总积分: {eval_stats[1]:.2f}")
-            print(f"   - 最高总积分: {eval_stats[2]:.2f}")
-            print(f"   - 最低总积分: {eval_stats[3]:.2f}")
-        else:
-            print("❌ 没有综测数据")
-        
-        print()
-        
-        # 检查用户账号
-        cursor.execute("""
-            SELECT Role, COUNT(*) as 数量
-            FROM Users
-            GROUP BY Role
-            ORDER BY Role
-        """)
-        user_stats = cursor.fetchall()
-        if user_stats:
-            print("✅ 用户账号统计:")
-            for stat in user_stats:
-                print(f"   - {stat[0]}: {stat[1]} 个账号")
-        else:
-            print("❌ 没有用户账号")
-        
-        print()
-        
-        # 5. 检查视图和存储过程
-        print("5. 检查视图和存储过程...")
-        
-        # 检查视图
-        cursor.execute("""
-            SELECT TABLE_NAME 
-            FROM INFORMATION_SCHEMA.VIEWS
-            WHERE TABLE_NAME = 'v_ComprehensiveEvaluationDetails'
-        """)
-        view_exists = cursor.fetchone()
-        if view_exists:
-            print("✅ 视图 v_ComprehensiveEvaluationDetails 存在")
-        else:
-            print("❌ 视图 v_ComprehensiveEvaluationDetails 不存在")
-        
-        # 检查存储过程
-        cursor.execute("""
-            SELECT ROUTINE_NAME 
-            FROM INFORMATION_SCHEMA.ROUTINES
-            WHERE ROUTINE_TYPE = 'PROCEDURE' 
-            AND ROUTINE_NAME IN ('sp_CalculateComprehensiveScore', 'sp_CalculateRankings')
-        """)
-        procedures = [row[0] for row in cursor.fetchall()]
-        expected_procedures = ['sp_CalculateComprehensiveScore', 'sp_CalculateRankings']
-        
-        for proc in expected_procedures:
-            if proc in procedures:
-                print(f"✅ 存储过程 {proc} 存在")
-            else:
-                print(f"❌ 存储过程 {proc} 不存在")
-        
-        print()
-        
-        # 6. 测试视图查询
-        print("6. 测试视图查询...")
-        try:
-            cursor.execute("""
-                SELECT TOP 3 StudentName, TotalScore, ClassRank
-                FROM v_ComprehensiveEvaluationDetails
-                WHERE AcademicYear = '2024-2025' AND Semester = 1
-                ORDER BY ClassRank
-            """)
-            top_students = cursor.fetchall()
-            if top_students:
-                print("✅ 视图查询成功，前3名学生:")
-                for i, student in enumerate(top_students, 1):
-                    print(f"   {i}. {student[0]} - {student[1]:.2f}分 (排名: {student[2]})")
-            else:
-                print("⚠️  视图查询成功但没有数据")
-        except Exception as e:
-            print(f"❌ 视图查询失败: {e}")
-        
-        print()
-        
-        # 7. 验证总结
-        print("=== 验证总结 ===")
-        
-        issues = []
-        if tables_data['Students'] == 0:
-            issues.append("缺少学生数据")
-        if tables_data['ComprehensiveEvaluations'] == 0:
-            issues.append("缺少综测数据")
-        if tables_data['Users'] == 0:
-            issues.append("缺少用户账号")
-        if tables_data['Classes'] == 0:
-            issues.append("缺少班级数据")
-        
-        if not issues:
-            print("🎉 数据库验证通过！所有数据都已正确导入。")
-            print("\n可以正常启动系统:")
-            print("1. 启动后端: python backend/main.py")
-            print("2. 启动前端: cd frontend && npm run dev")
-            print("3. 访问: http://localhost:5173")
-            return True
-        else:
-            print("❌ 发现以下问题:")
-            for issue in issues:
-                print(f"   - {issue}")
-            print("\n建议操作:")
-            print("1. 执行 database/comprehensive_evaluation_schema.sql 创建表结构")
-            print("2. 执行 database/import_comprehensive_data.sql 导入数据")
-            return False
-            
-    except Exception as e:
-        print(f"❌ 验证过程中出错: {e}")
-        return False
-    finally:
-        conn.close()
 
-def show_sample_data():
-    """显示示例数据"""
-    print("\n=== 示例数据预览 ===")
-    
-    conn = get_db_connection()
-    if not conn:
-        return
-    
-    try:
-        # 显示综测排名
-        query = """
-            SELECT TOP 10
-                ClassRank as 排名,
-                StudentName as 姓名,
-                TotalScore as 总积分,
-                GPA as 绩点,
-                AcademicScore as 学业成绩,
-                InnovationTotalScore as 创新实践,
-                SocialTotalScore as 社会实践
-            FROM v_ComprehensiveEvaluationDetails
-            WHERE AcademicYear = '2024-2025' AND Semester = 1
-            ORDER BY ClassRank
-        """
-        
-        df = pd.read_sql(query, conn)
-        if not df.empty:
-            print("综测排名前10名:")
-            print(df.to_string(index=False, float_format='%.2f'))
-        else:
-            print("没有综测数据可显示")
-            
-    except Exception as e:
-        print(f"查询示例数据失败: {e}")
-    finally:
-        conn.close()
+    for i, check in enumerate(report["checks"], 1):
+        icon = STATUS_ICONS[check["status"]]
+        print(f"{i}. {icon} {check['title']}（{check['elapsed_ms']:.1f} ms）: {check['message']}")
+        details = check["details"]
+        for j, student in enumerate(details.get("top", []), 1):
+            print(f"   {j}. {student['name']} - {student['total_score']}分 (排名: {student['class_rank']})")
+        if details.get("examples"):
+            print(f"   示例: {', '.join(str(key) for key in details['examples'])}")
+        if details.get("estimated_defect_rows"):
+            print(f"   估计全表约 {details['estimated_defect_rows']} 条")
+
+    print()
+    print("=== 验证总结 ===")
+    print(f"总耗时 {report['elapsed_ms'] / 1000:.2f} 秒")
+    if report["status"] in ("ok", "warn", "skipped"):
+        print("🎉 数据库验证通过！" + ("（有需要处理的提示）" if report["status"] == "warn" else ""))
+        print("\n可以正常启动系统:")
+        print("1. 启动后端: python backend/main_extended.py")
+        print("2. 启动前端: cd frontend && npm run dev")
+        print("3. 访问: http://localhost:5173")
+    else:
+        print("❌ 发现问题，建议操作:")
+        print("1. 执行 python init_database.py 创建或更新表结构")
+        print("2. 执行 python init_database.py --sample-data 导入示例数据")
+        print("3. 总分或排名不一致时，在系统中重新计算总分和排名")
 
 if __name__ == "__main__":
-    success = verify_database()
-    if success:
-        show_sample_data()
-    
-    print(f"\n验证完成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="学生成绩管理系统 - 数据库验证")
+    parser.add_argument("--backend", choices=["sqlserver", "sqlite"], default="sqlserver")
+    parser.add_argument("--path", default=DEFAULT_SQLITE_PATH, help="SQLite 数据库文件")
+    parser.add_argument("--conn-str", default=conn_str, help="SQL Server 连接字符串")
+    parser.add_argument("--workers", type=int, default=4, help="并发执行检查的连接数")
+    parser.add_argument("--confidence", type=float, default=0.95, help="抽样检查的置信度")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="可接受的问题记录比例上限")
+    parser.add_argument("--seed", type=int, help="随机数种子，指定后抽样结果可以重现")
+    parser.add_argument("--checks", help=f"只执行这些检查（逗号分隔）: {', '.join(c[0] for c in CHECKS)}")
+    parser.add_argument("--json", help="把报告写入 JSON 文件，- 表示输出到标准输出")
+    args = parser.parse_args()
+
+    if args.backend == "sqlite":
+        storage = SqliteStorage(args.path)
+    else:
+        storage = SqlServerStorage(args.conn_str)
+    only = set(args.checks.split(",")) if args.checks else None
+    report = run_verification(storage, workers=args.workers, confidence=args.confidence,
+                              tolerance=args.tolerance, seed=args.seed, only=only)
+
+    if args.json == "-":
+        print(json.dumps(report, ensure_ascii=False, indent=2, default=str))
+    else:
+        print_report(report)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+            print(f"\n报告已写入 {args.json}")
+        print(f"\n验证完成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    sys.exit(1 if report["status"] in ("fail", "error") else 0)